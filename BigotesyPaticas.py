@@ -22,10 +22,15 @@ except Exception:
     pytz = None
 
 import numpy as np
-import time  # Necesario para manejar las esperas en el error 429
 import uuid  # ya lo tienes; mantener
 import re  # ✅ nuevo
 
+from bp_common.currency import clean_currency_series
+from bp_common.ids import normalizar_id_producto_series
+from bp_common.sheets_gateway import obtener_gateway
+from bp_common.sheets_quota import es_cuota, llamada_api
+from bp_common.sheets_sync import TabSpec, obtener_sync
+
 try:
     HTML = importlib.import_module("weasyprint").HTML
 except Exception:
@@ -70,27 +75,16 @@ st.set_page_config(page_title="Nexus Pro | Bigotes y Paticas", page_icon="🐾",
 # ==========================================
 def safe_api_call(func, *args, **kwargs):
     """
-    Ejecuta cualquier función de gspread. Si da error 429 (Cuota excedida),
-    espera y reintenta hasta 5 veces.
+    Ejecuta cualquier función de gspread respetando la cuota compartida del proceso:
+    espera en cola por una ficha, comparte lecturas idénticas concurrentes y
+    reintenta los 429 con backoff con jitter (ver `bp_common.sheets_quota`).
     """
-    max_retries = 5
-    wait_time = 2  # Segundos iniciales de espera
-
-    for attempt in range(max_retries):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "Quota exceeded" in error_msg:
-                if attempt < max_retries - 1:
-                    time.sleep(wait_time)
-                    wait_time *= 2  # Espera exponencial (2s, 4s, 8s...)
-                    continue
-                else:
-                    st.error("⚠️ La API de Google está saturada. Por favor espera 1 minuto.")
-                    raise e
-            else:
-                raise e
+    try:
+        return llamada_api(func, *args, **kwargs)
+    except Exception as e:
+        if es_cuota(e):
+            st.error("⚠️ La API de Google está saturada. Por favor espera 1 minuto.")
+        raise
 
 
 # ==========================================
@@ -110,12 +104,14 @@ def conectar_google_sheets():
 
 def obtener_worksheets(sh):
     """Devuelve un diccionario con las hojas para fácil acceso"""
+    # Un solo `sh.worksheets()` cacheado en el gateway en vez de un request por hoja
+    gw = obtener_gateway(sh)
     return {
-        "inv": sh.worksheet("Inventario"),
-        "cli": sh.worksheet("Clientes"),
-        "ven": sh.worksheet("Ventas"),
-        "gas": sh.worksheet("Gastos"),
-        "cie": sh.worksheet("Cierres"),
+        "inv": gw.hoja("Inventario", llamar=safe_api_call),
+        "cli": gw.hoja("Clientes", llamar=safe_api_call),
+        "ven": gw.hoja("Ventas", llamar=safe_api_call),
+        "gas": gw.hoja("Gastos", llamar=safe_api_call),
+        "cie": gw.hoja("Cierres", llamar=safe_api_call),
         # Agrega las otras si las usas activamente, por ahora estas son las vitales para el POS
     }
 
@@ -161,38 +157,51 @@ def limpiar_dataframe(raw_data):
 
     for col in cols_money:
         if col in df.columns:
-            df[col] = df[col].apply(clean_currency)
+            df[col] = clean_currency_series(df[col])
 
     for col in cols_numeric:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
 
     if "Fecha" in df.columns:
-        df["Fecha"] = pd.to_datetime(df["Fecha"], errors="coerce")
+        # Formato fijo: el sync incremental limpia solo las filas nuevas y no debe
+        # inferir un formato distinto del de la carga completa
+        df["Fecha"] = pd.to_datetime(df["Fecha"], format="ISO8601", errors="coerce")
 
     return df
 
 
-def cargar_datos_iniciales():
-    """Carga TODOS los datos al Session State de una sola vez."""
+# Inventario y Clientes se editan en el lugar: siempre completas. Ventas, Gastos
+# y Cierres crecen por el final: solo se piden las filas nuevas (bp_common.sheets_sync)
+TABS_POS = [
+    TabSpec("inv", "Inventario", "completa"),
+    TabSpec("cli", "Clientes", "completa"),
+    TabSpec("ven", "Ventas", "anexar"),
+    TabSpec("gas", "Gastos", "anexar"),
+    TabSpec("cie", "Cierres", "anexar"),
+]
+
+
+def _sync_pos():
+    return obtener_sync("pos", TABS_POS, limpiar_dataframe)
+
+
+def cargar_datos_iniciales(forzar_completa=False):
+    """Carga TODOS los datos al Session State en una sola lectura batch (incremental).
+
+    `forzar_completa=True` relee las pestañas enteras (ediciones de filas viejas
+    hechas por otros usuarios); si no, Ventas/Gastos/Cierres solo traen la cola.
+    """
     sh = conectar_google_sheets()
-    h = asegurar_esquema_operativo(sh)
+    sync = _sync_pos()
+    if not sync.cargado:
+        # Primera carga del proceso: el esquema se valida antes de leer
+        asegurar_esquema_operativo(sh)
 
     with st.spinner("🔄 Sincronizando datos con la nube..."):
-        # Usamos safe_api_call para leer
-        data_inv = safe_api_call(h["inv"].get_all_values)
-        data_cli = safe_api_call(h["cli"].get_all_values)
-        data_ven = safe_api_call(h["ven"].get_all_values)
-        data_gas = safe_api_call(h["gas"].get_all_values)
-        data_cie = safe_api_call(h["cie"].get_all_values)
-
-        st.session_state.db = {
-            "inv": limpiar_dataframe(data_inv),
-            "cli": limpiar_dataframe(data_cli),
-            "ven": limpiar_dataframe(data_ven),
-            "gas": limpiar_dataframe(data_gas),
-            "cie": limpiar_dataframe(data_cie),
-        }
+        st.session_state.db = sync.sincronizar(
+            sh, llamar=safe_api_call, forzar_completa=forzar_completa
+        )
         st.session_state.ultima_sincronizacion = now_co()
 
 
@@ -469,7 +478,7 @@ def preparar_ventas_dashboard(df_ventas: pd.DataFrame) -> pd.DataFrame:
     for col in ["Total", "Costo_Total", "Abono_Recibido", "Saldo_Pendiente"]:
         if col not in df.columns:
             df[col] = 0
-        df[col] = df[col].apply(clean_currency)
+        df[col] = clean_currency_series(df[col])
 
     if "Estado_Pago" not in df.columns:
         df["Estado_Pago"] = ""
@@ -1205,14 +1214,14 @@ def generar_pdf_html(venta_data, items):
 
 def normalizar_todas_las_referencias():
     sh = conectar_google_sheets()
-    ws_inv = sh.worksheet("Inventario")
+    ws_inv = obtener_gateway(sh).hoja("Inventario", llamar=safe_api_call)
     df = st.session_state.db["inv"]
 
     if "ID_Producto" not in df.columns:
         st.error("No se encontró ID_Producto")
         return
 
-    col_valores = [normalizar_id_producto(x) for x in df["ID_Producto"]]
+    col_valores = normalizar_id_producto_series(df["ID_Producto"]).tolist()
 
     # Encontrar indice de columna
     headers = safe_api_call(ws_inv.row_values, 1)
@@ -1268,7 +1277,7 @@ def asegurar_ids_inventario_nube():
 
     # 1) Asegurar columnas locales
     if "ID_Producto_Norm" not in df.columns:
-        df["ID_Producto_Norm"] = df["ID_Producto"].apply(normalizar_id_producto)
+        df["ID_Producto_Norm"] = normalizar_id_producto_series(df["ID_Producto"])
 
     if "Producto_UID" not in df.columns:
         df["Producto_UID"] = ""
@@ -1384,7 +1393,7 @@ def registrar_venta(venta_data, carrito):
     if "Producto_UID" not in df_inv.columns:
         df_inv["Producto_UID"] = ""
     if "ID_Producto_Norm" not in df_inv.columns and "ID_Producto" in df_inv.columns:
-        df_inv["ID_Producto_Norm"] = df_inv["ID_Producto"].apply(normalizar_id_producto)
+        df_inv["ID_Producto_Norm"] = normalizar_id_producto_series(df_inv["ID_Producto"])
 
     df_inv["Producto_UID"] = df_inv["Producto_UID"].fillna("").astype(str).str.strip()
     df_inv["ID_Producto_Norm"] = df_inv["ID_Producto_Norm"].fillna("").astype(str).str.strip()
@@ -1454,13 +1463,13 @@ def registrar_venta(venta_data, carrito):
     cols = st.session_state.db["ven"].columns
     nuevo_df = pd.DataFrame([{col: venta_data.get(col, "") for col in cols}], columns=cols)
     if "Total" in nuevo_df.columns:
-        nuevo_df["Total"] = nuevo_df["Total"].apply(clean_currency)
+        nuevo_df["Total"] = clean_currency_series(nuevo_df["Total"])
     if "Costo_Total" in nuevo_df.columns:
-        nuevo_df["Costo_Total"] = nuevo_df["Costo_Total"].apply(clean_currency)
+        nuevo_df["Costo_Total"] = clean_currency_series(nuevo_df["Costo_Total"])
     if "Abono_Recibido" in nuevo_df.columns:
-        nuevo_df["Abono_Recibido"] = nuevo_df["Abono_Recibido"].apply(clean_currency)
+        nuevo_df["Abono_Recibido"] = clean_currency_series(nuevo_df["Abono_Recibido"])
     if "Saldo_Pendiente" in nuevo_df.columns:
-        nuevo_df["Saldo_Pendiente"] = nuevo_df["Saldo_Pendiente"].apply(clean_currency)
+        nuevo_df["Saldo_Pendiente"] = clean_currency_series(nuevo_df["Saldo_Pendiente"])
     if "Fecha" in nuevo_df.columns:
         nuevo_df["Fecha"] = pd.to_datetime(nuevo_df["Fecha"], errors="coerce")
     if "Fecha_Promesa_Pago" in nuevo_df.columns:
@@ -1485,7 +1494,7 @@ def registrar_gasto(fila_datos):
         fila_datos += [""] * (len(cols) - len(fila_datos))
     nuevo_df = pd.DataFrame([fila_datos], columns=cols)
     if "Monto" in nuevo_df.columns:
-        nuevo_df["Monto"] = nuevo_df["Monto"].apply(clean_currency)
+        nuevo_df["Monto"] = clean_currency_series(nuevo_df["Monto"])
     st.session_state.db["gas"] = pd.concat(
         [st.session_state.db["gas"], nuevo_df], ignore_index=True
     )
@@ -1526,6 +1535,8 @@ def actualizar_estado_envio(id_venta, nuevo_estado):
             headers = safe_api_call(ws_ven.row_values, 1)
             col_idx = headers.index("Estado_Envio") + 1
             safe_api_call(ws_ven.update_cell, cell.row, col_idx, nuevo_estado)
+            # La fila puede quedar fuera de la cola que relee el sync incremental
+            _sync_pos().invalidar("ven")
 
             # Update Local
             df_ven = st.session_state.db["ven"]
@@ -1591,6 +1602,8 @@ def actualizar_pago_venta(id_venta, abono_adicional=0, fecha_promesa_pago="", no
             )
         if batch_updates:
             safe_api_call(ws_ven.batch_update, batch_updates)
+            # Ventas a crédito viejas quedan fuera de la cola del sync incremental
+            _sync_pos().invalidar("ven")
 
         df_ven = st.session_state.db["ven"]
         idx = df_ven[df_ven["ID_Venta"].astype(str) == str(id_venta)].index
@@ -1718,7 +1731,7 @@ def tab_pos():
     if "Producto_UID" not in df_inv.columns:
         df_inv["Producto_UID"] = ""
     if "ID_Producto_Norm" not in df_inv.columns:
-        df_inv["ID_Producto_Norm"] = df_inv["ID_Producto"].apply(normalizar_id_producto)
+        df_inv["ID_Producto_Norm"] = normalizar_id_producto_series(df_inv["ID_Producto"])
 
     df_inv["Producto_UID"] = df_inv["Producto_UID"].fillna("").astype(str).str.strip()
 
@@ -1741,7 +1754,7 @@ def tab_pos():
 
     # Fallback si falta UID en alguna fila (no ideal, pero evita bloquear POS)
     if row_prod is None:
-        df_inv["__ID_Norm"] = df_inv["ID_Producto"].apply(normalizar_id_producto)
+        df_inv["__ID_Norm"] = normalizar_id_producto_series(df_inv["ID_Producto"])
         id_sel = df_inv.loc[df_inv["Display"] == prod_sel, "__ID_Norm"].iloc[0]
         mm = df_inv[df_inv["__ID_Norm"] == id_sel]
         if not mm.empty:
@@ -2540,7 +2553,7 @@ def tab_cuadre_ui():
     df_cie = st.session_state.db["cie"].copy()
 
     if not df_gas.empty and "Monto" in df_gas.columns:
-        df_gas["Monto"] = df_gas["Monto"].apply(clean_currency)
+        df_gas["Monto"] = clean_currency_series(df_gas["Monto"])
 
     fecha = st.date_input("Fecha a cuadrar", now_co().date(), key="cuadre_fecha")
 
@@ -2583,7 +2596,7 @@ def tab_cuadre_ui():
     if not df_cie.empty and "Fecha" in df_cie.columns:
         df_cie["Fecha_dt"] = pd.to_datetime(df_cie["Fecha"], errors="coerce").dt.date
         if "Saldo_Real" in df_cie.columns:
-            df_cie["Saldo_Real"] = df_cie["Saldo_Real"].apply(clean_currency)
+            df_cie["Saldo_Real"] = clean_currency_series(df_cie["Saldo_Real"])
         prev_cierre = df_cie[df_cie["Fecha_dt"] < fecha].sort_values("Fecha_dt", ascending=False)
         if not prev_cierre.empty:
             base_inicial = clean_currency(prev_cierre.iloc[0].get("Saldo_Real", 0))
@@ -2793,7 +2806,7 @@ def tab_cuadre_ui():
                     "Pendiente_Cobro",
                 ]:
                     if col in nuevo_df.columns:
-                        nuevo_df[col] = nuevo_df[col].apply(clean_currency)
+                        nuevo_df[col] = clean_currency_series(nuevo_df[col])
                 st.session_state.db["cie"] = pd.concat(
                     [st.session_state.db["cie"], nuevo_df], ignore_index=True
                 )
@@ -3138,7 +3151,7 @@ def main():
             "🔄 Sincronizar Datos", help="Trae cambios de la nube si alguien más editó el Excel"
         ):
             st.cache_resource.clear()
-            cargar_datos_iniciales()
+            cargar_datos_iniciales(forzar_completa=True)
             st.rerun()
         st.caption(
             f"Última sinc: {st.session_state.get('ultima_sincronizacion', 'Nunca').strftime('%H:%M:%S')}"
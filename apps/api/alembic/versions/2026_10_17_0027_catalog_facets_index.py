@@ -0,0 +1,33 @@
+"""Índice cubriente para las facetas del catálogo público.
+
+`/v1/products/catalog` calcula las facetas con un único GROUP BY GROUPING SETS
+sobre los productos publicados. Este índice parcial incluye las columnas de
+faceta y precio para que Postgres resuelva la agregación con un index-only scan
+en lugar de leer el heap completo de catalog.products.
+
+Revision ID: 0027_catalog_facets_index
+Revises: 0026_aliados_agenda_bookings
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0027_catalog_facets_index"
+down_revision = "0026_aliados_agenda_bookings"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_products_published_facets
+        ON catalog.products (category_id)
+        INCLUDE (life_stage, size_range, brand_normalized, pet_type, price)
+        WHERE is_published = true AND deleted_at IS NULL;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS catalog.idx_products_published_facets;")
@@ -0,0 +1,93 @@
+"""inventory.product_availability — disponibilidad agregada por producto.
+
+Read model con (quantity, reserved, available) por producto, mantenido por un
+trigger sobre inventory.stock. Cubre todos los caminos de escritura (POS,
+puente del portal, ajustes, compras, conteos físicos y ETL) sin tocar cada
+endpoint. El trigger aplica solo el delta de la fila cambiada, así que su
+costo no depende del número de locations.
+
+Revision ID: 0028_product_availability
+Revises: 0027_catalog_facets_index
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0028_product_availability"
+down_revision = "0027_catalog_facets_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory.product_availability (
+            product_id  UUID PRIMARY KEY
+                        REFERENCES catalog.products(id) ON DELETE CASCADE,
+            quantity    INTEGER NOT NULL DEFAULT 0,
+            reserved    INTEGER NOT NULL DEFAULT 0,
+            available   INTEGER GENERATED ALWAYS AS (quantity - reserved) STORED,
+            updated_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS idx_product_availability_in_stock
+        ON inventory.product_availability (product_id) WHERE quantity > 0;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION inventory.sync_product_availability()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+               AND NEW.product_id = OLD.product_id
+               AND NEW.quantity = OLD.quantity
+               AND NEW.reserved = OLD.reserved THEN
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE inventory.product_availability SET
+                    quantity = quantity - OLD.quantity,
+                    reserved = reserved - OLD.reserved,
+                    updated_at = now()
+                WHERE product_id = OLD.product_id;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO inventory.product_availability (product_id, quantity, reserved)
+                VALUES (NEW.product_id, NEW.quantity, NEW.reserved)
+                ON CONFLICT (product_id) DO UPDATE SET
+                    quantity = inventory.product_availability.quantity + EXCLUDED.quantity,
+                    reserved = inventory.product_availability.reserved + EXCLUDED.reserved,
+                    updated_at = now();
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_sync_product_availability ON inventory.stock;
+        CREATE TRIGGER trg_sync_product_availability
+        AFTER INSERT OR UPDATE OR DELETE ON inventory.stock
+        FOR EACH ROW EXECUTE FUNCTION inventory.sync_product_availability();
+    """)
+
+    # Backfill desde el stock actual
+    op.execute("""
+        INSERT INTO inventory.product_availability (product_id, quantity, reserved)
+        SELECT product_id, COALESCE(SUM(quantity), 0), COALESCE(SUM(reserved), 0)
+        FROM inventory.stock
+        GROUP BY product_id
+        ON CONFLICT (product_id) DO UPDATE SET
+            quantity = EXCLUDED.quantity,
+            reserved = EXCLUDED.reserved,
+            updated_at = now();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_sync_product_availability ON inventory.stock;
+        DROP FUNCTION IF EXISTS inventory.sync_product_availability();
+        DROP TABLE IF EXISTS inventory.product_availability;
+    """)
@@ -0,0 +1,41 @@
+"""Índices para paginación keyset de los listados del back-office.
+
+`list_orders`, `list_products` y `list_movements` ordenan por (fecha, id) y en
+modo cursor filtran con `(fecha, id) < (:v1, :v2)`. Con estos índices
+compuestos cada página es un range scan que arranca en la última fila vista.
+
+Revision ID: 0029_keyset_pagination_indexes
+Revises: 0028_product_availability
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0029_keyset_pagination_indexes"
+down_revision = "0028_product_availability"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_occurred_id
+        ON sales.orders (occurred_at DESC, id DESC);
+
+        CREATE INDEX IF NOT EXISTS idx_stock_movements_occurred_id
+        ON inventory.stock_movements (occurred_at DESC, id DESC);
+
+        CREATE INDEX IF NOT EXISTS idx_products_created_id
+        ON catalog.products (created_at DESC, id DESC)
+        WHERE deleted_at IS NULL;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP INDEX IF EXISTS catalog.idx_products_created_id;
+        DROP INDEX IF EXISTS inventory.idx_stock_movements_occurred_id;
+        DROP INDEX IF EXISTS sales.idx_orders_occurred_id;
+    """)
@@ -0,0 +1,84 @@
+"""sales.order_number_seq + sales.order_number_counters — consecutivo diario de órdenes.
+
+Reemplaza el `LIKE 'BP-YYYYMMDD-%' ORDER BY order_number DESC` que se hacía en
+cada checkout. Los números salen de una secuencia global (`nextval` no toma
+locks ni espera transacciones ajenas) y cada día guarda un desplazamiento:
+consecutivo del día = `nextval - seq_offset`. `sales.next_order_seq(día)`
+corre dentro de la transacción del checkout; solo la primera orden de cada día
+inserta la fila del desplazamiento (una orden concurrente de ese instante
+espera a que esa transacción termine).
+
+Unicidad: el desplazamiento sale de un `nextval` tomado antes de que la fila
+sea visible, así que todo `nextval` posterior es mayor (secuencia con CACHE 1,
+monótona entre sesiones). Si la orden falla queda un hueco; nunca un duplicado.
+
+El backfill siembra cada día con el mayor consecutivo ya emitido para no
+repetir números.
+
+Revision ID: 0030_order_number_counters
+Revises: 0029_keyset_pagination_indexes
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0030_order_number_counters"
+down_revision = "0029_keyset_pagination_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE SEQUENCE IF NOT EXISTS sales.order_number_seq AS BIGINT CACHE 1;
+
+        CREATE TABLE IF NOT EXISTS sales.order_number_counters (
+            day         DATE PRIMARY KEY,
+            seq_offset  BIGINT NOT NULL
+        );
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sales.next_order_seq(p_day DATE)
+        RETURNS INTEGER AS $$
+        DECLARE
+            v_offset BIGINT;
+        BEGIN
+            SELECT seq_offset INTO v_offset
+            FROM sales.order_number_counters WHERE day = p_day;
+            IF NOT FOUND THEN
+                -- Primera orden del día: el siguiente nextval será el consecutivo 1
+                INSERT INTO sales.order_number_counters (day, seq_offset)
+                VALUES (p_day, nextval('sales.order_number_seq'))
+                ON CONFLICT (day) DO NOTHING;
+                SELECT seq_offset INTO v_offset
+                FROM sales.order_number_counters WHERE day = p_day;
+            END IF;
+            RETURN nextval('sales.order_number_seq') - v_offset;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Días ya emitidos: el próximo nextval - desplazamiento queda por encima del máximo
+    op.execute("""
+        INSERT INTO sales.order_number_counters (day, seq_offset)
+        SELECT day, nextval('sales.order_number_seq') - max_seq
+        FROM (
+            SELECT to_date(substring(order_number FROM 4 FOR 8), 'YYYYMMDD') AS day,
+                   MAX(split_part(order_number, '-', 3)::int) AS max_seq
+            FROM sales.orders
+            WHERE order_number ~ '^BP-[0-9]{8}-[0-9]+$'
+            GROUP BY 1
+        ) emitidos
+        ON CONFLICT (day) DO NOTHING;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP FUNCTION IF EXISTS sales.next_order_seq(DATE);
+        DROP TABLE IF EXISTS sales.order_number_counters;
+        DROP SEQUENCE IF EXISTS sales.order_number_seq;
+    """)
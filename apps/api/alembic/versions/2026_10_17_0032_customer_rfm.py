@@ -0,0 +1,298 @@
+"""Motor RFM en SQL sobre crm.customers.
+
+Agrega a `crm.customers` las columnas que faltaban para servir
+/intelligence/overview sin recorrer todas las órdenes en cada request:
+primera/última compra, intervalo promedio entre compras, producto favorito,
+puntajes R/F/M (1-5), bandera "en riesgo" y fecha del último cálculo.
+
+- `crm.customer_rfm_metrics(cliente)`: recencia/frecuencia/monetario y
+  producto favorito (DISTINCT ON) por cliente, desde sales.orders/order_items.
+  Con NULL devuelve todos los clientes; función SQL inlineable.
+- `crm.refresh_customer_rfm(cliente)`: recalcula las métricas crudas de un
+  cliente. La llaman un trigger por fila sobre sales.orders (la última compra
+  queda al día apenas se factura: POS, puente del portal, ETL) y uno por
+  sentencia sobre sales.order_items: los ítems se insertan después de la orden,
+  así que el producto favorito solo se puede recalcular cuando ya están.
+- `crm.rebuild_customer_rfm(dias_riesgo)`: pasada completa en una sola
+  sentencia con funciones de ventana: métricas + puntajes por quintil +
+  segmento + bandera en riesgo. Los puntajes son relativos a toda la base, por
+  eso solo se recalculan aquí (job nocturno `python -m app.cli.recompute_rfm`).
+  Los segmentos son los que conoce el admin (`RFM_BADGE`): champion, loyal,
+  potential, at_risk y lost.
+
+Mismo criterio de orden válida que analytics: status distinto de
+'cancelled' y 'refunded'.
+
+Revision ID: 0032_customer_rfm
+Revises: 0031_sales_rollups
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0032_customer_rfm"
+down_revision = "0031_sales_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        ALTER TABLE crm.customers
+            ADD COLUMN IF NOT EXISTS rfm_first_order_at    TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS rfm_last_order_at     TIMESTAMPTZ,
+            ADD COLUMN IF NOT EXISTS rfm_avg_interval_days INTEGER,
+            ADD COLUMN IF NOT EXISTS rfm_favorite_product  VARCHAR(255),
+            ADD COLUMN IF NOT EXISTS rfm_r_score           SMALLINT,
+            ADD COLUMN IF NOT EXISTS rfm_f_score           SMALLINT,
+            ADD COLUMN IF NOT EXISTS rfm_m_score           SMALLINT,
+            ADD COLUMN IF NOT EXISTS rfm_at_risk           BOOLEAN NOT NULL DEFAULT false,
+            ADD COLUMN IF NOT EXISTS rfm_computed_at       TIMESTAMPTZ;
+
+        -- Listas de recompra / en riesgo: solo clientes con ≥2 compras
+        CREATE INDEX IF NOT EXISTS ix_customers_rfm_last_order_repeat
+            ON crm.customers (rfm_last_order_at)
+            WHERE rfm_frequency >= 2 AND deleted_at IS NULL;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION crm.customer_rfm_metrics(p_customer_id UUID)
+        RETURNS TABLE (
+            customer_id      UUID,
+            orders           INTEGER,
+            monetary         NUMERIC,
+            first_at         TIMESTAMPTZ,
+            last_at          TIMESTAMPTZ,
+            favorite_product VARCHAR
+        ) AS $$
+            WITH agg AS (
+                SELECT o.customer_id AS cid,
+                       COUNT(*)::int AS n_orders,
+                       COALESCE(SUM(o.grand_total), 0) AS total,
+                       MIN(o.occurred_at) AS first_at,
+                       MAX(o.occurred_at) AS last_at
+                FROM sales.orders o
+                WHERE o.customer_id IS NOT NULL
+                  AND o.status NOT IN ('cancelled', 'refunded')
+                  AND (p_customer_id IS NULL OR o.customer_id = p_customer_id)
+                GROUP BY o.customer_id
+            ),
+            fav AS (
+                -- Producto con más unidades históricas; empate → nombre
+                SELECT DISTINCT ON (o.customer_id)
+                       o.customer_id AS cid, i.name_snapshot AS product
+                FROM sales.orders o
+                JOIN sales.order_items i ON i.order_id = o.id
+                WHERE o.customer_id IS NOT NULL
+                  AND o.status NOT IN ('cancelled', 'refunded')
+                  AND (p_customer_id IS NULL OR o.customer_id = p_customer_id)
+                GROUP BY o.customer_id, i.name_snapshot
+                ORDER BY o.customer_id, SUM(i.quantity) DESC, i.name_snapshot
+            )
+            SELECT agg.cid, agg.n_orders, agg.total, agg.first_at, agg.last_at, fav.product
+            FROM agg
+            LEFT JOIN fav ON fav.cid = agg.cid;
+        $$ LANGUAGE sql STABLE;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION crm.refresh_customer_rfm(
+            p_customer_id UUID, p_at_risk_days INTEGER DEFAULT 60
+        ) RETURNS VOID AS $$
+        BEGIN
+            IF p_customer_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            UPDATE crm.customers c SET
+                rfm_frequency         = m.orders,
+                rfm_monetary          = m.monetary,
+                rfm_first_order_at    = m.first_at,
+                rfm_last_order_at     = m.last_at,
+                last_purchase_at      = (m.last_at AT TIME ZONE 'America/Bogota')::date,
+                rfm_recency_days      = floor(extract(epoch FROM now() - m.last_at) / 86400),
+                rfm_avg_interval_days = CASE WHEN m.orders >= 2 THEN GREATEST(
+                    round(GREATEST(floor(extract(epoch FROM m.last_at - m.first_at) / 86400), 1)
+                          / (m.orders - 1)), 7) END,
+                rfm_favorite_product  = m.favorite_product,
+                rfm_at_risk           = m.orders >= 2
+                                        AND now() - m.last_at >= make_interval(days => p_at_risk_days)
+            FROM crm.customer_rfm_metrics(p_customer_id) m
+            WHERE c.id = m.customer_id;
+
+            IF NOT FOUND THEN
+                -- Sin compras válidas (p.ej. se anuló la única orden)
+                UPDATE crm.customers SET
+                    rfm_frequency = NULL, rfm_monetary = NULL, rfm_recency_days = NULL,
+                    rfm_first_order_at = NULL, rfm_last_order_at = NULL,
+                    last_purchase_at = NULL, rfm_avg_interval_days = NULL,
+                    rfm_favorite_product = NULL, rfm_at_risk = false,
+                    rfm_r_score = NULL, rfm_f_score = NULL, rfm_m_score = NULL,
+                    rfm_segment = NULL
+                WHERE id = p_customer_id AND rfm_frequency IS NOT NULL;
+            END IF;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION crm.sync_customer_rfm_order() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM crm.refresh_customer_rfm(OLD.customer_id);
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                PERFORM crm.refresh_customer_rfm(NEW.customer_id);
+            ELSIF TG_OP = 'UPDATE' AND NEW.customer_id IS DISTINCT FROM OLD.customer_id THEN
+                PERFORM crm.refresh_customer_rfm(NEW.customer_id);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_customer_rfm_order ON sales.orders;
+        CREATE TRIGGER trg_customer_rfm_order
+        AFTER INSERT OR DELETE OR UPDATE OF customer_id, status, grand_total, occurred_at
+        ON sales.orders
+        FOR EACH ROW EXECUTE FUNCTION crm.sync_customer_rfm_order();
+
+        -- Ítems: una pasada por sentencia sobre los clientes de las órdenes
+        -- tocadas (un INSERT multi-fila del POS refresca una vez por cliente).
+        -- Las tablas de transición exigen un trigger por evento
+        CREATE OR REPLACE FUNCTION crm.sync_customer_rfm_items() RETURNS TRIGGER AS $$
+        DECLARE
+            v_order_ids UUID[];
+            v_customer  UUID;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                SELECT array_agg(DISTINCT order_id) INTO v_order_ids FROM new_items;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(DISTINCT order_id) INTO v_order_ids FROM old_items;
+            ELSE
+                SELECT array_agg(DISTINCT t.order_id) INTO v_order_ids
+                FROM (SELECT order_id FROM new_items UNION SELECT order_id FROM old_items) t;
+            END IF;
+
+            FOR v_customer IN
+                SELECT DISTINCT o.customer_id
+                FROM sales.orders o
+                WHERE o.id = ANY(v_order_ids) AND o.customer_id IS NOT NULL
+                ORDER BY o.customer_id
+            LOOP
+                PERFORM crm.refresh_customer_rfm(v_customer);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_ins ON sales.order_items;
+        CREATE TRIGGER trg_customer_rfm_items_ins
+        AFTER INSERT ON sales.order_items
+        REFERENCING NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION crm.sync_customer_rfm_items();
+
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_upd ON sales.order_items;
+        CREATE TRIGGER trg_customer_rfm_items_upd
+        AFTER UPDATE ON sales.order_items
+        REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+        FOR EACH STATEMENT EXECUTE FUNCTION crm.sync_customer_rfm_items();
+
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_del ON sales.order_items;
+        CREATE TRIGGER trg_customer_rfm_items_del
+        AFTER DELETE ON sales.order_items
+        REFERENCING OLD TABLE AS old_items
+        FOR EACH STATEMENT EXECUTE FUNCTION crm.sync_customer_rfm_items();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION crm.rebuild_customer_rfm(p_at_risk_days INTEGER DEFAULT 60)
+        RETURNS INTEGER AS $$
+        DECLARE
+            n INTEGER;
+        BEGIN
+            WITH scored AS (
+                SELECT m.*,
+                       LEAST(5, 1 + floor(5 * percent_rank() OVER (ORDER BY m.last_at)))::smallint
+                           AS r_score,
+                       LEAST(5, 1 + floor(5 * percent_rank() OVER (ORDER BY m.orders)))::smallint
+                           AS f_score,
+                       LEAST(5, 1 + floor(5 * percent_rank() OVER (ORDER BY m.monetary)))::smallint
+                           AS m_score
+                FROM crm.customer_rfm_metrics(NULL) m
+            )
+            UPDATE crm.customers c SET
+                rfm_frequency         = s.orders,
+                rfm_monetary          = s.monetary,
+                rfm_first_order_at    = s.first_at,
+                rfm_last_order_at     = s.last_at,
+                last_purchase_at      = (s.last_at AT TIME ZONE 'America/Bogota')::date,
+                rfm_recency_days      = floor(extract(epoch FROM now() - s.last_at) / 86400),
+                rfm_avg_interval_days = CASE WHEN s.orders >= 2 THEN GREATEST(
+                    round(GREATEST(floor(extract(epoch FROM s.last_at - s.first_at) / 86400), 1)
+                          / (s.orders - 1)), 7) END,
+                rfm_favorite_product  = s.favorite_product,
+                rfm_r_score           = s.r_score,
+                rfm_f_score           = s.f_score,
+                rfm_m_score           = s.m_score,
+                rfm_segment           = CASE
+                    WHEN s.r_score >= 4 AND s.f_score >= 4 THEN 'champion'
+                    WHEN s.r_score >= 3 AND s.f_score >= 3 THEN 'loyal'
+                    -- Recientes con pocas compras (incluye los nuevos)
+                    WHEN s.r_score >= 3 THEN 'potential'
+                    -- Recurrentes que dejaron de venir (incluye los de alto valor)
+                    WHEN s.orders >= 2 THEN 'at_risk'
+                    ELSE 'lost'
+                END,
+                rfm_at_risk           = s.orders >= 2
+                                        AND now() - s.last_at >= make_interval(days => p_at_risk_days),
+                rfm_computed_at       = now()
+            FROM scored s
+            WHERE c.id = s.customer_id;
+            GET DIAGNOSTICS n = ROW_COUNT;
+
+            -- Clientes que ya no tienen compras válidas
+            UPDATE crm.customers c SET
+                rfm_frequency = NULL, rfm_monetary = NULL, rfm_recency_days = NULL,
+                rfm_first_order_at = NULL, rfm_last_order_at = NULL,
+                last_purchase_at = NULL, rfm_avg_interval_days = NULL,
+                rfm_favorite_product = NULL, rfm_at_risk = false,
+                rfm_r_score = NULL, rfm_f_score = NULL, rfm_m_score = NULL,
+                rfm_segment = NULL, rfm_computed_at = now()
+            WHERE c.rfm_frequency IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM sales.orders o
+                  WHERE o.customer_id = c.id AND o.status NOT IN ('cancelled', 'refunded')
+              );
+
+            RETURN n;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Cálculo inicial
+    op.execute("SELECT crm.rebuild_customer_rfm();")
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_del ON sales.order_items;
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_upd ON sales.order_items;
+        DROP TRIGGER IF EXISTS trg_customer_rfm_items_ins ON sales.order_items;
+        DROP TRIGGER IF EXISTS trg_customer_rfm_order ON sales.orders;
+        DROP FUNCTION IF EXISTS crm.rebuild_customer_rfm(INTEGER);
+        DROP FUNCTION IF EXISTS crm.sync_customer_rfm_items();
+        DROP FUNCTION IF EXISTS crm.sync_customer_rfm_order();
+        DROP FUNCTION IF EXISTS crm.refresh_customer_rfm(UUID, INTEGER);
+        DROP FUNCTION IF EXISTS crm.customer_rfm_metrics(UUID);
+        DROP INDEX IF EXISTS crm.ix_customers_rfm_last_order_repeat;
+        ALTER TABLE crm.customers
+            DROP COLUMN IF EXISTS rfm_computed_at,
+            DROP COLUMN IF EXISTS rfm_at_risk,
+            DROP COLUMN IF EXISTS rfm_m_score,
+            DROP COLUMN IF EXISTS rfm_f_score,
+            DROP COLUMN IF EXISTS rfm_r_score,
+            DROP COLUMN IF EXISTS rfm_favorite_product,
+            DROP COLUMN IF EXISTS rfm_avg_interval_days,
+            DROP COLUMN IF EXISTS rfm_last_order_at,
+            DROP COLUMN IF EXISTS rfm_first_order_at;
+    """)
@@ -0,0 +1,240 @@
+"""Matriz de co-compra de productos ("se compra junto con").
+
+- `sales.product_copurchase`: par (producto, otro producto) → órdenes válidas
+  que contienen ambos. Se guarda en las dos direcciones para que el top-k de un
+  producto sea un range scan de `ix_product_copurchase_top`.
+- `sales.product_order_counts`: producto → órdenes válidas que lo contienen
+  (denominador de confianza/lift).
+
+Igual que los rollups (0031), los mantienen triggers sobre sales.orders y
+sales.order_items que aplican solo el delta: al entrar una línea con un
+producto nuevo para la orden se suma el par con cada producto distinto que ya
+estaba; al anular/reembolsar/borrar la orden se restan todos sus pares. Un
+producto repetido en varias líneas de la misma orden cuenta una vez. Los
+checkouts que comparten productos ya se serializan por el lock de stock (en
+orden de product_id), así que los upserts de pares no se cruzan.
+
+`sales.rebuild_product_copurchase()` recalcula todo desde las tablas fuente;
+lo usa el backfill de abajo y `python -m app.cli.rebuild_copurchase`.
+
+Revision ID: 0033_product_copurchase
+Revises: 0032_customer_rfm
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0033_product_copurchase"
+down_revision = "0032_customer_rfm"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS sales.product_copurchase (
+            product_id        UUID NOT NULL,
+            other_product_id  UUID NOT NULL,
+            orders            INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (product_id, other_product_id)
+        );
+        CREATE INDEX IF NOT EXISTS ix_product_copurchase_top
+            ON sales.product_copurchase (product_id, orders DESC)
+            INCLUDE (other_product_id);
+
+        CREATE TABLE IF NOT EXISTS sales.product_order_counts (
+            product_id  UUID PRIMARY KEY,
+            orders      INTEGER NOT NULL DEFAULT 0
+        );
+    """)
+
+    op.execute("""
+        -- Suma/resta el producto p_product_id a la canasta de la orden: un par
+        -- por cada OTRO producto distinto presente en la orden (ambas direcciones)
+        CREATE OR REPLACE FUNCTION sales.copurchase_apply_product(
+            p_order_id UUID, p_product_id UUID, p_sign INTEGER
+        ) RETURNS VOID AS $$
+        BEGIN
+            IF p_product_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            INSERT INTO sales.product_order_counts (product_id, orders)
+            VALUES (p_product_id, p_sign)
+            ON CONFLICT (product_id) DO UPDATE SET
+                orders = sales.product_order_counts.orders + EXCLUDED.orders;
+
+            INSERT INTO sales.product_copurchase (product_id, other_product_id, orders)
+            SELECT pair.a, pair.b, p_sign
+            FROM (
+                SELECT DISTINCT i.product_id AS other
+                FROM sales.order_items i
+                WHERE i.order_id = p_order_id
+                  AND i.product_id IS NOT NULL
+                  AND i.product_id <> p_product_id
+            ) o
+            CROSS JOIN LATERAL (
+                VALUES (p_product_id, o.other), (o.other, p_product_id)
+            ) AS pair(a, b)
+            ORDER BY pair.a, pair.b
+            ON CONFLICT (product_id, other_product_id) DO UPDATE SET
+                orders = sales.product_copurchase.orders + EXCLUDED.orders;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- Suma/resta la canasta completa de una orden
+        CREATE OR REPLACE FUNCTION sales.copurchase_apply_order(p_order_id UUID, p_sign INTEGER)
+        RETURNS VOID AS $$
+        BEGIN
+            INSERT INTO sales.product_order_counts (product_id, orders)
+            SELECT DISTINCT i.product_id, p_sign
+            FROM sales.order_items i
+            WHERE i.order_id = p_order_id AND i.product_id IS NOT NULL
+            ORDER BY 1
+            ON CONFLICT (product_id) DO UPDATE SET
+                orders = sales.product_order_counts.orders + EXCLUDED.orders;
+
+            INSERT INTO sales.product_copurchase (product_id, other_product_id, orders)
+            SELECT a.product_id, b.product_id, p_sign
+            FROM (SELECT DISTINCT product_id FROM sales.order_items
+                  WHERE order_id = p_order_id AND product_id IS NOT NULL) a
+            JOIN (SELECT DISTINCT product_id FROM sales.order_items
+                  WHERE order_id = p_order_id AND product_id IS NOT NULL) b
+              ON b.product_id <> a.product_id
+            ORDER BY 1, 2
+            ON CONFLICT (product_id, other_product_id) DO UPDATE SET
+                orders = sales.product_copurchase.orders + EXCLUDED.orders;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sales.sync_copurchase_order()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            was_valid BOOLEAN;
+            is_valid BOOLEAN;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                -- BEFORE DELETE: los ítems todavía existen (el CASCADE corre después)
+                IF OLD.status NOT IN ('cancelled', 'refunded') THEN
+                    PERFORM sales.copurchase_apply_order(OLD.id, -1);
+                END IF;
+                RETURN OLD;
+            END IF;
+
+            -- UPDATE: solo importa si la orden entra o sale del conjunto válido
+            was_valid := OLD.status NOT IN ('cancelled', 'refunded');
+            is_valid := NEW.status NOT IN ('cancelled', 'refunded');
+            IF was_valid AND NOT is_valid THEN
+                PERFORM sales.copurchase_apply_order(NEW.id, -1);
+            ELSIF is_valid AND NOT was_valid THEN
+                PERFORM sales.copurchase_apply_order(NEW.id, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION sales.sync_copurchase_item()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            o_status VARCHAR;
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.product_id IS NOT NULL THEN
+                -- Si la orden ya no existe (DELETE en cascada) su trigger ya restó la canasta
+                SELECT status INTO o_status FROM sales.orders WHERE id = OLD.order_id;
+                IF FOUND AND o_status NOT IN ('cancelled', 'refunded')
+                   AND NOT EXISTS (
+                       SELECT 1 FROM sales.order_items
+                       WHERE order_id = OLD.order_id AND product_id = OLD.product_id
+                   ) THEN
+                    PERFORM sales.copurchase_apply_product(OLD.order_id, OLD.product_id, -1);
+                END IF;
+            END IF;
+
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.product_id IS NOT NULL THEN
+                SELECT status INTO o_status FROM sales.orders WHERE id = NEW.order_id;
+                IF FOUND AND o_status NOT IN ('cancelled', 'refunded')
+                   AND NOT EXISTS (
+                       SELECT 1 FROM sales.order_items
+                       WHERE order_id = NEW.order_id AND product_id = NEW.product_id
+                         AND id <> NEW.id
+                   ) THEN
+                    PERFORM sales.copurchase_apply_product(NEW.order_id, NEW.product_id, 1);
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_copurchase_order ON sales.orders;
+        CREATE TRIGGER trg_copurchase_order
+        AFTER UPDATE OF status ON sales.orders
+        FOR EACH ROW EXECUTE FUNCTION sales.sync_copurchase_order();
+
+        DROP TRIGGER IF EXISTS trg_copurchase_order_delete ON sales.orders;
+        CREATE TRIGGER trg_copurchase_order_delete
+        BEFORE DELETE ON sales.orders
+        FOR EACH ROW EXECUTE FUNCTION sales.sync_copurchase_order();
+
+        DROP TRIGGER IF EXISTS trg_copurchase_item ON sales.order_items;
+        CREATE TRIGGER trg_copurchase_item
+        AFTER INSERT OR DELETE OR UPDATE OF order_id, product_id ON sales.order_items
+        FOR EACH ROW EXECUTE FUNCTION sales.sync_copurchase_item();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sales.rebuild_product_copurchase()
+        RETURNS INTEGER AS $$
+        DECLARE
+            n INTEGER;
+        BEGIN
+            LOCK TABLE sales.product_copurchase, sales.product_order_counts
+                IN SHARE ROW EXCLUSIVE MODE;
+
+            DELETE FROM sales.product_copurchase;
+            DELETE FROM sales.product_order_counts;
+
+            CREATE TEMP TABLE _basket ON COMMIT DROP AS
+            SELECT DISTINCT i.order_id, i.product_id
+            FROM sales.order_items i
+            JOIN sales.orders o ON o.id = i.order_id
+            WHERE o.status NOT IN ('cancelled', 'refunded')
+              AND i.product_id IS NOT NULL;
+            CREATE INDEX ON _basket (order_id);
+
+            INSERT INTO sales.product_order_counts (product_id, orders)
+            SELECT product_id, COUNT(*) FROM _basket GROUP BY product_id;
+
+            INSERT INTO sales.product_copurchase (product_id, other_product_id, orders)
+            SELECT a.product_id, b.product_id, COUNT(*)
+            FROM _basket a
+            JOIN _basket b ON b.order_id = a.order_id AND b.product_id <> a.product_id
+            GROUP BY a.product_id, b.product_id;
+            GET DIAGNOSTICS n = ROW_COUNT;
+
+            DROP TABLE _basket;
+            RETURN n;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Backfill de todo el histórico
+    op.execute("SELECT sales.rebuild_product_copurchase();")
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_copurchase_item ON sales.order_items;
+        DROP TRIGGER IF EXISTS trg_copurchase_order_delete ON sales.orders;
+        DROP TRIGGER IF EXISTS trg_copurchase_order ON sales.orders;
+        DROP FUNCTION IF EXISTS sales.rebuild_product_copurchase();
+        DROP FUNCTION IF EXISTS sales.sync_copurchase_item();
+        DROP FUNCTION IF EXISTS sales.sync_copurchase_order();
+        DROP FUNCTION IF EXISTS sales.copurchase_apply_order(UUID, INTEGER);
+        DROP FUNCTION IF EXISTS sales.copurchase_apply_product(UUID, UUID, INTEGER);
+        DROP TABLE IF EXISTS sales.product_order_counts;
+        DROP TABLE IF EXISTS sales.product_copurchase;
+    """)
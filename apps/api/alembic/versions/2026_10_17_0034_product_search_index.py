@@ -0,0 +1,52 @@
+"""Índice de búsqueda de productos para /v1/search.
+
+- `catalog.f_unaccent(text)`: envoltorio IMMUTABLE de unaccent (la función
+  de la extensión es STABLE y no se puede usar en columnas generadas ni
+  índices).
+- `catalog.products.search_text`: columna generada con nombre + marca en
+  minúsculas y sin tildes ("Purina Pro Plan Cachorro purina").
+- GIN trigram sobre `search_text` y sobre `sku`: sirven a los operadores
+  `%`, `<%` e `ILIKE '%…%'` de pg_trgm, así la búsqueda no recorre la tabla.
+
+Revision ID: 0034_product_search_index
+Revises: 0033_product_copurchase
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0034_product_search_index"
+down_revision = "0033_product_copurchase"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent;")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalog.f_unaccent(TEXT) RETURNS TEXT AS $$
+            SELECT public.unaccent('public.unaccent'::regdictionary, $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT;
+    """)
+    op.execute("""
+        ALTER TABLE catalog.products
+            ADD COLUMN IF NOT EXISTS search_text TEXT GENERATED ALWAYS AS (
+                catalog.f_unaccent(lower(name || ' ' || COALESCE(brand_normalized, '')))
+            ) STORED;
+
+        CREATE INDEX IF NOT EXISTS ix_products_search_text_trgm
+            ON catalog.products USING GIN (search_text gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_products_sku_trgm
+            ON catalog.products USING GIN (sku gin_trgm_ops);
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP INDEX IF EXISTS catalog.ix_products_sku_trgm;
+        DROP INDEX IF EXISTS catalog.ix_products_search_text_trgm;
+        ALTER TABLE catalog.products DROP COLUMN IF EXISTS search_text;
+        DROP FUNCTION IF EXISTS catalog.f_unaccent(TEXT);
+    """)
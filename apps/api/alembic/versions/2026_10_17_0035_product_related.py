@@ -0,0 +1,119 @@
+"""Vecinos precalculados de cada producto (/products/{id}/related).
+
+- `catalog.product_related`: (producto, rank) → producto relacionado + score.
+  La PK `(product_id, rank)` deja la lectura de la ficha como un range scan.
+- `catalog.rebuild_product_related(p_product_id, p_top_n)`: recalcula el
+  top-N de un producto (o de todos si p_product_id es NULL) puntuando cada
+  candidato publicado por:
+    * misma categoría                       +3
+    * misma marca                           +1.5
+    * health_concerns en común              +0.75 por cada una (máx. 3)
+    * precio dentro de la banda 0.6x-1.6x   +1
+    * co-compra (sales.product_copurchase)  +1.5 * ln(1 + órdenes juntos)
+    * especie incompatible (perro vs gato)  -2
+  Solo entran candidatos con al menos una señal (categoría, marca, co-compra
+  o health_concerns), así no se compara todo el catálogo contra todo.
+
+Lo corre cada noche `python -m app.cli.rebuild_related` y, para un producto,
+los endpoints que lo crean o modifican.
+
+Revision ID: 0035_product_related
+Revises: 0034_product_search_index
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0035_product_related"
+down_revision = "0034_product_search_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS catalog.product_related (
+            product_id          UUID NOT NULL,
+            rank                SMALLINT NOT NULL,
+            related_product_id  UUID NOT NULL,
+            score               REAL NOT NULL,
+            computed_at         TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (product_id, rank)
+        );
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalog.rebuild_product_related(
+            p_product_id UUID DEFAULT NULL, p_top_n INTEGER DEFAULT 12
+        ) RETURNS INTEGER AS $$
+        DECLARE
+            n INTEGER;
+        BEGIN
+            IF p_product_id IS NULL THEN
+                LOCK TABLE catalog.product_related IN SHARE ROW EXCLUSIVE MODE;
+                DELETE FROM catalog.product_related;
+            ELSE
+                DELETE FROM catalog.product_related WHERE product_id = p_product_id;
+            END IF;
+
+            INSERT INTO catalog.product_related (product_id, rank, related_product_id, score)
+            SELECT p.id, r.rank, r.id, r.score
+            FROM catalog.products p
+            CROSS JOIN LATERAL (
+                SELECT c.id, s.score,
+                       row_number() OVER (
+                           ORDER BY s.score DESC, c.is_featured DESC, c.id
+                       )::SMALLINT AS rank
+                FROM catalog.products c
+                LEFT JOIN sales.product_copurchase cp
+                  ON cp.product_id = p.id AND cp.other_product_id = c.id AND cp.orders > 0
+                CROSS JOIN LATERAL (
+                    SELECT
+                        CASE WHEN c.category_id = p.category_id THEN 3 ELSE 0 END
+                      + CASE WHEN c.brand_id = p.brand_id THEN 1.5 ELSE 0 END
+                      + 0.75 * LEAST(3, COALESCE(cardinality(ARRAY(
+                            SELECT unnest(c.health_concerns)
+                            INTERSECT
+                            SELECT unnest(p.health_concerns)
+                        )), 0))
+                      + CASE WHEN p.price > 0
+                                  AND c.price BETWEEN p.price * 0.6 AND p.price * 1.6
+                             THEN 1 ELSE 0 END
+                      + COALESCE(1.5 * ln(1 + cp.orders), 0)
+                      - CASE WHEN p.pet_type <> c.pet_type
+                                  AND 'both' NOT IN (p.pet_type, c.pet_type)
+                             THEN 2 ELSE 0 END
+                    AS score
+                ) s
+                WHERE c.id <> p.id
+                  AND c.deleted_at IS NULL
+                  AND c.is_active
+                  AND c.is_published
+                  AND (
+                      c.category_id = p.category_id
+                      OR c.brand_id = p.brand_id
+                      OR cp.orders IS NOT NULL
+                      OR c.health_concerns && p.health_concerns
+                  )
+                ORDER BY s.score DESC, c.is_featured DESC, c.id
+                LIMIT p_top_n
+            ) r
+            WHERE p.deleted_at IS NULL
+              AND (p_product_id IS NULL OR p.id = p_product_id);
+            GET DIAGNOSTICS n = ROW_COUNT;
+            RETURN n;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Backfill inicial
+    op.execute("SELECT catalog.rebuild_product_related();")
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP FUNCTION IF EXISTS catalog.rebuild_product_related(UUID, INTEGER);
+        DROP TABLE IF EXISTS catalog.product_related;
+    """)
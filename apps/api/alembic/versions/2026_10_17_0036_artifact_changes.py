@@ -0,0 +1,94 @@
+"""Cola de cambios para artefactos públicos precalculados (feed de catálogo).
+
+- `catalog.artifact_changes`: una fila por cambio que invalida un artefacto
+  (`artifact` = nombre, p.ej. 'products_feed'). Es append-only: los triggers
+  solo insertan, así dos checkouts que agotan productos distintos no se
+  bloquean en una fila contador compartida.
+- `catalog.mark_artifacts_changed()`: función de trigger; encola una fila por
+  cada nombre recibido en los argumentos del trigger.
+
+El generador (`app.services.artifacts`) lee los ids pendientes antes de leer
+los datos y, al publicar la nueva versión, borra exactamente esos ids: un cambio
+que se confirme a mitad de la generación queda en la cola para la siguiente.
+
+Triggers del feed de productos:
+- catalog.products / brands / categories: a nivel de sentencia (una fila por
+  UPDATE masivo del ETL, no una por producto);
+- inventory.product_availability: solo cuando el producto entra o sale de
+  stock (el feed publica disponibilidad, no cantidades).
+
+Revision ID: 0036_artifact_changes
+Revises: 0035_product_related
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0036_artifact_changes"
+down_revision = "0035_product_related"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS catalog.artifact_changes (
+            id          BIGSERIAL PRIMARY KEY,
+            artifact    TEXT NOT NULL,
+            changed_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS ix_artifact_changes_artifact
+            ON catalog.artifact_changes (artifact);
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalog.mark_artifacts_changed()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO catalog.artifact_changes (artifact)
+            SELECT unnest(TG_ARGV);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_artifacts_products ON catalog.products;
+        CREATE TRIGGER trg_artifacts_products
+        AFTER INSERT OR UPDATE OR DELETE ON catalog.products
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('products_feed');
+
+        DROP TRIGGER IF EXISTS trg_artifacts_brands ON catalog.brands;
+        CREATE TRIGGER trg_artifacts_brands
+        AFTER INSERT OR UPDATE OR DELETE ON catalog.brands
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('products_feed');
+
+        DROP TRIGGER IF EXISTS trg_artifacts_categories ON catalog.categories;
+        CREATE TRIGGER trg_artifacts_categories
+        AFTER INSERT OR UPDATE OR DELETE ON catalog.categories
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('products_feed');
+
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_ins ON inventory.product_availability;
+        CREATE TRIGGER trg_artifacts_availability_ins
+        AFTER INSERT ON inventory.product_availability
+        FOR EACH ROW WHEN (NEW.quantity > 0)
+        EXECUTE FUNCTION catalog.mark_artifacts_changed('products_feed');
+
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_upd ON inventory.product_availability;
+        CREATE TRIGGER trg_artifacts_availability_upd
+        AFTER UPDATE OF quantity ON inventory.product_availability
+        FOR EACH ROW WHEN ((OLD.quantity > 0) IS DISTINCT FROM (NEW.quantity > 0))
+        EXECUTE FUNCTION catalog.mark_artifacts_changed('products_feed');
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_upd ON inventory.product_availability;
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_ins ON inventory.product_availability;
+        DROP TRIGGER IF EXISTS trg_artifacts_categories ON catalog.categories;
+        DROP TRIGGER IF EXISTS trg_artifacts_brands ON catalog.brands;
+        DROP TRIGGER IF EXISTS trg_artifacts_products ON catalog.products;
+        DROP FUNCTION IF EXISTS catalog.mark_artifacts_changed();
+        DROP TABLE IF EXISTS catalog.artifact_changes;
+    """)
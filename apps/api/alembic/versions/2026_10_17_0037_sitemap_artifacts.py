@@ -0,0 +1,82 @@
+"""Triggers de cambios para los sitemaps precalculados.
+
+Cada tipo de sitemap es un artefacto propio (`sitemap_products`,
+`sitemap_categories`, `sitemap_posts`, `sitemap_landings`), así un cambio en
+un post solo regenera los shards de posts. Encolan en `catalog.artifact_changes`
+(migración 0036) con la misma función `catalog.mark_artifacts_changed()`.
+
+Los UPDATE solo cuentan si tocan columnas que salen en el sitemap (slug,
+visibilidad, updated_at): el contador de vistas de los posts o el rating de
+los productos no regeneran nada. Los triggers de disponibilidad se rehacen para
+avisar también al sitemap de productos cuando uno entra o sale de stock.
+
+Revision ID: 0037_sitemap_artifacts
+Revises: 0036_artifact_changes
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0037_sitemap_artifacts"
+down_revision = "0036_artifact_changes"
+branch_labels = None
+depends_on = None
+
+
+def _availability_triggers(*artifacts: str) -> str:
+    args = ", ".join(f"'{a}'" for a in artifacts)
+    return f"""
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_ins ON inventory.product_availability;
+        CREATE TRIGGER trg_artifacts_availability_ins
+        AFTER INSERT ON inventory.product_availability
+        FOR EACH ROW WHEN (NEW.quantity > 0)
+        EXECUTE FUNCTION catalog.mark_artifacts_changed({args});
+
+        DROP TRIGGER IF EXISTS trg_artifacts_availability_upd ON inventory.product_availability;
+        CREATE TRIGGER trg_artifacts_availability_upd
+        AFTER UPDATE OF quantity ON inventory.product_availability
+        FOR EACH ROW WHEN ((OLD.quantity > 0) IS DISTINCT FROM (NEW.quantity > 0))
+        EXECUTE FUNCTION catalog.mark_artifacts_changed({args});
+    """
+
+
+def upgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_sitemap_products ON catalog.products;
+        CREATE TRIGGER trg_sitemap_products
+        AFTER INSERT OR DELETE OR UPDATE OF slug, is_published, deleted_at, updated_at
+        ON catalog.products
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('sitemap_products');
+
+        DROP TRIGGER IF EXISTS trg_sitemap_categories ON catalog.categories;
+        CREATE TRIGGER trg_sitemap_categories
+        AFTER INSERT OR DELETE OR UPDATE OF slug, is_active, updated_at
+        ON catalog.categories
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('sitemap_categories');
+
+        DROP TRIGGER IF EXISTS trg_sitemap_posts ON content.blog_posts;
+        CREATE TRIGGER trg_sitemap_posts
+        AFTER INSERT OR DELETE OR UPDATE OF slug, published_at, updated_at
+        ON content.blog_posts
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('sitemap_posts');
+
+        DROP TRIGGER IF EXISTS trg_sitemap_landings ON content.seo_landings;
+        CREATE TRIGGER trg_sitemap_landings
+        AFTER INSERT OR DELETE OR UPDATE OF slug, is_active, updated_at
+        ON content.seo_landings
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog.mark_artifacts_changed('sitemap_landings');
+    """)
+    op.execute(_availability_triggers("products_feed", "sitemap_products"))
+
+
+def downgrade() -> None:
+    op.execute(_availability_triggers("products_feed"))
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_sitemap_landings ON content.seo_landings;
+        DROP TRIGGER IF EXISTS trg_sitemap_posts ON content.blog_posts;
+        DROP TRIGGER IF EXISTS trg_sitemap_categories ON catalog.categories;
+        DROP TRIGGER IF EXISTS trg_sitemap_products ON catalog.products;
+        DELETE FROM catalog.artifact_changes WHERE artifact LIKE 'sitemap_%';
+    """)
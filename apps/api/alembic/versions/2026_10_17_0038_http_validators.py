@@ -0,0 +1,61 @@
+"""Soporte para ETags de los endpoints públicos de catálogo.
+
+Los validadores de `services.http_cache.conditional` leen `max(updated_at)`
+de productos y disponibilidad en cada request condicional; estos índices los
+dejan en una lectura del extremo del btree.
+
+El trigger de rating (0016) actualiza `rating_avg`/`rating_count` sin tocar
+`updated_at`; `trg_products_rating_touch` lo mueve para que una reseña
+aprobada cambie la ETag de la ficha y del catálogo.
+
+Revision ID: 0038_http_validators
+Revises: 0037_sitemap_artifacts
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0038_http_validators"
+down_revision = "0037_sitemap_artifacts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_products_updated_at
+            ON catalog.products (updated_at);
+        CREATE INDEX IF NOT EXISTS ix_product_availability_updated_at
+            ON inventory.product_availability (updated_at);
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION catalog.touch_updated_at()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at := now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_products_rating_touch ON catalog.products;
+        CREATE TRIGGER trg_products_rating_touch
+        BEFORE UPDATE OF rating_avg, rating_count, rating_distribution ON catalog.products
+        FOR EACH ROW
+        WHEN (
+            OLD.rating_avg IS DISTINCT FROM NEW.rating_avg
+            OR OLD.rating_count IS DISTINCT FROM NEW.rating_count
+            OR OLD.rating_distribution IS DISTINCT FROM NEW.rating_distribution
+        )
+        EXECUTE FUNCTION catalog.touch_updated_at();
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        DROP TRIGGER IF EXISTS trg_products_rating_touch ON catalog.products;
+        DROP FUNCTION IF EXISTS catalog.touch_updated_at();
+        DROP INDEX IF EXISTS inventory.ix_product_availability_updated_at;
+        DROP INDEX IF EXISTS catalog.ix_products_updated_at;
+    """)
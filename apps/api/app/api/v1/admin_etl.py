@@ -24,6 +24,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 
 from app.deps import DBSession, require_superadmin
+from app.services.catalog_events import publish_product_changes
+from app.services.response_cache import invalidate
 
 router = APIRouter(prefix="/admin/etl", tags=["admin-etl"])
 
@@ -879,6 +881,9 @@ async def run_sheets_etl(
 
     completed = datetime.now(UTC)
     duration = (completed - started).total_seconds()
+    await publish_product_changes()
+    # El ETL escribe ventas, clientes, inventario, compras y gastos
+    await invalidate("sales", "customers", "inventory", "purchases", "expenses")
 
     reports_out = {k: TabReport(**v) for k, v in result["reports"].items()}
 
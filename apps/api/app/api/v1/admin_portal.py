@@ -31,6 +31,7 @@ from app.services.portal_order_actions import (
     process_referral_reward,
     queue_customer_notification,
 )
+from app.services.response_cache import invalidate
 
 router = APIRouter(
     prefix="/admin/portal",
@@ -62,22 +63,14 @@ def _pet_name_subquery(db_session):
 
 
 async def _stock_availability(db: DBSession, product_ids: set[uuid.UUID]) -> dict[uuid.UUID, int]:
-    """Suma inventory.Stock.quantity por producto (todas las ubicaciones).
+    """Cantidad física por producto (todas las ubicaciones).
 
-    Una sola query agrupada — evita N+1 al revisar disponibilidad de varios pedidos.
+    Lookup por PK en inventory.product_availability — evita N+1 y la agregación
+    de inventory.stock al revisar disponibilidad de varios pedidos.
     """
-    if not product_ids:
-        return {}
-    from app.models.inventory import Stock
+    from app.services.stock_availability import stock_quantities
 
-    rows = (
-        await db.execute(
-            select(Stock.product_id, func.sum(Stock.quantity))
-            .where(Stock.product_id.in_(product_ids))
-            .group_by(Stock.product_id)
-        )
-    ).all()
-    return {pid: int(total or 0) for pid, total in rows}
+    return await stock_quantities(db, product_ids)
 
 
 # ── endpoints ─────────────────────────────────────────────────────────────────
@@ -372,6 +365,8 @@ async def update_portal_order(
         )
 
     await db.commit()
+    if new_status == "invoiced":
+        await invalidate("sales", "inventory")
     await db.refresh(order)
     return {"ok": True, "id": str(order.id), "status": order.status}
 
@@ -836,6 +831,8 @@ async def change_workflow_status(
         db, order_id, "status_changed", changes={"workflow_status": {"before": old, "after": new}}
     )
     await db.commit()
+    if new == "invoiced":
+        await invalidate("sales", "inventory")
 
     result: dict = {"ok": True, "workflow_status": new}
     if pending_notif:
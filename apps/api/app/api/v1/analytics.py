@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
 
 from fastapi import APIRouter, Depends, Query
 from pydantic import BaseModel
@@ -13,7 +14,8 @@ from app.models.catalog import Category, Product
 from app.models.crm import Customer
 from app.models.inventory import Stock
 from app.models.ops import LegacyIdMap
-from app.models.sales import Order, OrderItem, Payment
+from app.models.sales import Order, OrderItem, SalesRollupCategoryDaily, SalesRollupHourly
+from app.services.response_cache import cached
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -64,43 +66,21 @@ async def get_dashboard(db: DBSession) -> DashboardOut:
     start_prev = (start_month - timedelta(days=1)).replace(day=1)
     end_prev = start_month
 
-    # Revenue mes actual
-    rev_month = (
+    # Revenue y órdenes de mes actual y anterior en una sola pasada sobre el rollup
+    # horario (las órdenes cuentan reembolsadas, el revenue no)
+    hourly = SalesRollupHourly
+    in_month = hourly.hour >= start_month
+    in_prev = (hourly.hour >= start_prev) & (hourly.hour < end_prev)
+    rev_month, rev_prev, ord_month, ord_prev = (
         await db.execute(
-            select(func.coalesce(func.sum(Order.grand_total), 0))
-            .where(Order.occurred_at >= start_month)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-        )
-    ).scalar_one()
-
-    # Revenue mes anterior
-    rev_prev = (
-        await db.execute(
-            select(func.coalesce(func.sum(Order.grand_total), 0))
-            .where(Order.occurred_at >= start_prev)
-            .where(Order.occurred_at < end_prev)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-        )
-    ).scalar_one()
-
-    # Órdenes mes actual
-    ord_month = (
-        await db.execute(
-            select(func.count(Order.id))
-            .where(Order.occurred_at >= start_month)
-            .where(Order.status.notin_(["cancelled"]))
-        )
-    ).scalar_one()
-
-    # Órdenes mes anterior
-    ord_prev = (
-        await db.execute(
-            select(func.count(Order.id))
-            .where(Order.occurred_at >= start_prev)
-            .where(Order.occurred_at < end_prev)
-            .where(Order.status.notin_(["cancelled"]))
+            select(
+                func.coalesce(func.sum(hourly.revenue).filter(in_month), 0),
+                func.coalesce(func.sum(hourly.revenue).filter(in_prev), 0),
+                func.coalesce(func.sum(hourly.orders + hourly.refunded_orders).filter(in_month), 0),
+                func.coalesce(func.sum(hourly.orders + hourly.refunded_orders).filter(in_prev), 0),
+            ).where(hourly.hour >= start_prev)
         )
-    ).scalar_one()
+    ).one()
 
     # Productos activos
     prod_active = (
@@ -135,17 +115,16 @@ async def get_dashboard(db: DBSession) -> DashboardOut:
     avg_ticket = float(rev_month) / ord_month if ord_month else 0
 
     # Ventas diarias últimos 30 días
-    since_30 = now - timedelta(days=30)
-    day_trunc = func.date_trunc("day", Order.occurred_at)
+    since_30 = (now - timedelta(days=30)).replace(minute=0, second=0, microsecond=0)
+    day_trunc = func.date_trunc("day", hourly.hour)
     daily_rows = (
         await db.execute(
             select(
                 day_trunc.label("day"),
-                func.sum(Order.grand_total).label("revenue"),
-                func.count(Order.id).label("orders"),
+                func.sum(hourly.revenue).label("revenue"),
+                func.sum(hourly.orders).label("orders"),
             )
-            .where(Order.occurred_at >= since_30)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
+            .where(hourly.hour >= since_30)
             .group_by(day_trunc)
             .order_by(day_trunc)
         )
@@ -361,6 +340,7 @@ class BiFull(BaseModel):
     response_model=BiFull,
     dependencies=[Depends(require_permission("analytics:read"))],
 )
+@cached("analytics:bi", ttl=300, tags=("sales", "expenses"))
 async def get_bi_full(
     db: DBSession,
     days: int = Query(90, ge=7, le=730),
@@ -368,30 +348,24 @@ async def get_bi_full(
     now = datetime.now(UTC)
     since = now - timedelta(days=days)
 
-    # ── Revenue & orders totals ────────────────────────────────
-    rev_total, ord_total = (
+    # Todo lo que no es por cliente sale del rollup horario: costo constante en la
+    # cantidad de órdenes del período, solo depende de las horas con ventas.
+    hourly = SalesRollupHourly
+    since_hour = since.replace(minute=0, second=0, microsecond=0)
+
+    # ── Revenue, orders & COGS totals ──────────────────────────
+    rev_total, ord_total, cogs_result = (
         await db.execute(
             select(
-                func.coalesce(func.sum(Order.grand_total), 0),
-                func.count(Order.id),
-            )
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
+                func.coalesce(func.sum(hourly.revenue), 0),
+                func.coalesce(func.sum(hourly.orders), 0),
+                func.coalesce(func.sum(hourly.cogs), 0),
+            ).where(hourly.hour >= since_hour)
         )
     ).one()
     rev_total = float(rev_total or 0)
     ord_total = int(ord_total or 0)
     avg_ticket = rev_total / ord_total if ord_total else 0
-
-    # ── COGS (stock cost x qty from order items) ───────────────
-    cogs_result = (
-        await db.execute(
-            select(func.coalesce(func.sum(OrderItem.unit_cost * OrderItem.quantity), 0))
-            .join(Order, Order.id == OrderItem.order_id)
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-        )
-    ).scalar_one()
     cogs = float(cogs_result or 0)
     gross_profit = rev_total - cogs
     gross_margin_pct = round(gross_profit / rev_total * 100, 1) if rev_total > 0 else 0
@@ -400,14 +374,14 @@ async def get_bi_full(
     ch_rows = (
         await db.execute(
             select(
-                Order.channel,
-                func.sum(Order.grand_total).label("rev"),
-                func.count(Order.id).label("cnt"),
+                hourly.channel,
+                func.sum(hourly.revenue).label("rev"),
+                func.sum(hourly.orders).label("cnt"),
             )
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-            .group_by(Order.channel)
-            .order_by(func.sum(Order.grand_total).desc())
+            .where(hourly.hour >= since_hour)
+            .group_by(hourly.channel)
+            .having(func.sum(hourly.orders) > 0)
+            .order_by(func.sum(hourly.revenue).desc())
         )
     ).all()
     by_channel = [
@@ -424,17 +398,14 @@ async def get_bi_full(
     pm_rows = (
         await db.execute(
             select(
-                func.coalesce(Order.payment_method, Payment.method, literal("Sin método")).label(
-                    "meth"
-                ),
-                func.sum(Order.grand_total).label("rev"),
-                func.count(func.distinct(Order.id)).label("cnt"),
+                hourly.payment_method.label("meth"),
+                func.sum(hourly.revenue).label("rev"),
+                func.sum(hourly.orders).label("cnt"),
             )
-            .outerjoin(Payment, Payment.order_id == Order.id)
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-            .group_by(text("1"))
-            .order_by(func.sum(Order.grand_total).desc())
+            .where(hourly.hour >= since_hour)
+            .group_by(hourly.payment_method)
+            .having(func.sum(hourly.orders) > 0)
+            .order_by(func.sum(hourly.revenue).desc())
         )
     ).all()
     by_method = [
@@ -448,17 +419,18 @@ async def get_bi_full(
     ]
 
     # ── Monthly trend ──────────────────────────────────────────
-    month_trunc = func.date_trunc("month", Order.occurred_at)
+    since_year = (now - timedelta(days=365)).replace(minute=0, second=0, microsecond=0)
+    month_trunc = func.date_trunc("month", hourly.hour)
     mo_rows = (
         await db.execute(
             select(
                 month_trunc.label("mo"),
-                func.sum(Order.grand_total).label("rev"),
-                func.count(Order.id).label("cnt"),
+                func.sum(hourly.revenue).label("rev"),
+                func.sum(hourly.orders).label("cnt"),
             )
-            .where(Order.occurred_at >= now - timedelta(days=365))
-            .where(Order.status.notin_(["cancelled", "refunded"]))
+            .where(hourly.hour >= since_year)
             .group_by(month_trunc)
+            .having(func.sum(hourly.orders) > 0)
             .order_by(month_trunc)
         )
     ).all()
@@ -505,25 +477,22 @@ async def get_bi_full(
     ]
 
     # ── By category ────────────────────────────────────────────
+    daily_cat = SalesRollupCategoryDaily
+    local_since = since.astimezone(ZoneInfo("America/Bogota")).date()
+    cat_name = func.coalesce(Category.name, literal("Sin categoría"))
     cat_rows = (
         await db.execute(
             select(
-                func.coalesce(Category.name, literal("Sin categoría")).label("cat"),
-                func.sum(OrderItem.unit_price * OrderItem.quantity - OrderItem.discount).label(
-                    "rev"
-                ),
-                func.sum(OrderItem.quantity).label("units"),
-            )
-            .select_from(OrderItem)
-            .join(Order, Order.id == OrderItem.order_id)
-            .outerjoin(Product, Product.id == OrderItem.product_id)
-            .outerjoin(Category, Category.id == Product.category_id)
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-            .group_by(text("1"))
-            .order_by(
-                func.sum(OrderItem.unit_price * OrderItem.quantity - OrderItem.discount).desc()
+                cat_name.label("cat"),
+                func.sum(daily_cat.revenue).label("rev"),
+                func.sum(daily_cat.units).label("units"),
             )
+            .select_from(daily_cat)
+            .outerjoin(Category, Category.id == daily_cat.category_id)
+            .where(daily_cat.day >= local_since)
+            .group_by(cat_name)
+            .having(func.sum(daily_cat.units) != 0)
+            .order_by(func.sum(daily_cat.revenue).desc())
             .limit(20)
         )
     ).all()
@@ -539,18 +508,16 @@ async def get_bi_full(
     ]
 
     # ── Heatmap day x hour ─────────────────────────────────────
-    # Extract weekday (0=Sun PG style) and hour from occurred_at
+    # Weekday (0=Sun PG style) and hour of each hourly bucket
+    wd = func.extract("dow", hourly.hour)
+    hr = func.extract("hour", hourly.hour)
     hm_rows = (
         await db.execute(
-            select(
-                func.extract("dow", Order.occurred_at).label("wd"),
-                func.extract("hour", Order.occurred_at).label("hr"),
-                func.count(Order.id).label("cnt"),
-            )
-            .where(Order.occurred_at >= since)
-            .where(Order.status.notin_(["cancelled", "refunded"]))
-            .group_by(text("1, 2"))
-            .order_by(text("1, 2"))
+            select(wd.label("wd"), hr.label("hr"), func.sum(hourly.orders).label("cnt"))
+            .where(hourly.hour >= since_hour)
+            .group_by(wd, hr)
+            .having(func.sum(hourly.orders) > 0)
+            .order_by(wd, hr)
         )
     ).all()
     heatmap = [
@@ -9,6 +9,7 @@ from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy import text
 
 from app.deps import DBSession
+from app.services.http_cache import cache_control, conditional
 from app.services.seo_notifications import notify_indexnow
 
 router = APIRouter(prefix="/blog", tags=["blog"])
@@ -16,7 +17,22 @@ router = APIRouter(prefix="/blog", tags=["blog"])
 _background_tasks: set[asyncio.Task] = set()
 
 
+async def _posts_version(db: DBSession, **_) -> tuple:
+    """Versión del listado. Ignora `view_count` (cambia con cada lectura): un 304
+    puede traer contadores de vistas algo atrasados."""
+    row = await db.execute(
+        text("""
+            SELECT MAX(updated_at),
+                   COUNT(*) FILTER (WHERE published_at IS NOT NULL AND published_at <= NOW()),
+                   COUNT(*)
+            FROM content.blog_posts
+        """)
+    )
+    return tuple(row.one())
+
+
 @router.get("/posts")
+@conditional(_posts_version, cache_control=cache_control(300, stale_while_revalidate=3600))
 async def list_posts(
     db: DBSession,
     published: bool = True,
@@ -16,6 +16,7 @@ from sqlalchemy import select, text
 
 from app.deps import DBSession, require_permission
 from app.models.catalog import Brand, Category, Product
+from app.services.catalog_events import publish_product_changes
 
 catalog_export_router = APIRouter(
     prefix="/catalog",
@@ -601,6 +602,7 @@ async def import_products_excel(
         updated += 1
 
     await db.commit()
+    await publish_product_changes()
 
     return {
         "updated": updated,
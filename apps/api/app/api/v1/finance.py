@@ -12,9 +12,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 from sqlalchemy import select, text
 
-from app.deps import CurrentUser, DBSession, require_permission
+from app.deps import CurrentUser, DBSession, get_current_user, require_permission
 from app.models.finance import CashClosing as CashClosingModel
 from app.models.ops import LegacyIdMap
+from app.services.response_cache import cached, invalidate
 
 router = APIRouter(prefix="/finance", tags=["finance"])
 expenses_router = APIRouter(prefix="/expenses", tags=["finance"])
@@ -212,6 +213,7 @@ async def create_expense(
     db.add(record)
     await db.commit()
     await db.refresh(record)
+    await invalidate("expenses")
     return ExpenseOut(
         id=str(record.id),
         legacy_id=legacy_id,
@@ -682,10 +684,10 @@ async def suppliers_grouped(db: DBSession, user: CurrentUser):
 # ────────────────── Finance Summary (P&L) ──────────────────────
 
 
-@router.get("/summary", response_model=FinanceSummary)
+@router.get("/summary", response_model=FinanceSummary, dependencies=[Depends(get_current_user)])
+@cached("finance:summary", ttl=120, tags=("sales", "expenses"))
 async def finance_summary(
     db: DBSession,
-    user: CurrentUser,
     start: date | None = None,
     end: date | None = None,
 ):
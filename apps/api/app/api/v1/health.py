@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import hmac
 import os
 import subprocess
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 
+from app.config import get_settings
 from app.deps import DBSession
+from app.services import metrics
 
 router = APIRouter(tags=["health"])
 
@@ -54,3 +58,20 @@ async def version() -> dict:
         "git_sha": _get_git_sha(),
         "environment": os.getenv("ENVIRONMENT", "local"),
     }
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    """Métricas de todos los workers en formato de exposición de Prometheus.
+
+    Sin `metrics_token` configurado se niega siempre: las rutas y volúmenes no
+    deben quedar públicos por olvidar la variable.
+    """
+    token = get_settings().metrics_token
+    received = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not token or not hmac.compare_digest(received, token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    workers = await metrics.get_metrics_publisher().collect()
+    return PlainTextResponse(
+        metrics.render(workers), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
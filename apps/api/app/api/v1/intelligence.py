@@ -22,6 +22,14 @@ from app.models.crm import Customer
 from app.models.inventory import Stock
 from app.models.purchasing import Supplier, SupplierSkuMap
 from app.models.sales import Order, OrderItem
+from app.services.copurchase import copurchased_with
+from app.services.response_cache import cached
+from app.services.rfm import (
+    at_risk_condition,
+    days_overdue,
+    days_since,
+    repurchase_condition,
+)
 
 router = APIRouter(prefix="/intelligence", tags=["intelligence"])
 
@@ -115,167 +123,137 @@ class IntelligenceOut(BaseModel):
     response_model=IntelligenceOut,
     dependencies=[Depends(require_permission("analytics:read"))],
 )
+@cached("intelligence:overview", ttl=600, tags=("sales", "inventory", "customers"))
 async def intelligence_overview(
     db: DBSession,
     at_risk_days: int = Query(60, ge=20, le=365),
     dead_stock_days: int = Query(90, ge=30, le=365),
+    limit: int = Query(100, ge=1, le=500, description="Filas por lista de clientes"),
+    offset: int = Query(0, ge=0),
 ) -> IntelligenceOut:
     now = datetime.now(UTC)
 
     valid_status = ["cancelled", "refunded"]
 
-    # ── Agregado por cliente (recencia/frecuencia/monetario) ──
-    agg_rows = (
+    # ── Clientes: métricas RFM precalculadas en crm.customers (services/rfm) ──
+    live = Customer.deleted_at == None  # noqa: E711
+    due = repurchase_condition(now)
+    risky = at_risk_condition(now, at_risk_days)
+    avg_ticket = Customer.rfm_monetary / Customer.rfm_frequency
+    totals = (
         await db.execute(
             select(
-                Order.customer_id,
-                func.count(Order.id).label("orders"),
-                func.min(Order.occurred_at).label("first_at"),
-                func.max(Order.occurred_at).label("last_at"),
-                func.coalesce(func.sum(Order.grand_total), 0).label("monetary"),
-            )
-            .where(Order.customer_id.isnot(None))
-            .where(Order.status.notin_(valid_status))
-            .group_by(Order.customer_id)
+                func.count(Customer.id).label("customers_total"),
+                func.count(Customer.id).filter(days_since(now) <= 90).label("active_90"),
+                func.count(Customer.id).filter(due).label("repurchase_due"),
+                func.coalesce(func.sum(avg_ticket).filter(due), 0).label("repurchase_value"),
+                func.count(Customer.id).filter(risky).label("at_risk_count"),
+                func.coalesce(func.sum(Customer.rfm_monetary).filter(risky), 0).label(
+                    "at_risk_value"
+                ),
+            ).where(live)
         )
-    ).all()
-
-    cust_ids = [r.customer_id for r in agg_rows]
-    customers: dict = {}
-    if cust_ids:
-        crows = (
-            await db.execute(
-                select(Customer.id, Customer.full_name, Customer.phone, Customer.rfm_segment).where(
-                    Customer.id.in_(cust_ids)
-                )
-            )
-        ).all()
-        customers = {c.id: c for c in crows}
+    ).one()
+
+    since_col = days_since(now).label("days_since")
+    overdue_col = days_overdue(now).label("days_overdue")
+    customer_cols = (
+        Customer.id,
+        Customer.full_name,
+        Customer.phone,
+        Customer.rfm_last_order_at,
+        Customer.rfm_frequency,
+        Customer.rfm_monetary,
+        since_col,
+    )
 
-    # ── Producto favorito por cliente (mayor cantidad histórica) ──
-    fav: dict = {}
-    if cust_ids:
-        fav_rows = (
-            await db.execute(
-                select(
-                    Order.customer_id,
-                    OrderItem.name_snapshot,
-                    func.sum(OrderItem.quantity).label("qty"),
-                )
-                .join(OrderItem, OrderItem.order_id == Order.id)
-                .where(Order.customer_id.in_(cust_ids))
-                .where(Order.status.notin_(valid_status))
-                .group_by(Order.customer_id, OrderItem.name_snapshot)
+    # Orden: vencidos primero (mayor atraso), luego por valor
+    repurchase_rows = (
+        await db.execute(
+            select(
+                *customer_cols,
+                Customer.rfm_avg_interval_days,
+                Customer.rfm_favorite_product,
+                overdue_col,
             )
-        ).all()
-        best: dict = {}
-        for r in fav_rows:
-            cur = best.get(r.customer_id)
-            if cur is None or (r.qty or 0) > cur[1]:
-                best[r.customer_id] = (r.name_snapshot, r.qty or 0)
-        fav = {k: v[0] for k, v in best.items()}
+            .where(live, due)
+            .order_by(overdue_col.desc(), Customer.rfm_monetary.desc(), Customer.id)
+            .limit(limit)
+            .offset(offset)
+        )
+    ).all()
 
     repurchase: list[RepurchaseItem] = []
-    at_risk: list[AtRiskItem] = []
-    active_90 = 0
-    repurchase_opportunity = 0.0
-    at_risk_value = 0.0
-
-    for r in agg_rows:
-        cust = customers.get(r.customer_id)
-        if cust is None:
-            continue
-        last_at = r.last_at
-        first_at = r.first_at
-        if last_at is None:
-            continue
-        if last_at.tzinfo is None:
-            last_at = last_at.replace(tzinfo=UTC)
-        if first_at is not None and first_at.tzinfo is None:
-            first_at = first_at.replace(tzinfo=UTC)
-
-        days_since = (now - last_at).days
-        orders = int(r.orders or 0)
-        monetary = float(r.monetary or 0)
-        avg_ticket = monetary / orders if orders else 0.0
-
-        if days_since <= 90:
-            active_90 += 1
-
-        # Intervalo promedio entre compras (solo con ≥2 compras)
-        if orders >= 2 and first_at is not None:
-            span_days = max((last_at - first_at).days, 1)
-            avg_interval = max(round(span_days / (orders - 1)), 7)
-            days_overdue = days_since - avg_interval
-            # Ventana: por recomprar pronto (faltan ≤7 días) o vencido,
-            # pero no clientes ya perdidos (>2.5x el intervalo).
-            if days_overdue >= -7 and days_since <= avg_interval * 2.5:
-                if days_overdue > 0:
-                    urgency = "vencido"
-                elif days_overdue >= -2:
-                    urgency = "hoy"
-                else:
-                    urgency = "proximo"
-                fav_prod = fav.get(r.customer_id)
-                first_name = cust.full_name.split(" ")[0] if cust.full_name else "Hola"
-                if fav_prod:
-                    msg = (
-                        f"¡Hola {first_name}! 🐾 En Bigotes y Paticas notamos que quizá "
-                        f"ya se te está acabando *{fav_prod}*. ¿Te lo reservamos y te lo "
-                        f"llevamos a domicilio?"
-                    )
-                else:
-                    msg = (
-                        f"¡Hola {first_name}! 🐾 Te extrañamos en Bigotes y Paticas. "
-                        f"¿Necesitas algo para tu mascota? Te lo llevamos a domicilio."
-                    )
-                repurchase.append(
-                    RepurchaseItem(
-                        customer_id=str(r.customer_id),
-                        name=cust.full_name,
-                        phone=cust.phone,
-                        last_purchase=last_at.date().isoformat(),
-                        days_since=days_since,
-                        avg_interval_days=avg_interval,
-                        days_overdue=days_overdue,
-                        orders=orders,
-                        monetary=monetary,
-                        favorite_product=fav_prod,
-                        urgency=urgency,
-                        whatsapp_url=_wa_link(cust.phone, msg),
-                    )
-                )
-                repurchase_opportunity += avg_ticket
-
-        # En riesgo: cliente valioso (≥2 compras) inactivo y NO ya capturado arriba
-        if orders >= 2 and days_since >= at_risk_days:
-            first_name = cust.full_name.split(" ")[0] if cust.full_name else "Hola"
+    for r in repurchase_rows:
+        overdue = int(r.days_overdue)
+        if overdue > 0:
+            urgency = "vencido"
+        elif overdue >= -2:
+            urgency = "hoy"
+        else:
+            urgency = "proximo"
+        fav_prod = r.rfm_favorite_product
+        first_name = r.full_name.split(" ")[0] if r.full_name else "Hola"
+        if fav_prod:
             msg = (
-                f"¡Hola {first_name}! 🐾 Hace rato no te vemos por Bigotes y Paticas. "
-                f"Tenemos novedades para tu mascota y un detalle especial para ti. "
-                f"¿Pasas o te llevamos a domicilio?"
+                f"¡Hola {first_name}! 🐾 En Bigotes y Paticas notamos que quizá "
+                f"ya se te está acabando *{fav_prod}*. ¿Te lo reservamos y te lo "
+                f"llevamos a domicilio?"
             )
-            at_risk.append(
-                AtRiskItem(
-                    customer_id=str(r.customer_id),
-                    name=cust.full_name,
-                    phone=cust.phone,
-                    last_purchase=last_at.date().isoformat(),
-                    days_since=days_since,
-                    orders=orders,
-                    monetary=monetary,
-                    segment=cust.rfm_segment,
-                    whatsapp_url=_wa_link(cust.phone, msg),
-                )
+        else:
+            msg = (
+                f"¡Hola {first_name}! 🐾 Te extrañamos en Bigotes y Paticas. "
+                f"¿Necesitas algo para tu mascota? Te lo llevamos a domicilio."
             )
-            at_risk_value += monetary
+        repurchase.append(
+            RepurchaseItem(
+                customer_id=str(r.id),
+                name=r.full_name,
+                phone=r.phone,
+                last_purchase=r.rfm_last_order_at.astimezone(UTC).date().isoformat(),
+                days_since=int(r.days_since),
+                avg_interval_days=int(r.rfm_avg_interval_days),
+                days_overdue=overdue,
+                orders=int(r.rfm_frequency),
+                monetary=float(r.rfm_monetary or 0),
+                favorite_product=fav_prod,
+                urgency=urgency,
+                whatsapp_url=_wa_link(r.phone, msg),
+            )
+        )
+
+    # En riesgo: cliente valioso (≥2 compras) inactivo, por mayor valor
+    at_risk_rows = (
+        await db.execute(
+            select(*customer_cols, Customer.rfm_segment)
+            .where(live, risky)
+            .order_by(Customer.rfm_monetary.desc(), Customer.id)
+            .limit(limit)
+            .offset(offset)
+        )
+    ).all()
 
-    # Orden: vencidos primero, luego por mayor atraso y valor
-    urgency_rank = {"vencido": 0, "hoy": 1, "proximo": 2}
-    repurchase.sort(key=lambda x: (urgency_rank.get(x.urgency, 9), -x.days_overdue, -x.monetary))
-    at_risk.sort(key=lambda x: -x.monetary)
-    repurchase = repurchase[:100]
-    at_risk = at_risk[:100]
+    at_risk: list[AtRiskItem] = []
+    for r in at_risk_rows:
+        first_name = r.full_name.split(" ")[0] if r.full_name else "Hola"
+        msg = (
+            f"¡Hola {first_name}! 🐾 Hace rato no te vemos por Bigotes y Paticas. "
+            f"Tenemos novedades para tu mascota y un detalle especial para ti. "
+            f"¿Pasas o te llevamos a domicilio?"
+        )
+        at_risk.append(
+            AtRiskItem(
+                customer_id=str(r.id),
+                name=r.full_name,
+                phone=r.phone,
+                last_purchase=r.rfm_last_order_at.astimezone(UTC).date().isoformat(),
+                days_since=int(r.days_since),
+                orders=int(r.rfm_frequency),
+                monetary=float(r.rfm_monetary or 0),
+                segment=r.rfm_segment,
+                whatsapp_url=_wa_link(r.phone, msg),
+            )
+        )
 
     # ── Capital atrapado: stock con costo que no rota ──
     last_sale_sub = (
@@ -341,21 +319,15 @@ async def intelligence_overview(
     dead_stock_full_count = len(dead_stock)
     dead_stock = dead_stock[:100]
 
-    customers_total = (
-        await db.execute(
-            select(func.count(Customer.id)).where(Customer.deleted_at == None)  # noqa: E711
-        )
-    ).scalar_one()
-
     return IntelligenceOut(
         generated_at=now.isoformat(),
         summary=IntelSummary(
-            customers_total=int(customers_total or 0),
-            customers_active_90d=active_90,
-            repurchase_due=len(repurchase),
-            repurchase_revenue_opportunity=round(repurchase_opportunity, 2),
-            at_risk_count=len(at_risk),
-            at_risk_value=round(at_risk_value, 2),
+            customers_total=int(totals.customers_total or 0),
+            customers_active_90d=int(totals.active_90 or 0),
+            repurchase_due=int(totals.repurchase_due or 0),
+            repurchase_revenue_opportunity=round(float(totals.repurchase_value), 2),
+            at_risk_count=int(totals.at_risk_count or 0),
+            at_risk_value=round(float(totals.at_risk_value), 2),
             dead_stock_count=dead_stock_full_count,
             trapped_capital=round(trapped_capital, 2),
         ),
@@ -375,6 +347,7 @@ class ComboSuggestion(BaseModel):
     price: float
     times_together: int
     stock: int
+    lift: float | None = None  # >1 = se compran juntos más que por azar
 
 
 @router.get(
@@ -387,7 +360,8 @@ async def frequently_bought(
     product_ids: str = Query(..., description="IDs de producto separados por coma (carrito)"),
     limit: int = Query(6, ge=1, le=20),
 ) -> list[ComboSuggestion]:
-    """Productos que históricamente se compran junto con los del carrito."""
+    """Productos que históricamente se compran junto con los del carrito
+    (matriz de co-compra precalculada, ver services/copurchase)."""
     import uuid as _uuid
 
     ids: list = []
@@ -402,66 +376,19 @@ async def frequently_bought(
     if not ids:
         return []
 
-    # Órdenes que contienen alguno de los productos del carrito
-    order_ids_sub = (
-        select(OrderItem.order_id)
-        .join(Order, Order.id == OrderItem.order_id)
-        .where(OrderItem.product_id.in_(ids))
-        .where(Order.status.notin_(["cancelled", "refunded"]))
-        .distinct()
-    )
-
-    rows = (
-        await db.execute(
-            select(
-                OrderItem.product_id,
-                func.count(func.distinct(OrderItem.order_id)).label("together"),
-            )
-            .where(OrderItem.order_id.in_(order_ids_sub))
-            .where(OrderItem.product_id.notin_(ids))
-            .group_by(OrderItem.product_id)
-            .order_by(func.count(func.distinct(OrderItem.order_id)).desc())
-            .limit(limit * 2)
-        )
-    ).all()
-
-    if not rows:
-        return []
-
-    cand_ids = [r.product_id for r in rows]
-    together_map = {r.product_id: int(r.together or 0) for r in rows}
-
-    prods = (
-        await db.execute(
-            select(Product.id, Product.sku, Product.name, Product.price, Product.is_active)
-            .where(Product.id.in_(cand_ids))
-            .where(Product.deleted_at == None)  # noqa: E711
-            .where(Product.is_active == True)  # noqa: E712
-        )
-    ).all()
-
-    stock_rows = (
-        await db.execute(
-            select(Stock.product_id, func.coalesce(func.sum(Stock.quantity - Stock.reserved), 0))
-            .where(Stock.product_id.in_(cand_ids))
-            .group_by(Stock.product_id)
-        )
-    ).all()
-    stock_map = {pid: int(q or 0) for pid, q in stock_rows}
-
-    out = [
+    rows = await copurchased_with(db, ids, limit)
+    return [
         ComboSuggestion(
             product_id=str(p.id),
             sku=p.sku,
             name=p.name,
             price=float(p.price or 0),
-            times_together=together_map.get(p.id, 0),
-            stock=stock_map.get(p.id, 0),
+            times_together=int(together or 0),
+            stock=int(available or 0),
+            lift=round(float(lift), 2) if lift is not None else None,
         )
-        for p in prods
+        for p, together, _confidence, lift, available in rows
     ]
-    out.sort(key=lambda x: -x.times_together)
-    return out[:limit]
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -579,6 +506,7 @@ class StockoutForecastOut(BaseModel):
     response_model=StockoutForecastOut,
     dependencies=[Depends(require_permission("analytics:read"))],
 )
+@cached("intelligence:stockout", ttl=300, tags=("sales", "inventory", "purchases"))
 async def stockout_forecast(
     db: DBSession,
     velocity_days: int = Query(30, ge=7, le=120),
@@ -678,6 +606,7 @@ class ReplenishmentOut(BaseModel):
     response_model=ReplenishmentOut,
     dependencies=[Depends(require_permission("analytics:read"))],
 )
+@cached("intelligence:replenishment", ttl=300, tags=("sales", "inventory", "purchases"))
 async def replenishment(
     db: DBSession,
     velocity_days: int = Query(30, ge=7, le=120),
@@ -7,12 +7,19 @@ from datetime import UTC, datetime
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
-from sqlalchemy import func, or_, select
+from sqlalchemy import case, func, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 
-from app.deps import CurrentUser, DBSession, require_permission
+from app.deps import CurrentUser, DBSession, get_current_user, require_permission
 from app.models.catalog import Product
-from app.models.inventory import Stock, StockLocation, StockMovement
+from app.models.inventory import ProductAvailability, Stock, StockLocation, StockMovement
 from app.models.sales import Order
+from app.services.catalog_events import publish_product_changes
+from app.services.keyset import InvalidCursorError, after_condition, decode_cursor, encode_cursor
+from app.services.related_products import rebuild_related
+from app.services.response_cache import cached, invalidate
+from app.services.stock_availability import availability_join, stock_qty_col
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 
@@ -103,6 +110,7 @@ async def adjust_stock(payload: AdjustmentIn, db: DBSession, user: CurrentUser):
     )
     db.add(movement)
     await db.commit()
+    await invalidate("inventory")
     await db.refresh(stock)
 
     return StockOut(
@@ -138,6 +146,33 @@ class BatchAdjustmentOut(BaseModel):
     items: list[BatchAdjustmentResultItem]
 
 
+def _stock_delta_upsert(location_id: uuid.UUID, items: list[BatchAdjustmentItem]):
+    """UPSERT de deltas de stock, devuelve (product_id, quantity) de cada fila.
+
+    El CHECK quantity_non_negative se evalúa sobre la fila propuesta antes del
+    ON CONFLICT, así que la fila insertada lleva max(delta, 0) y el delta real
+    se aplica en el DO UPDATE.
+    """
+    upsert = pg_insert(Stock).values(
+        [
+            {
+                "product_id": it.product_id,
+                "location_id": location_id,
+                "quantity": max(it.quantity_delta, 0),
+            }
+            for it in items
+        ]
+    )
+    delta = case(
+        {it.product_id: it.quantity_delta for it in items},
+        value=Stock.product_id,
+    )
+    return upsert.on_conflict_do_update(
+        constraint="uq_stock_product_location",
+        set_={"quantity": Stock.quantity + delta, "updated_at": func.now()},
+    ).returning(Stock.product_id, Stock.quantity)
+
+
 @router.post(
     "/adjust/batch",
     response_model=BatchAdjustmentOut,
@@ -146,7 +181,10 @@ class BatchAdjustmentOut(BaseModel):
 async def adjust_stock_batch(payload: BatchAdjustmentIn, db: DBSession, user: CurrentUser):
     """Aplica varios ajustes de stock en una sola transacción (atómico).
 
-    Si algún producto queda con stock negativo, se revierte TODO el lote.
+    Si algún producto queda con stock negativo, se revierte TODO el lote y el
+    409 lista todos los ítems que fallan. El trabajo es por conjuntos: un SELECT
+    … FOR UPDATE para todas las filas, un UPSERT con los deltas y un INSERT
+    multi-fila de movimientos, sin importar el tamaño del lote.
     """
     # Resolver location default una sola vez
     location_id = payload.location_id
@@ -170,62 +208,79 @@ async def adjust_stock_batch(payload: BatchAdjustmentIn, db: DBSession, user: Cu
             )
         seen.add(it.product_id)
 
-    results: list[BatchAdjustmentResultItem] = []
-    total_delta = 0
-    now = datetime.now(UTC)
-
-    for it in payload.items:
-        stock = (
+    # Lock de todas las filas afectadas en una sola sentencia (orden por product_id,
+    # igual que el POS, para evitar deadlocks)
+    product_ids = sorted(seen)
+    current: dict[uuid.UUID, int] = dict(
+        (
             await db.execute(
-                select(Stock)
-                .where(Stock.product_id == it.product_id)
+                select(Stock.product_id, Stock.quantity)
+                .where(Stock.product_id.in_(product_ids))
                 .where(Stock.location_id == location_id)
+                .order_by(Stock.product_id)
                 .with_for_update()
             )
-        ).scalar_one_or_none()
+        ).all()
+    )
 
-        if stock is None:
-            if it.quantity_delta < 0:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail=f"Sin stock para descontar en producto {it.product_id}",
-                )
-            stock = Stock(product_id=it.product_id, location_id=location_id, quantity=0)
-            db.add(stock)
-
-        new_qty = stock.quantity + it.quantity_delta
-        if new_qty < 0:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail=(
-                    f"Stock insuficiente en {it.product_id}: "
-                    f"actual={stock.quantity}, delta={it.quantity_delta}"
-                ),
-            )
-        stock.quantity = new_qty
-        total_delta += it.quantity_delta
-
-        db.add(
-            StockMovement(
-                product_id=it.product_id,
-                location_id=location_id,
-                movement_type="ADJUSTMENT",
-                quantity_delta=it.quantity_delta,
-                quantity_after=new_qty,
-                notes=it.notes or payload.notes,
-                occurred_at=now,
-                created_by=user.email,
-            )
+    # Validación en bloque: se reportan todos los ítems que quedarían negativos
+    shortages = [
+        f"{it.product_id} (actual={current.get(it.product_id, 0)}, delta={it.quantity_delta})"
+        for it in payload.items
+        if current.get(it.product_id, 0) + it.quantity_delta < 0
+    ]
+    if shortages:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock insuficiente en: " + "; ".join(shortages),
         )
-        results.append(
-            BatchAdjustmentResultItem(
-                product_id=it.product_id,
-                quantity_delta=it.quantity_delta,
-                quantity_after=new_qty,
-            )
+
+    # Un solo UPSERT aplica los deltas (crea la fila si el producto no tenía stock).
+    # Un faltante que aparezca recién acá (fila creada por otro request después
+    # del lock) lo rechaza el CHECK quantity_non_negative → 409
+    try:
+        after: dict[uuid.UUID, int] = dict(
+            (await db.execute(_stock_delta_upsert(location_id, payload.items))).all()
         )
+    except IntegrityError as e:
+        if "quantity_non_negative" not in str(e.orig):
+            raise
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Stock insuficiente: otro movimiento cambió el stock del lote",
+        ) from e
+
+    now = datetime.now(UTC)
+    await db.execute(
+        insert(StockMovement),
+        [
+            {
+                "product_id": it.product_id,
+                "location_id": location_id,
+                "movement_type": "ADJUSTMENT",
+                "quantity_delta": it.quantity_delta,
+                "quantity_after": after[it.product_id],
+                "notes": it.notes or payload.notes,
+                "occurred_at": now,
+                "created_by": user.email,
+            }
+            for it in payload.items
+        ],
+    )
+
+    results = [
+        BatchAdjustmentResultItem(
+            product_id=it.product_id,
+            quantity_delta=it.quantity_delta,
+            quantity_after=after[it.product_id],
+        )
+        for it in payload.items
+    ]
+    total_delta = sum(it.quantity_delta for it in payload.items)
 
     await db.commit()
+    await invalidate("inventory")
     return BatchAdjustmentOut(applied=len(results), total_delta=total_delta, items=results)
 
 
@@ -256,6 +311,7 @@ class StockListResponse(BaseModel):
     total_value_price: float
     out_of_stock: int
     low_stock: int
+    next_cursor: str | None = None
 
 
 @router.get("/stock", response_model=StockListResponse)
@@ -272,54 +328,98 @@ async def list_stock(
     sort_dir: str = Query("desc", pattern="^(asc|desc)$"),
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=500),
+    cursor: bool = Query(False, description="Paginación keyset; la respuesta trae next_cursor"),
+    after: str | None = Query(None, description="Token next_cursor de la página anterior"),
 ):
-    # Sum stock per product
-    stock_sub = (
-        select(
-            Stock.product_id.label("product_id"),
-            func.coalesce(func.sum(Stock.quantity), 0).label("qty"),
-            func.coalesce(func.sum(Stock.reserved), 0).label("reserved"),
-        )
-        .group_by(Stock.product_id)
-        .subquery()
-    )
+    """Stock por producto para la pantalla de inventario.
 
-    stmt = (
-        select(Product, stock_sub.c.qty, stock_sub.c.reserved)
-        .outerjoin(stock_sub, stock_sub.c.product_id == Product.id)
-        .where(Product.deleted_at.is_(None))
-    )
+    Filtros, orden, totales y paginación se resuelven en SQL contra
+    `inventory.product_availability`. Con `cursor=true` (o `after`) pagina por
+    keyset sobre (clave de orden, id); los totales viajan en el token.
+    """
+    scope = f"stock:{sort_by}:{sort_dir}"
+    keyset_mode = cursor or after is not None
+    cached: dict = {}
+    key = None
+    if after:
+        try:
+            key, cached = decode_cursor(after, scope)
+        except InvalidCursorError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e)) from e
+
+    qty = stock_qty_col
+    reserved = func.coalesce(ProductAvailability.reserved, 0)
+    cost = func.coalesce(Product.cost, 0)
+    price = func.coalesce(Product.price, 0)
+    sort_exprs = {
+        "quantity": qty,
+        "cost": cost,
+        "price": price,
+        "stock_value_cost": qty * cost,
+        "stock_value_price": qty * price,
+        "margin_pct": case((price > 0, func.round((price - cost) / price * 100, 1)), else_=0),
+        "name": func.lower(Product.name),
+        "sku": func.lower(Product.sku),
+    }
+    sort_expr = sort_exprs[sort_by]
+    descending = sort_dir == "desc"
+
+    conditions = [Product.deleted_at.is_(None)]
     if q:
         # Multi-token AND: each word must appear in name or sku (order-independent)
         for token in q.split():
             like = f"%{token}%"
-            stmt = stmt.where(or_(Product.name.ilike(like), Product.sku.ilike(like)))
+            conditions.append(or_(Product.name.ilike(like), Product.sku.ilike(like)))
+    if only_in_stock:
+        conditions.append(qty > 0)
+    if only_low_stock:
+        conditions.append(qty <= 5)
+
+    if cached:
+        totals = cached
+    else:
+        agg_stmt = availability_join(
+            select(
+                func.count().label("total"),
+                func.coalesce(func.sum(qty * cost), 0).label("value_cost"),
+                func.coalesce(func.sum(qty * price), 0).label("value_price"),
+                func.count().filter(qty <= 0).label("out_of_stock"),
+                func.count().filter(qty > 0, qty < 5).label("low_stock"),
+            ).select_from(Product)
+        ).where(*conditions)
+        agg = (await db.execute(agg_stmt)).one()
+        totals = {
+            "total": int(agg.total),
+            "total_value_cost": float(agg.value_cost),
+            "total_value_price": float(agg.value_price),
+            "out_of_stock": int(agg.out_of_stock),
+            "low_stock": int(agg.low_stock),
+        }
+
+    order = [sort_expr.desc(), Product.id.desc()] if descending else [sort_expr, Product.id]
+    stmt = (
+        availability_join(select(Product, qty, reserved, sort_expr.label("sort_key")))
+        .where(*conditions)
+        .order_by(*order)
+    )
+    next_cursor = None
+    if keyset_mode:
+        if key is not None:
+            stmt = stmt.where(after_condition([sort_expr, Product.id], key, descending))
+        rows = (await db.execute(stmt.limit(page_size + 1))).all()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor(scope, (last.sort_key, last[0].id), totals)
+    else:
+        rows = (await db.execute(stmt.offset((page - 1) * page_size).limit(page_size))).all()
 
-    rows = (await db.execute(stmt)).all()
     items = []
-    total_value_cost = 0.0
-    total_value_price = 0.0
-    out_of_stock = 0
-    low_stock = 0
-    for p, qty, reserved in rows:
-        q_int = int(qty or 0)
-        r_int = int(reserved or 0)
-        avail = max(0, q_int - r_int)
-        cost = float(p.cost or 0)
-        price = float(p.price or 0)
-        if only_in_stock and q_int <= 0:
-            continue
-        if only_low_stock and q_int > 5:
-            continue
-        if q_int <= 0:
-            out_of_stock += 1
-        elif q_int < 5:
-            low_stock += 1
-        sv_cost = q_int * cost
-        sv_price = q_int * price
-        margin = round((price - cost) / price * 100, 1) if price > 0 else 0.0
-        total_value_cost += sv_cost
-        total_value_price += sv_price
+    for p, q_int, r_int, _sort_key in rows:
+        q_int = int(q_int or 0)
+        r_int = int(r_int or 0)
+        p_cost = float(p.cost or 0)
+        p_price = float(p.price or 0)
         items.append(
             StockRowOut(
                 product_id=p.id,
@@ -328,39 +428,25 @@ async def list_stock(
                 category_name=None,
                 quantity=q_int,
                 reserved=r_int,
-                available=avail,
-                cost=cost,
-                price=price,
-                margin_pct=margin,
-                stock_value_cost=sv_cost,
-                stock_value_price=sv_price,
+                available=max(0, q_int - r_int),
+                cost=p_cost,
+                price=p_price,
+                margin_pct=round((p_price - p_cost) / p_price * 100, 1) if p_price > 0 else 0.0,
+                stock_value_cost=q_int * p_cost,
+                stock_value_price=q_int * p_price,
             )
         )
 
-    # Sort
-    reverse = sort_dir == "desc"
-    sort_key_map = {
-        "quantity": lambda x: x.quantity,
-        "cost": lambda x: x.cost,
-        "price": lambda x: x.price,
-        "stock_value_cost": lambda x: x.stock_value_cost,
-        "stock_value_price": lambda x: x.stock_value_price,
-        "margin_pct": lambda x: x.margin_pct,
-        "name": lambda x: x.name.lower(),
-        "sku": lambda x: x.sku.lower(),
-    }
-    items.sort(key=sort_key_map.get(sort_by, lambda x: -x.quantity), reverse=reverse)
-    total = len(items)
-    start_idx = (page - 1) * page_size
     return StockListResponse(
-        items=items[start_idx : start_idx + page_size],
-        total=total,
+        items=items,
+        total=totals["total"],
         page=page,
         page_size=page_size,
-        total_value_cost=total_value_cost,
-        total_value_price=total_value_price,
-        out_of_stock=out_of_stock,
-        low_stock=low_stock,
+        total_value_cost=totals["total_value_cost"],
+        total_value_price=totals["total_value_price"],
+        out_of_stock=totals["out_of_stock"],
+        low_stock=totals["low_stock"],
+        next_cursor=next_cursor,
     )
 
 
@@ -391,7 +477,17 @@ async def list_movements(
     product_id: uuid.UUID | None = None,
     movement_type: str | None = None,
     limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None, description="Token next_cursor de la página anterior"),
 ):
+    """Últimos movimientos; `next_cursor` permite seguir paginando por keyset
+    sobre (occurred_at, id) sin OFFSET."""
+    key = None
+    if after:
+        try:
+            key, _ = decode_cursor(after, "movements")
+        except InvalidCursorError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e)) from e
+
     stmt = (
         select(StockMovement, Product.name, Product.sku, Order.order_number)
         .join(Product, Product.id == StockMovement.product_id)
@@ -404,8 +500,15 @@ async def list_movements(
         stmt = stmt.where(StockMovement.product_id == product_id)
     if movement_type:
         stmt = stmt.where(StockMovement.movement_type == movement_type)
-    stmt = stmt.order_by(StockMovement.occurred_at.desc()).limit(limit)
-    rows = (await db.execute(stmt)).all()
+    if key is not None:
+        stmt = stmt.where(after_condition([StockMovement.occurred_at, StockMovement.id], key))
+    stmt = stmt.order_by(StockMovement.occurred_at.desc(), StockMovement.id.desc())
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = encode_cursor("movements", (last.occurred_at, last.id))
     items = [
         MovementOut(
             id=m.id,
@@ -425,7 +528,7 @@ async def list_movements(
         )
         for m, name, sku, order_number in rows
     ]
-    return {"items": items, "total": len(items)}
+    return {"items": items, "total": len(items), "next_cursor": next_cursor}
 
 
 # ─────────────── Update product pricing (cost + price) ────────────
@@ -474,7 +577,11 @@ async def update_product_pricing(
 
         product.price = Decimal(str(payload.price))
 
+    await db.flush()
+    await rebuild_related(db, product_id)
     await db.commit()
+    await invalidate("inventory")
+    await publish_product_changes(product_id)
     await db.refresh(product)
 
     cost = float(product.cost or 0)
@@ -534,10 +641,10 @@ async def product_movements(
     }
 
 
-@router.get("/analytics/velocity")
+@router.get("/analytics/velocity", dependencies=[Depends(get_current_user)])
+@cached("inventory:velocity", ttl=300, tags=("sales", "inventory"))
 async def velocity_analysis(
     db: DBSession,
-    user: CurrentUser,
     days_short: int = Query(30, ge=7, le=90),
     days_long: int = Query(90, ge=30, le=365),
 ):
@@ -32,6 +32,7 @@ from app.models.inventory import (
     StockLocation,
     StockMovement,
 )
+from app.services.product_loading import PRODUCT_CATEGORY
 
 router = APIRouter(prefix="/inventory-counts", tags=["inventory-counts"])
 
@@ -164,11 +165,10 @@ async def create_count_session(
         .subquery()
     )
 
-    # Note: Product has lazy="joined" on .category, so we do NOT add an explicit
-    # Category join here — that would create a duplicate join and a 500 error.
     rows = (
         await db.execute(
             select(Product, stock_sub.c.qty)
+            .options(*PRODUCT_CATEGORY)
             .outerjoin(stock_sub, stock_sub.c.product_id == Product.id)
             .where(Product.deleted_at.is_(None))
             .where(Product.is_active == True)  # noqa: E712
@@ -9,9 +9,26 @@ from pydantic import BaseModel
 from sqlalchemy import text
 
 from app.deps import DBSession
+from app.services.http_cache import cache_control, conditional
 
 router = APIRouter(prefix="/landings", tags=["seo-landings"])
 
+_LANDING_CACHE = cache_control(3600, stale_while_revalidate=86400)
+
+
+async def _landings_version(db: DBSession, **_) -> tuple:
+    row = await db.execute(text("SELECT MAX(updated_at), COUNT(*) FROM content.seo_landings"))
+    return tuple(row.one())
+
+
+async def _landing_version(db: DBSession, slug: str, **_) -> tuple | None:
+    row = await db.execute(
+        text("SELECT updated_at, is_active FROM content.seo_landings WHERE slug = :slug"),
+        {"slug": slug},
+    )
+    found = row.first()
+    return None if found is None else tuple(found)
+
 
 def _row(mapping) -> dict:
     d = dict(mapping)
@@ -53,6 +70,7 @@ class LandingCreate(BaseModel):
 
 
 @router.get("", response_model=list[LandingOut])
+@conditional(_landings_version, cache_control=_LANDING_CACHE)
 async def list_landings(db: DBSession, active_only: bool = True):
     where = "WHERE is_active = true" if active_only else ""
     rows = await db.execute(
@@ -62,6 +80,7 @@ async def list_landings(db: DBSession, active_only: bool = True):
 
 
 @router.get("/{slug}", response_model=LandingOut)
+@conditional(_landing_version, cache_control=_LANDING_CACHE)
 async def get_landing(slug: str, db: DBSession):
     row = await db.execute(
         text("SELECT * FROM content.seo_landings WHERE slug = :slug AND is_active = true"),
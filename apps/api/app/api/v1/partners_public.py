@@ -19,11 +19,24 @@ from app.api.v1.portal_auth import PortalUser
 from app.deps import DBSession
 from app.models.crm import Customer
 from app.models.partners import Booking, Partner, Service, ServiceSlot
+from app.services.http_cache import cache_control, conditional
 
 router = APIRouter(prefix="/partners", tags=["partners"])
 
 PARTNER_TYPES = {"vet", "walker", "shelter", "groomer"}
 _TZ_CO = ZoneInfo("America/Bogota")
+_DIRECTORY_CACHE = cache_control(300, stale_while_revalidate=3600)
+
+
+async def _directory_version(db: DBSession, **_) -> tuple:
+    row = await db.execute(select(func.max(Partner.updated_at), func.count()))
+    return tuple(row.one())
+
+
+async def _partner_version(db: DBSession, slug: str, **_) -> tuple | None:
+    row = await db.execute(select(Partner.updated_at).where(Partner.slug == slug))
+    found = row.first()
+    return None if found is None else tuple(found)
 
 
 def _partner_out(p: Partner) -> dict:
@@ -71,6 +84,7 @@ async def _get_published_partner(slug: str, db: DBSession) -> Partner:
 
 
 @router.get("")
+@conditional(_directory_version, cache_control=_DIRECTORY_CACHE)
 async def list_partners(
     db: DBSession,
     type: str | None = Query(default=None),
@@ -121,6 +135,7 @@ async def list_partners(
 
 
 @router.get("/{slug}")
+@conditional(_partner_version, cache_control=_DIRECTORY_CACHE)
 async def get_partner(slug: str, db: DBSession) -> dict:
     partner = await _get_published_partner(slug, db)
     return _partner_out(partner)
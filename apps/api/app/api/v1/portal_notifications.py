@@ -19,6 +19,7 @@ from app.config import get_settings
 from app.deps import DBSession
 from app.models.crm import Customer
 from app.models.portal import PortalNotification
+from app.services import metrics
 
 router = APIRouter(prefix="/portal/notifications", tags=["portal"])
 
@@ -199,10 +200,13 @@ async def portal_events(customer: Customer = PortalUser):
     customer_id = str(customer.id)
 
     async def stream():
+        subscribed = False
         try:
             r = await _get_redis()
             pubsub = r.pubsub()
             await pubsub.subscribe(f"portal:notify:{customer_id}")
+            metrics.SSE_SUBSCRIBERS.inc("portal")
+            subscribed = True
             yield 'data: {"type": "connected"}\n\n'
             last_heartbeat = asyncio.get_event_loop().time()
             while True:
@@ -217,6 +221,8 @@ async def portal_events(customer: Customer = PortalUser):
         except Exception:
             yield 'data: {"type": "error"}\n\n'
         finally:
+            if subscribed:
+                metrics.SSE_SUBSCRIBERS.dec("portal")
             try:
                 await pubsub.unsubscribe(f"portal:notify:{customer_id}")
                 await r.aclose()
@@ -267,10 +273,13 @@ async def admin_events():
     """SSE stream para el panel admin — recibe notificaciones de nuevos pedidos/citas/clientes."""
 
     async def stream():
+        subscribed = False
         try:
             r = await _get_redis()
             pubsub = r.pubsub()
             await pubsub.subscribe("admin:notify")
+            metrics.SSE_SUBSCRIBERS.inc("admin")
+            subscribed = True
             yield 'data: {"type": "connected"}\n\n'
             last_heartbeat = asyncio.get_event_loop().time()
             while True:
@@ -285,6 +294,8 @@ async def admin_events():
         except Exception:
             yield 'data: {"type": "error"}\n\n'
         finally:
+            if subscribed:
+                metrics.SSE_SUBSCRIBERS.dec("admin")
             try:
                 await pubsub.unsubscribe("admin:notify")
                 await r.aclose()
@@ -17,6 +17,7 @@ from app.models.portal import ActivityLog, PortalOrder, PortalOrderItem
 from app.models.sales import Order as SalesOrder
 from app.models.sales import OrderItem as SalesOrderItem
 from app.services import meta_conversion_api as capi
+from app.services.copurchase import copurchased_with
 
 router = APIRouter(prefix="/portal/orders", tags=["portal"])
 
@@ -372,6 +373,37 @@ async def top_products(
     return result
 
 
+@router.get("/me/cart-suggestions")
+async def cart_suggestions(
+    db: DBSession,
+    customer: Customer = PortalUser,
+    product_ids: str = Query(..., description="IDs de producto del carrito, separados por coma"),
+    limit: int = Query(4, ge=1, le=12),
+) -> list[dict]:
+    """Sugerencias "Completa tu pedido": lo que más se compra junto con el carrito
+    (matriz de co-compra). Sin stock, como el resto del portal."""
+    ids: list[uuid.UUID] = []
+    for raw in product_ids.split(","):
+        try:
+            ids.append(uuid.UUID(raw.strip()))
+        except ValueError:
+            continue
+    if not ids:
+        return []
+
+    rows = await copurchased_with(db, ids, limit, published_only=True)
+    return [
+        {
+            "id": str(p.id),
+            "name": p.name,
+            "price": float(p.price) if p.price else 0,
+            "image_url": p.primary_image_url,
+            "sku": p.sku,
+        }
+        for p, *_ in rows
+    ]
+
+
 # ── timeline del pedido (cliente) ──────────────────────────────────────
 
 ACTION_LABELS: dict[str, str] = {
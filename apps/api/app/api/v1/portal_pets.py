@@ -16,6 +16,7 @@ from app.api.v1.portal_auth import PortalUser
 from app.deps import DBSession
 from app.models.crm import Customer
 from app.models.portal import HealthRecord, Pet
+from app.services import metrics
 
 router = APIRouter(prefix="/portal/pets", tags=["portal"])
 
@@ -575,7 +576,8 @@ async def carnet_pdf(
     )
 
     # base_url permite que las rutas relativas fonts/ y assets/ funcionen
-    pdf_bytes = HTML(string=html_str, base_url=str(_TEMPLATES_DIR)).write_pdf()
+    with metrics.PDF_RENDER_SECONDS.time("pet_card"):
+        pdf_bytes = HTML(string=html_str, base_url=str(_TEMPLATES_DIR)).write_pdf()
 
     safe_name = pet.name.lower().replace(" ", "_")
     return Response(
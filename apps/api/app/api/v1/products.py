@@ -15,7 +15,7 @@ from sqlalchemy import func, or_, select, update
 from app.deps import DBSession, require_permission
 from app.models.catalog import Brand, Category, Product, ProductReview
 from app.models.crm import Customer
-from app.models.inventory import Stock
+from app.models.inventory import ProductAvailability
 from app.models.purchasing import Supplier, SupplierSkuMap
 from app.schemas.catalog import (
     BrandOut,
@@ -26,6 +26,18 @@ from app.schemas.catalog import (
     ProductUpdate,
     RecentReviewOut,
 )
+from app.services.catalog_events import publish_product_changes
+from app.services.http_cache import cache_control, conditional
+from app.services.keyset import InvalidCursorError, after_condition, decode_cursor, encode_cursor
+from app.services.product_loading import PRODUCT_OUT, load_product
+from app.services.related_products import rebuild_related, related_for
+from app.services.stock_availability import (
+    availability_join,
+    in_stock_condition,
+    stock_qty_col,
+    stock_quantities,
+    stock_quantity,
+)
 
 router = APIRouter(prefix="/products", tags=["catalog"])
 brands_router = APIRouter(prefix="/brands", tags=["catalog"])
@@ -37,6 +49,58 @@ admin_products_router = APIRouter(
 )
 
 
+# Cache-Control de los endpoints públicos del storefront (con ETag por versión)
+PRODUCT_CACHE = cache_control(60, stale_while_revalidate=600)
+TAXONOMY_CACHE = cache_control(3600, stale_while_revalidate=86400)
+
+
+async def _catalog_version(db: DBSession, **_) -> tuple:
+    """Versión del catálogo público: último cambio de productos, stock y taxonomía."""
+    row = (
+        await db.execute(
+            select(
+                select(func.max(Product.updated_at)).scalar_subquery(),
+                select(func.max(ProductAvailability.updated_at)).scalar_subquery(),
+                select(func.max(Category.updated_at)).scalar_subquery(),
+                select(func.max(Brand.updated_at)).scalar_subquery(),
+            )
+        )
+    ).one()
+    return tuple(row)
+
+
+async def _product_version(db: DBSession, slug: str, **_) -> tuple | None:
+    """Versión de la ficha: producto, su stock, marca/categoría y sus reseñas."""
+    reviews = (
+        select(func.max(ProductReview.updated_at))
+        .where(ProductReview.product_id == Product.id)
+        .scalar_subquery()
+    )
+    row = (
+        await db.execute(
+            select(
+                Product.updated_at,
+                ProductAvailability.updated_at,
+                Brand.updated_at,
+                Category.updated_at,
+                reviews,
+            )
+            .outerjoin(ProductAvailability, ProductAvailability.product_id == Product.id)
+            .outerjoin(Brand, Brand.id == Product.brand_id)
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(Product.slug == slug)
+        )
+    ).first()
+    return None if row is None else tuple(row)
+
+
+def _taxonomy_version(model):
+    async def version(db: DBSession, **_) -> tuple:
+        return tuple((await db.execute(select(func.max(model.updated_at), func.count()))).one())
+
+    return version
+
+
 async def _supplier_map(db: DBSession, product_ids: list) -> dict:
     """Devuelve {product_id: (supplier_id_str, supplier_name)} usando el ultimo
     proveedor asociado en purchasing.supplier_sku_map (por last_seen_at)."""
@@ -132,8 +196,19 @@ async def list_products(
     is_featured: bool | None = None,
     page: int = Query(1, ge=1),
     per_page: int = Query(24, ge=1, le=100),
+    cursor: bool = Query(False, description="Paginación keyset; la respuesta trae next_cursor"),
+    after: str | None = Query(None, description="Token next_cursor de la página anterior"),
 ):
-    stmt = select(Product).where(Product.deleted_at.is_(None))
+    keyset_mode = cursor or after is not None
+    cached: dict = {}
+    key = None
+    if after:
+        try:
+            key, cached = decode_cursor(after, "products")
+        except InvalidCursorError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e)) from e
+
+    stmt = select(Product).options(*PRODUCT_OUT).where(Product.deleted_at.is_(None))
     count_stmt = select(func.count(Product.id)).where(Product.deleted_at.is_(None))
 
     if q:
@@ -185,22 +260,24 @@ async def list_products(
         stmt = stmt.where(Product.id.notin_(sub_all))
         count_stmt = count_stmt.where(Product.id.notin_(sub_all))
 
-    total = (await db.execute(count_stmt)).scalar_one()
-    stmt = stmt.order_by(Product.created_at.desc()).offset((page - 1) * per_page).limit(per_page)
-    rows = (await db.execute(stmt)).scalars().all()
+    total = cached["total"] if cached else (await db.execute(count_stmt)).scalar_one()
+    stmt = stmt.order_by(Product.created_at.desc(), Product.id.desc())
+    next_cursor = None
+    if keyset_mode:
+        if key is not None:
+            stmt = stmt.where(after_condition([Product.created_at, Product.id], key))
+        rows = (await db.execute(stmt.limit(per_page + 1))).scalars().all()
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            next_cursor = encode_cursor(
+                "products", (rows[-1].created_at, rows[-1].id), {"total": total}
+            )
+    else:
+        stmt = stmt.offset((page - 1) * per_page).limit(per_page)
+        rows = (await db.execute(stmt)).scalars().all()
 
-    # Fetch stock totals for all products in one query
     product_ids = [r.id for r in rows]
-    stock_map: dict = {}
-    if product_ids:
-        stock_rows = (
-            await db.execute(
-                select(Stock.product_id, func.sum(Stock.quantity).label("qty"))
-                .where(Stock.product_id.in_(product_ids))
-                .group_by(Stock.product_id)
-            )
-        ).all()
-        stock_map = {r.product_id: int(r.qty or 0) for r in stock_rows}
+    stock_map = await stock_quantities(db, product_ids)
 
     supplier_map = await _supplier_map(db, product_ids)
 
@@ -221,11 +298,13 @@ async def list_products(
         page=page,
         per_page=per_page,
         pages=max(1, math.ceil(total / per_page)),
+        next_cursor=next_cursor,
     )
 
 
 # ----------------------------- Advanced catalog with facets -----------------
 @router.get("/catalog")
+@conditional(_catalog_version, cache_control=PRODUCT_CACHE)
 async def catalog_products(
     db: DBSession,
     category_slug: str | None = None,
@@ -241,14 +320,17 @@ async def catalog_products(
     page: int = Query(1, ge=1),
     page_size: int = Query(40, ge=1, le=100),
 ):
-    """Advanced catalog endpoint with facet filtering and counts."""
+    """Advanced catalog endpoint with facet filtering and counts.
+
+    Las facetas se calculan en SQL (`catalog_facets.facet_counts`) filtradas por
+    la selección activa; el total viaja en la misma query de la página.
+    """
     from sqlalchemy import text as sql_text
 
-    stmt = select(Product).where(
-        Product.is_published == True,  # noqa: E712
-        Product.deleted_at.is_(None),
-    )
+    from app.services.catalog_facets import facet_counts
 
+    # Filtros que no son facetas (acotan también los conteos de facetas)
+    base_conditions: list = []
     if category_slug:
         cat = (
             await db.execute(
@@ -256,38 +338,52 @@ async def catalog_products(
             )
         ).scalar_one_or_none()
         if cat:
-            stmt = stmt.where(Product.category_id == cat.id)
+            base_conditions.append(Product.category_id == cat.id)
+
+    if price_min is not None:
+        base_conditions.append(Product.price >= price_min)
+    if price_max is not None:
+        base_conditions.append(Product.price <= price_max)
+
+    if health_concerns:
+        concerns = [c.strip() for c in health_concerns.split(",")]
+        base_conditions.append(
+            sql_text("health_concerns && ARRAY[:concerns]::text[]").bindparams(concerns=concerns)
+        )
 
+    # Selección de facetas — cada faceta se cuenta sin su propio filtro
+    selection: dict = {}
     if life_stage:
         stages = [s.strip() for s in life_stage.split(",")]
-        stmt = stmt.where(Product.life_stage.in_(stages))
+        selection["life_stage"] = Product.life_stage.in_(stages)
 
     if size_range:
         sizes = [s.strip() for s in size_range.split(",")]
-        stmt = stmt.where(Product.size_range.in_(sizes))
+        selection["size_range"] = Product.size_range.in_(sizes)
 
     if brand:
         brands_list = [b.strip() for b in brand.split(",")]
-        stmt = stmt.where(Product.brand_normalized.in_(brands_list))
+        selection["brand"] = Product.brand_normalized.in_(brands_list)
 
     if pet_type:
-        stmt = stmt.where(
-            or_(
-                Product.pet_type == pet_type,
-                Product.pet_type == "both",
-            )
+        selection["pet_type"] = or_(
+            Product.pet_type == pet_type,
+            Product.pet_type == "both",
         )
 
-    if price_min is not None:
-        stmt = stmt.where(Product.price >= price_min)
-    if price_max is not None:
-        stmt = stmt.where(Product.price <= price_max)
+    if in_stock:
+        base_conditions.append(in_stock_condition())
 
-    if health_concerns:
-        concerns = [c.strip() for c in health_concerns.split(",")]
-        stmt = stmt.where(
-            sql_text("health_concerns && ARRAY[:concerns]::text[]").bindparams(concerns=concerns)
+    stmt = (
+        select(Product, stock_qty_col, func.count().over().label("total"))
+        .options(*PRODUCT_OUT)
+        .where(
+            Product.is_published == True,  # noqa: E712
+            Product.deleted_at.is_(None),
+            *base_conditions,
+            *selection.values(),
         )
+    )
 
     if sort == "price_asc":
         stmt = stmt.order_by(Product.price.asc())
@@ -298,63 +394,30 @@ async def catalog_products(
     else:
         stmt = stmt.order_by(Product.created_at.desc())
 
-    count_stmt = select(func.count()).select_from(stmt.subquery())
-    total = (await db.execute(count_stmt)).scalar_one()
-
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    rows = (await db.execute(stmt)).scalars().all()
-
-    product_ids = [r.id for r in rows]
-    stock_map: dict = {}
-    if product_ids:
-        stock_rows = (
-            await db.execute(
-                select(Stock.product_id, func.sum(Stock.quantity).label("qty"))
-                .where(Stock.product_id.in_(product_ids))
-                .group_by(Stock.product_id)
-            )
-        ).all()
-        stock_map = {r.product_id: int(r.qty or 0) for r in stock_rows}
+    stmt = availability_join(stmt).offset((page - 1) * page_size).limit(page_size)
+    page_rows = (await db.execute(stmt)).all()
+    rows = [(r[0], int(r[1])) for r in page_rows]
+    if page_rows:
+        total = int(page_rows[0].total)
+    else:
+        # Página fuera de rango: el total no viaja en filas vacías
+        count_stmt = select(func.count(Product.id)).where(
+            Product.is_published == True,  # noqa: E712
+            Product.deleted_at.is_(None),
+            *base_conditions,
+            *selection.values(),
+        )
+        total = (await db.execute(count_stmt)).scalar_one()
 
     items = []
-    for r in rows:
-        stock_qty = stock_map.get(r.id, 0)
-        if in_stock and stock_qty == 0:
-            continue
+    for r, stock_qty in rows:
         p_out = ProductOut.model_validate(r)
         p_out.stock_qty = stock_qty
         p_out.in_stock = stock_qty > 0
         items.append(p_out)
 
-    facets: dict = {}
     try:
-        facet_stmt = select(Product).where(
-            Product.is_published == True,  # noqa: E712
-            Product.deleted_at.is_(None),
-        )
-        facet_rows = (await db.execute(facet_stmt)).scalars().all()
-
-        life_stages: dict = {}
-        size_ranges: dict = {}
-        brands_count: dict = {}
-        pet_types: dict = {}
-
-        for p in facet_rows:
-            if p.life_stage and p.life_stage != "all":
-                life_stages[p.life_stage] = life_stages.get(p.life_stage, 0) + 1
-            if p.size_range and p.size_range != "all":
-                size_ranges[p.size_range] = size_ranges.get(p.size_range, 0) + 1
-            if p.brand_normalized:
-                brands_count[p.brand_normalized] = brands_count.get(p.brand_normalized, 0) + 1
-            if p.pet_type and p.pet_type != "both":
-                pet_types[p.pet_type] = pet_types.get(p.pet_type, 0) + 1
-
-        facets = {
-            "life_stages": life_stages,
-            "size_ranges": size_ranges,
-            "brands": dict(sorted(brands_count.items(), key=lambda x: -x[1])[:20]),
-            "pet_types": pet_types,
-        }
+        facets = await facet_counts(db, base_conditions, selection)
     except Exception:
         facets = {}
 
@@ -369,14 +432,11 @@ async def catalog_products(
 
 @router.get("/{product_id}", response_model=ProductOut)
 async def get_product(product_id: uuid.UUID, db: DBSession):
-    p = (await db.execute(select(Product).where(Product.id == product_id))).scalar_one_or_none()
+    p = await load_product(db, Product.id == product_id)
     if p is None or p.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     p_out = ProductOut.model_validate(p)
-    stock_rows = (
-        await db.execute(select(func.sum(Stock.quantity)).where(Stock.product_id == p.id))
-    ).scalar_one()
-    p_out.stock_qty = int(stock_rows or 0)
+    p_out.stock_qty = await stock_quantity(db, p.id)
     p_out.in_stock = p_out.stock_qty > 0
     supplier_map = await _supplier_map(db, [p.id])
     sup = supplier_map.get(p.id)
@@ -401,15 +461,13 @@ async def get_product_redirect_target(slug: str, db: DBSession):
 
 
 @router.get("/by-slug/{slug}", response_model=ProductOut)
+@conditional(_product_version, cache_control=PRODUCT_CACHE)
 async def get_product_by_slug(slug: str, db: DBSession):
-    p = (await db.execute(select(Product).where(Product.slug == slug))).scalar_one_or_none()
+    p = await load_product(db, Product.slug == slug)
     if p is None or p.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     p_out = ProductOut.model_validate(p)
-    stock_total = (
-        await db.execute(select(func.sum(Stock.quantity)).where(Stock.product_id == p.id))
-    ).scalar_one()
-    p_out.stock_qty = int(stock_total or 0)
+    p_out.stock_qty = await stock_quantity(db, p.id)
     p_out.in_stock = p_out.stock_qty > 0
 
     # Reseñas recientes aprobadas para JSON-LD (max 5)
@@ -445,42 +503,35 @@ async def related_products(
     db: DBSession,
     limit: int = Query(4, ge=1, le=12),
 ):
-    """Productos relacionados (misma categoría, sin el propio producto)."""
-    product = (
-        await db.execute(
-            select(Product).where(Product.id == product_id).where(Product.deleted_at.is_(None))
-        )
-    ).scalar_one_or_none()
-    if not product:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-    stmt = (
-        select(Product)
-        .where(Product.deleted_at.is_(None))
-        .where(Product.is_published == True)  # noqa: E712
-        .where(Product.id != product_id)
-    )
-    if product.category_id:
-        stmt = stmt.where(Product.category_id == product.category_id)
-    stmt = stmt.order_by(Product.is_featured.desc(), Product.created_at.desc()).limit(limit)
-    rows = (await db.execute(stmt)).scalars().all()
-
-    product_ids = [r.id for r in rows]
-    stock_map: dict = {}
-    if product_ids:
-        stock_rows = (
+    """Productos relacionados precalculados (`catalog.product_related`): una
+    lectura por PK. Si el producto aún no tiene vecinos calculados se cae a la
+    misma categoría."""
+    rows = await related_for(db, product_id, limit)
+    if not rows:
+        product = (
             await db.execute(
-                select(Stock.product_id, func.sum(Stock.quantity).label("qty"))
-                .where(Stock.product_id.in_(product_ids))
-                .group_by(Stock.product_id)
+                select(Product).where(Product.id == product_id).where(Product.deleted_at.is_(None))
             )
-        ).all()
-        stock_map = {r.product_id: int(r.qty or 0) for r in stock_rows}
+        ).scalar_one_or_none()
+        if not product:
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+        stmt = availability_join(
+            select(Product, stock_qty_col)
+            .options(*PRODUCT_OUT)
+            .where(Product.deleted_at.is_(None))
+            .where(Product.is_published == True)  # noqa: E712
+            .where(Product.id != product_id)
+        )
+        if product.category_id:
+            stmt = stmt.where(Product.category_id == product.category_id)
+        stmt = stmt.order_by(Product.is_featured.desc(), Product.created_at.desc()).limit(limit)
+        rows = (await db.execute(stmt)).all()
 
     items = []
-    for r in rows:
+    for r, qty in rows:
         p_out = ProductOut.model_validate(r)
-        p_out.stock_qty = stock_map.get(r.id, 0)
+        p_out.stock_qty = int(qty)
         p_out.in_stock = p_out.stock_qty > 0
         items.append(p_out)
     return items
@@ -501,8 +552,10 @@ async def create_product(payload: ProductCreate, db: DBSession):
     await db.flush()
     if supplier_id is not None:
         await _upsert_product_supplier(db, p, supplier_id)
+    await rebuild_related(db, p.id)
     await db.commit()
-    await db.refresh(p)
+    p = await load_product(db, Product.id == p.id)
+    await publish_product_changes(p.id)
     out = ProductOut.model_validate(p)
     if supplier_id is not None:
         sup = (await _supplier_map(db, [p.id])).get(p.id)
@@ -528,6 +581,7 @@ async def delete_product(product_id: uuid.UUID, db: DBSession):
     p.is_published = False
     p.is_active = False
     await db.commit()
+    await publish_product_changes(product_id)
     return {"ok": True, "id": str(product_id)}
 
 
@@ -556,8 +610,11 @@ async def update_product(product_id: uuid.UUID, payload: ProductUpdate, db: DBSe
             p.brand_normalized = None
     if supplier_id is not None:
         await _upsert_product_supplier(db, p, supplier_id)
+    await db.flush()
+    await rebuild_related(db, p.id)
     await db.commit()
-    await db.refresh(p)
+    p = await load_product(db, Product.id == p.id)
+    await publish_product_changes(p.id)
     out = ProductOut.model_validate(p)
     sup = (await _supplier_map(db, [p.id])).get(p.id)
     if sup:
@@ -598,7 +655,10 @@ async def export_products_xlsx(db: DBSession):
     rows = (
         (
             await db.execute(
-                select(Product).where(Product.deleted_at.is_(None)).order_by(Product.name)
+                select(Product)
+                .options(*PRODUCT_OUT)
+                .where(Product.deleted_at.is_(None))
+                .order_by(Product.name)
             )
         )
         .scalars()
@@ -728,6 +788,7 @@ async def import_products_xlsx(file: UploadFile = File(...), db: DBSession = ...
             error_details.append(f"SKU {sku}: {e}")
 
     await db.commit()
+    await publish_product_changes()
     return {
         "ok": errors == 0,
         "updated": updated,
@@ -739,6 +800,7 @@ async def import_products_xlsx(file: UploadFile = File(...), db: DBSession = ...
 
 # ----------------------------- Brands ---------------------------------------
 @brands_router.get("", response_model=list[BrandOut])
+@conditional(_taxonomy_version(Brand), cache_control=TAXONOMY_CACHE)
 async def list_brands(db: DBSession):
     rows = (
         (await db.execute(select(Brand).where(Brand.deleted_at.is_(None)).order_by(Brand.name)))
@@ -750,6 +812,7 @@ async def list_brands(db: DBSession):
 
 # ----------------------------- Categories -----------------------------------
 @categories_router.get("", response_model=list[CategoryOut])
+@conditional(_taxonomy_version(Category), cache_control=TAXONOMY_CACHE)
 async def list_categories(db: DBSession):
     rows = (
         (
@@ -15,6 +15,7 @@ from app.deps import CurrentUser, DBSession, require_permission
 from app.models.catalog import Product
 from app.models.inventory import Stock, StockLocation, StockMovement
 from app.models.purchasing import Purchase, PurchaseItem, SupplierSkuMap
+from app.services.response_cache import invalidate
 
 router = APIRouter(prefix="/purchases", tags=["purchases"])
 
@@ -420,6 +421,7 @@ async def create_purchase(
     await _upsert_supplier_sku_map(db, purchase, items_db)
 
     await db.commit()
+    await invalidate("purchases")
     await db.refresh(purchase)
 
     return await get_purchase(purchase.id, db)
@@ -459,6 +461,7 @@ async def update_purchase(
 
     purchase.updated_by = user.email
     await db.commit()
+    await invalidate("purchases")
     return await get_purchase(purchase_id, db)
 
 
@@ -480,6 +483,7 @@ async def delete_purchase(purchase_id: uuid.UUID, db: DBSession):
         )
     await db.delete(purchase)
     await db.commit()
+    await invalidate("purchases")
 
 
 @router.post(
@@ -507,6 +511,7 @@ async def receive_purchase(
     purchase.updated_by = user.email
     await _apply_stock_and_cost(db, purchase, list(purchase.items), user.email)
     await db.commit()
+    await invalidate("purchases", "inventory")
     return await get_purchase(purchase_id, db)
 
 
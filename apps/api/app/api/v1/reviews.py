@@ -16,6 +16,7 @@ from app.deps import DBSession, require_permission
 from app.models.catalog import GBPReviewCache, Product, ProductReview
 from app.models.crm import Customer
 from app.models.portal import PortalOrder, PortalOrderItem
+from app.services.http_cache import cache_control, conditional
 
 # ── Schemas ───────────────────────────────────────────────────────────────────
 
@@ -399,7 +400,15 @@ async def reply_review(
 # ── Endpoint público GBP reviews ──────────────────────────────────────────────
 
 
+async def _gbp_version(db: DBSession, **_) -> tuple:
+    row = await db.execute(
+        select(func.max(GBPReviewCache.fetched_at), func.count(), func.sum(GBPReviewCache.rating))
+    )
+    return tuple(row.one())
+
+
 @public_router.get("/gbp-reviews")
+@conditional(_gbp_version, cache_control=cache_control(3600, stale_while_revalidate=86400))
 async def public_gbp_reviews(limit: int = 6, db: DBSession = ...):
     limit = min(limit, 20)
     rows = (
@@ -17,6 +17,9 @@ from app.models.catalog import Product
 from app.models.inventory import Stock, StockLocation, StockMovement
 from app.models.sales import Order, OrderItem, Payment
 from app.schemas.sales import OrderCreate, OrderOut
+from app.services.keyset import InvalidCursorError, after_condition, decode_cursor, encode_cursor
+from app.services.order_numbers import next_order_number
+from app.services.response_cache import invalidate
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
@@ -38,26 +41,6 @@ def _normalizar_estado_pago(saldo: Decimal, total: Decimal) -> str:
     return "Abono parcial"
 
 
-async def _next_order_number(db) -> str:
-    """Formato BP-YYYYMMDD-XXXX."""
-    today = datetime.now(UTC).strftime("%Y%m%d")
-    last = (
-        await db.execute(
-            select(Order.order_number)
-            .where(Order.order_number.like(f"BP-{today}-%"))
-            .order_by(desc(Order.order_number))
-            .limit(1)
-        )
-    ).scalar_one_or_none()
-    seq = 1
-    if last:
-        try:
-            seq = int(last.split("-")[-1]) + 1
-        except (ValueError, IndexError):
-            seq = 1
-    return f"BP-{today}-{seq:04d}"
-
-
 @router.post(
     "/orders",
     response_model=OrderOut,
@@ -80,17 +63,45 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
     if loc is None:
         raise HTTPException(status_code=500, detail="No hay location default")
 
-    # Lock pesimista sobre los productos involucrados (ordenado por id para evitar deadlocks)
-    product_ids = sorted({i.product_id for i in payload.items}, key=str)
+    # nextval no bloquea: el número se toma en la misma transacción
+    order_number = await next_order_number(db)
 
-    products: dict[uuid.UUID, Product] = {}
+    # Lock pesimista en bloque: productos y filas de stock en una query cada uno,
+    # siempre en orden de id para que dos checkouts concurrentes no hagan deadlock.
+    product_ids = sorted({i.product_id for i in payload.items})
+
+    locked = (
+        (
+            await db.execute(
+                select(Product)
+                .where(Product.id.in_(product_ids))
+                .order_by(Product.id)
+                .with_for_update(of=Product)
+            )
+        )
+        .scalars()
+        .all()
+    )
+    products: dict[uuid.UUID, Product] = {p.id: p for p in locked}
     for pid in product_ids:
-        p = (
-            await db.execute(select(Product).where(Product.id == pid).with_for_update(of=Product))
-        ).scalar_one_or_none()
+        p = products.get(pid)
         if p is None or p.deleted_at is not None or not p.is_active:
             raise HTTPException(status_code=400, detail=f"Producto inválido: {pid}")
-        products[pid] = p
+
+    stocks: dict[uuid.UUID, Stock] = {
+        s.product_id: s
+        for s in (
+            await db.execute(
+                select(Stock)
+                .where(Stock.product_id.in_(product_ids))
+                .where(Stock.location_id == loc.id)
+                .order_by(Stock.product_id)
+                .with_for_update()
+            )
+        )
+        .scalars()
+        .all()
+    }
 
     # Construir items y validar stock
     occurred_at = payload.occurred_at or datetime.now(UTC)
@@ -98,7 +109,9 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
         occurred_at = occurred_at.replace(tzinfo=UTC)
 
     order = Order(
-        order_number=await _next_order_number(db),
+        # id generado acá para enlazar los movimientos antes del flush (un solo flush)
+        id=uuid.uuid4(),
+        order_number=order_number,
         channel=payload.channel,
         status="confirmed",
         customer_id=payload.customer_id,
@@ -110,8 +123,7 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
 
     subtotal = Decimal("0")
     discount_total = Decimal("0")
-    # Colecto movimientos ANTES del flush para poder asignar order.id después
-    pending_movements: list[StockMovement] = []
+    movements: list[StockMovement] = []
 
     for item_in in payload.items:
         prod = products[item_in.product_id]
@@ -137,15 +149,8 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
             )
         )
 
-        # Lock + descuento de stock
-        stock = (
-            await db.execute(
-                select(Stock)
-                .where(Stock.product_id == prod.id)
-                .where(Stock.location_id == loc.id)
-                .with_for_update()
-            )
-        ).scalar_one_or_none()
+        # Descuento sobre la fila ya bloqueada (acumula si el producto se repite)
+        stock = stocks.get(prod.id)
         if stock is None or stock.quantity < item_in.quantity:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -153,7 +158,7 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
             )
         stock.quantity -= item_in.quantity
 
-        pending_movements.append(
+        movements.append(
             StockMovement(
                 product_id=prod.id,
                 location_id=loc.id,
@@ -162,6 +167,7 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
                 quantity_after=stock.quantity,
                 unit_cost=unit_cost,
                 reference_type="ORDER",
+                reference_id=order.id,
                 occurred_at=occurred_at,
                 created_by=user.email,
             )
@@ -192,15 +198,12 @@ async def create_order(payload: OrderCreate, db: DBSession, user: CurrentUser) -
     if payload.payments:
         order.payment_method = payload.payments[0].method
 
+    # Un solo flush: el unit of work agrupa los INSERT de ítems, pagos y movimientos
+    # en sentencias multi-fila y los UPDATE de stock en un executemany.
     db.add(order)
-    await db.flush()  # obtiene order.id
-
-    # Ahora que tenemos order.id, añadimos los movimientos con reference_id correcto
-    for mv in pending_movements:
-        mv.reference_id = order.id
-        db.add(mv)
-
+    db.add_all(movements)
     await db.commit()
+    await invalidate("sales", "inventory")
     await db.refresh(order)
     return order
 
@@ -276,16 +279,31 @@ async def list_orders(
     payment_status: str | None = None,
     date_from: str | None = None,
     date_to: str | None = None,
+    cursor: bool = Query(False, description="Paginación keyset; la respuesta trae next_cursor"),
+    after: str | None = Query(None, description="Token next_cursor de la página anterior"),
 ):
     """Lista órdenes con búsqueda por número, producto o cliente, filtros y paginación.
 
     `q` es un buscador rápido de texto libre (OR entre orden/producto/cliente/notas).
     `product_q` y `customer_q` son filtros dedicados que se combinan con AND entre sí
     y con `q`, para acotar p.ej. "facturas de este cliente que incluyan este producto".
+
+    Con `cursor=true` (o `after`) pagina por keyset sobre (occurred_at, id) en vez de
+    OFFSET; `page` se ignora y los totales se calculan solo en la primera página y
+    viajan dentro del token.
     """
     from datetime import date as dt_date
 
-    stmt = select(Order).order_by(desc(Order.occurred_at))
+    keyset_mode = cursor or after is not None
+    cached: dict = {}
+    key = None
+    if after:
+        try:
+            key, cached = decode_cursor(after, "orders")
+        except InvalidCursorError as e:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e)) from e
+
+    stmt = select(Order).order_by(desc(Order.occurred_at), desc(Order.id))
     count_stmt = select(func.count()).select_from(Order)
 
     if status_filter:
@@ -327,8 +345,6 @@ async def list_orders(
         except ValueError:
             pass
 
-    total = (await db.execute(count_stmt)).scalar_one()
-
     # Revenue aggregate (same filters, excludes cancelled)
     rev_stmt = (
         select(
@@ -365,13 +381,34 @@ async def list_orders(
             rev_stmt = rev_stmt.where(Order.occurred_at < d_end)
         except ValueError:
             pass
-    rev_row = (await db.execute(rev_stmt)).one()
-    total_revenue = float(rev_row.revenue)
-    active_count = int(rev_row.cnt)
+    if cached:
+        # Páginas siguientes en modo cursor: totales calculados en la primera página
+        total = cached["total"]
+        total_revenue = cached["total_revenue"]
+        active_count = cached["active_count"]
+    else:
+        total = (await db.execute(count_stmt)).scalar_one()
+        rev_row = (await db.execute(rev_stmt)).one()
+        total_revenue = float(rev_row.revenue)
+        active_count = int(rev_row.cnt)
     avg_ticket = total_revenue / active_count if active_count > 0 else 0.0
 
-    offset = (page - 1) * page_size
-    rows = (await db.execute(stmt.offset(offset).limit(page_size))).scalars().all()
+    next_cursor = None
+    if keyset_mode:
+        if key is not None:
+            stmt = stmt.where(after_condition([Order.occurred_at, Order.id], key))
+        rows = (await db.execute(stmt.limit(page_size + 1))).scalars().all()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                "orders",
+                (last.occurred_at, last.id),
+                {"total": total, "total_revenue": total_revenue, "active_count": active_count},
+            )
+    else:
+        offset = (page - 1) * page_size
+        rows = (await db.execute(stmt.offset(offset).limit(page_size))).scalars().all()
 
     # Batch-load nombres de clientes para evitar N+1 queries
     from app.models.crm import Customer as CRMCustomer
@@ -406,6 +443,7 @@ async def list_orders(
         "active_count": active_count,
         "page": page,
         "page_size": page_size,
+        "next_cursor": next_cursor,
     }
 
 
@@ -471,6 +509,7 @@ async def cancel_order(
         "cancel_reason": reason or "",
     }
     await db.commit()
+    await invalidate("sales", "inventory")
     return {"ok": True, "order_number": o.order_number}
 
 
@@ -500,6 +539,7 @@ async def mark_order_paid(
             o.balance_due = Decimal("0")
             o.updated_by = user.email
             await db.commit()
+            await invalidate("sales")
         return {
             "ok": True,
             "order_number": o.order_number,
@@ -530,6 +570,7 @@ async def mark_order_paid(
     o.updated_by = user.email
 
     await db.commit()
+    await invalidate("sales")
     return {
         "ok": True,
         "order_number": o.order_number,
@@ -1,15 +1,57 @@
-"""Fuzzy product search using pg_trgm trigram similarity."""
+"""Fuzzy product search using pg_trgm over the indexed `search_text` column."""
 
 from __future__ import annotations
 
-from fastapi import APIRouter, Query
-from sqlalchemy import func, or_, select, text
+import structlog
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import DBAPIError
 
+from app.config import get_settings
 from app.deps import DBSession
 from app.models.catalog import Product
-from app.models.inventory import Stock
+from app.services.product_loading import PRODUCT_BRAND
+from app.services.slug_redirects import get_redirects
+from app.services.stock_availability import availability_join, stock_qty_col
+from app.services.typeahead import get_typeahead
 
 router = APIRouter(prefix="/search", tags=["search"])
+log = structlog.get_logger("search")
+
+# Threshold for `<%` (word_similarity). pg_trgm's default of 0.6 drops common
+# typos in long product names ("royl canin cachoro").
+WORD_SIMILARITY_THRESHOLD = 0.45
+_QUERY_CANCELED = "57014"
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_statement(q: str, limit: int):
+    """Single ranked query: product (+ brand eager join) + stock.
+
+    Every predicate is served by a GIN trigram index (`search_text`, `sku`);
+    the query text is normalized with the same immutable unaccent/lower used by
+    the generated column, so Postgres folds it to a constant at plan time.
+    """
+    q_norm = func.catalog.f_unaccent(func.lower(q))
+    sim = func.word_similarity(q_norm, Product.search_text).label("sim")
+    stmt = availability_join(
+        select(Product, sim, stock_qty_col.label("stock_qty")).options(*PRODUCT_BRAND)
+    )
+    return (
+        stmt.where(
+            Product.is_published == True,  # noqa: E712
+            or_(
+                q_norm.op("<%")(Product.search_text),
+                Product.search_text.op("%")(q_norm),
+                Product.sku.ilike(f"%{_like_escape(q)}%", escape="\\"),
+            ),
+        )
+        .order_by(sim.desc(), Product.name)
+        .limit(limit)
+    )
 
 
 @router.get("")
@@ -18,66 +60,34 @@ async def search_products(
     q: str = Query(..., min_length=1, max_length=200),
     limit: int = Query(20, ge=1, le=60),
 ):
-    """Fuzzy product search with trigram similarity (pg_trgm required)."""
+    """Fuzzy product search with trigram similarity (pg_trgm required).
+
+    Bounded by `settings.search_timeout_ms`: if Postgres cancels the query the
+    response is empty with `timed_out: true` (no fallback table scan).
+    """
     q_clean = q.strip()
 
-    # brand_normalized is a text column; brand is a relationship — use brand_normalized for search
-    try:
-        stmt = (
-            select(
-                Product,
-                func.greatest(
-                    func.similarity(Product.name, q_clean),
-                    func.similarity(func.coalesce(Product.brand_normalized, ""), q_clean) * 0.8,
-                ).label("sim"),
-            )
-            .where(
-                Product.is_published == True,  # noqa: E712
-                or_(
-                    func.similarity(Product.name, q_clean) > 0.15,
-                    func.similarity(func.coalesce(Product.brand_normalized, ""), q_clean) > 0.2,
-                    Product.name.ilike(f"%{q_clean}%"),
-                    Product.sku.ilike(f"%{q_clean}%"),
-                ),
-            )
-            .order_by(
-                text("sim DESC"),
-                Product.name,
-            )
-            .limit(limit)
+    # Budget + threshold only for this transaction (the session ends with the request)
+    await db.execute(
+        select(
+            func.set_config("statement_timeout", f"{get_settings().search_timeout_ms}ms", True),
+            func.set_config(
+                "pg_trgm.word_similarity_threshold", str(WORD_SIMILARITY_THRESHOLD), True
+            ),
         )
-        rows = await db.execute(stmt)
-        products = rows.all()
-    except Exception:
-        stmt = (
-            select(Product)
-            .where(
-                Product.is_published == True,  # noqa: E712
-                or_(
-                    Product.name.ilike(f"%{q_clean}%"),
-                    Product.sku.ilike(f"%{q_clean}%"),
-                ),
-            )
-            .limit(limit)
-        )
-        rows = await db.execute(stmt)
-        products = [(p, None) for p in rows.scalars().all()]
-
-    if not products:
-        return {"results": [], "query": q_clean, "total": 0}
-
-    product_ids = [p.id for p, _ in products]
-    stock_stmt = (
-        select(Stock.product_id, func.sum(Stock.quantity).label("qty"))
-        .where(Stock.product_id.in_(product_ids))
-        .group_by(Stock.product_id)
     )
-    stock_rows = await db.execute(stock_stmt)
-    stock_map = {r.product_id: int(r.qty or 0) for r in stock_rows}
+    try:
+        products = (await db.execute(_search_statement(q_clean, limit))).all()
+    except DBAPIError as e:
+        if getattr(e.orig, "sqlstate", None) != _QUERY_CANCELED:
+            raise
+        await db.rollback()
+        log.warning("search_timeout", q=q_clean)
+        return {"results": [], "query": q_clean, "total": 0, "timed_out": True}
 
     results = []
-    for product, sim in products:
-        stock_qty = stock_map.get(product.id, 0)
+    for product, sim, stock_qty in products:
+        stock_qty = int(stock_qty or 0)
         results.append(
             {
                 "id": str(product.id),
@@ -99,23 +109,34 @@ async def search_products(
     return {"results": results, "query": q_clean, "total": len(results)}
 
 
-@router.get("/redirect")
-async def slug_redirect(
-    db: DBSession,
-    old: str = Query(..., min_length=1),
+@router.get("/suggest")
+async def search_suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
 ):
-    """Check if a slug has a 301 redirect registered."""
-    stmt = text("""
-        UPDATE catalog.slug_redirects
-        SET redirect_count = redirect_count + 1,
-            last_redirect_at = now()
-        WHERE old_slug = :old
-        RETURNING new_slug
-    """)
-    row = await db.execute(stmt, {"old": old})
-    result = row.fetchone()
-    if not result:
-        from fastapi import HTTPException
+    """Typeahead from the worker's in-memory index (no database round-trip).
+
+    Meant for every keystroke in the POS/storefront; `/v1/search` stays the
+    full, ranked results page.
+    """
+    index = get_typeahead()
+    await index.ensure_loaded()
+    return {
+        "query": q.strip(),
+        "suggestions": [s.as_dict() for s in index.suggest(q, limit)],
+    }
+
+
+@router.get("/redirect")
+async def slug_redirect(old: str = Query(..., min_length=1)):
+    """Check if a slug has a 301 redirect registered.
 
+    Served from the per-worker in-memory map; hit counts are flushed to
+    `catalog.slug_redirects` in batches (`services.slug_redirects`).
+    """
+    redirects = get_redirects()
+    await redirects.ensure_loaded()
+    new_slug = redirects.lookup(old)
+    if new_slug is None:
         raise HTTPException(status_code=404, detail="No redirect found")
-    return {"new_slug": result[0]}
+    return {"new_slug": new_slug}
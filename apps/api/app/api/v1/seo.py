@@ -1,14 +1,103 @@
-"""Endpoints SEO — sitemap-data, IndexNow ping."""
+"""Endpoints SEO — sitemaps XML, sitemap-data, IndexNow ping."""
 
 from __future__ import annotations
 
-from fastapi import APIRouter
+import io
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
 from sqlalchemy import text
 
 from app.deps import DBSession
+from app.services.artifacts import get_artifacts
+from app.services.http_cache import http_date, is_not_modified, not_modified
+from app.services.sitemaps import (
+    SOURCES,
+    SOURCES_BY_KIND,
+    STATIC_SITEMAP_PATH,
+    index_etag,
+    render_index,
+    shard_url,
+    store_url,
+)
 
 router = APIRouter(prefix="/seo", tags=["seo"])
 
+_SITEMAP_CACHE_CONTROL = "public, max-age=3600"
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503, detail="Sitemap en generación", headers={"Retry-After": "30"}
+    )
+
+
+@router.get("/sitemap.xml", include_in_schema=False)
+async def sitemap_index(request: Request) -> Response:
+    """Índice de sitemaps: las páginas fijas del storefront y un `<sitemap>` por
+    shard no vacío, con su lastmod. Todas las URLs van en el host del storefront."""
+    artifacts = get_artifacts()
+    manifests = []
+    for source in SOURCES:
+        manifest = await artifacts.ensure(source.artifact)
+        if manifest is None:
+            raise _unavailable()
+        manifests.append(manifest)
+
+    etag = index_etag(manifests)
+    last_modified = max(m.generated_at for m in manifests)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": _SITEMAP_CACHE_CONTROL,
+    }
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(headers)
+
+    buf = io.BytesIO()
+    entries: list[tuple[str, datetime | None]] = [(store_url(STATIC_SITEMAP_PATH), None)]
+    entries += [
+        (shard_url(f.name), f.lastmod or m.generated_at)
+        for m in manifests
+        for f in m.files
+        if f.items
+    ]
+    render_index(entries, buf)
+    return Response(
+        content=buf.getvalue(), media_type="application/xml; charset=utf-8", headers=headers
+    )
+
+
+@router.get("/sitemaps/{name}", include_in_schema=False, name="sitemap_shard")
+async def sitemap_shard(name: str, request: Request) -> Response:
+    """Shard precalculado (`products-1.xml`, `posts-1.xml`, …)."""
+    source = SOURCES_BY_KIND.get(name.split("-", 1)[0])
+    if source is None:
+        raise HTTPException(status_code=404, detail="Sitemap inexistente")
+    artifacts = get_artifacts()
+    manifest = await artifacts.ensure(source.artifact)
+    if manifest is None:
+        raise _unavailable()
+    entry = manifest.file(name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Sitemap inexistente")
+
+    # Last-Modified es la generación, no el lastmod del shard: despublicar una
+    # URL cambia el shard sin mover su lastmod
+    headers = {
+        "ETag": entry.etag,
+        "Last-Modified": http_date(manifest.generated_at),
+        "Cache-Control": _SITEMAP_CACHE_CONTROL,
+    }
+    if is_not_modified(request, entry.etag, manifest.generated_at):
+        return not_modified(headers)
+    return FileResponse(
+        artifacts.file_path(manifest, entry.name),
+        media_type="application/xml; charset=utf-8",
+        headers=headers,
+    )
+
 
 @router.get("/sitemap-data")
 async def sitemap_data(db: DBSession):
@@ -17,8 +106,9 @@ async def sitemap_data(db: DBSession):
     products = await db.execute(
         text("""
             SELECT p.slug, p.updated_at,
-                   COALESCE((SELECT SUM(s.quantity) FROM inventory.stock s WHERE s.product_id = p.id), 0) > 0 AS is_in_stock
+                   COALESCE(pa.quantity, 0) > 0 AS is_in_stock
             FROM catalog.products p
+            LEFT JOIN inventory.product_availability pa ON pa.product_id = p.id
             WHERE p.is_published = true
             ORDER BY p.updated_at DESC
         """)
@@ -0,0 +1,34 @@
+"""Recalcula la matriz de co-compra (sales.product_copurchase).
+
+Los triggers la mantienen al día orden a orden; este job la reconstruye desde
+sales.orders/order_items por si hubo deriva (p.ej. cargas hechas con los
+triggers desactivados). Idempotente.
+
+    python -m app.cli.rebuild_copurchase
+
+Programar semanal como scheduled task en Coolify.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from sqlalchemy import text
+
+from app.db import AsyncSessionLocal
+
+
+async def rebuild() -> int:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text("SELECT sales.rebuild_product_copurchase()"))).scalar_one()
+        await db.commit()
+    return int(rows or 0)
+
+
+def main() -> None:
+    rows = asyncio.run(rebuild())
+    print(f"  ~ co-compra recalculada: {rows} pares")
+
+
+if __name__ == "__main__":
+    main()
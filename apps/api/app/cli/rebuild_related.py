@@ -0,0 +1,34 @@
+"""Recalcula los productos relacionados precalculados (catalog.product_related).
+
+Los endpoints de productos recalculan los vecinos del producto que editan; este
+job recorre todo el catálogo para recoger el resto de cambios (productos nuevos
+o despublicados en las listas de otros, co-compra del día). Idempotente.
+
+    python -m app.cli.rebuild_related
+
+Programar nocturno como scheduled task en Coolify (después de rebuild_copurchase
+si ambos corren la misma noche).
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from app.db import AsyncSessionLocal
+from app.services.related_products import rebuild_related
+
+
+async def rebuild() -> int:
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_related(db)
+        await db.commit()
+    return rows
+
+
+def main() -> None:
+    rows = asyncio.run(rebuild())
+    print(f"  ~ productos relacionados recalculados: {rows} pares")
+
+
+if __name__ == "__main__":
+    main()
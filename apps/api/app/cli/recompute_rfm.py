@@ -0,0 +1,41 @@
+"""Recalcula la segmentación RFM de clientes (crm.customers.rfm_*).
+
+El trigger de sales.orders ya mantiene la última compra, frecuencia y monto de
+cada cliente; este job recalcula los puntajes R/F/M por quintil, el segmento y
+la bandera "en riesgo", que son relativos a toda la base. Idempotente.
+
+    python -m app.cli.recompute_rfm
+    python -m app.cli.recompute_rfm --at-risk-days 45
+
+Programar diario (p.ej. 03:45) como scheduled task en Coolify.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+
+from app.db import AsyncSessionLocal
+from app.services.response_cache import invalidate
+from app.services.rfm import DEFAULT_AT_RISK_DAYS, rebuild_rfm
+
+
+async def recompute(at_risk_days: int) -> int:
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_rfm(db, at_risk_days)
+        await db.commit()
+    await invalidate("customers")
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula RFM de clientes")
+    parser.add_argument("--at-risk-days", type=int, default=DEFAULT_AT_RISK_DAYS)
+    args = parser.parse_args()
+
+    rows = asyncio.run(recompute(args.at_risk_days))
+    print(f"  ~ RFM recalculado: {rows} clientes con compras")
+
+
+if __name__ == "__main__":
+    main()
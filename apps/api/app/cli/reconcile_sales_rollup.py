@@ -0,0 +1,58 @@
+"""Reconcile nocturno de los rollups de ventas (sales.sales_rollup_*).
+
+Los triggers anexan deltas que los workers pliegan en los rollups
+(`app.services.sales_rollup`); este job recalcula desde
+sales.orders/order_items los últimos N días (hora Bogotá) para corregir
+cualquier deriva (p.ej. productos que cambiaron de categoría o ediciones
+masivas hechas con los triggers desactivados). Idempotente.
+
+    python -m app.cli.reconcile_sales_rollup              # últimos 3 días
+    python -m app.cli.reconcile_sales_rollup --days 30
+    python -m app.cli.reconcile_sales_rollup --from 2025-01-01 --to 2025-12-31
+
+Programar diario (p.ej. 03:30) como scheduled task en Coolify.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+from app.db import AsyncSessionLocal
+
+
+async def reconcile(date_from: date, date_to: date) -> int:
+    async with AsyncSessionLocal() as db:
+        rows = (
+            await db.execute(
+                text("SELECT sales.rebuild_sales_rollup(:date_from, :date_to)"),
+                {"date_from": date_from, "date_to": date_to},
+            )
+        ).scalar_one()
+        # Pliega también los pendientes fuera del rango
+        await db.execute(text("SELECT sales.fold_sales_rollup()"))
+        await db.commit()
+    return int(rows or 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconcile de rollups de ventas")
+    parser.add_argument("--days", type=int, default=3, help="Días hacia atrás (incluye hoy)")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, default=None)
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    today = datetime.now(ZoneInfo("America/Bogota")).date()
+    date_to = args.date_to or today
+    date_from = args.date_from or (date_to - timedelta(days=args.days - 1))
+
+    rows = asyncio.run(reconcile(date_from, date_to))
+    print(f"  ~ rollups recalculados {date_from} → {date_to}: {rows} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -54,6 +54,25 @@ class Settings(BaseSettings):
     s3_bucket_public: str = "bp-public"
     s3_public_url: str = "http://localhost:9000"
 
+    # /metrics (Prometheus): exige `Authorization: Bearer <token>`; vacío = 403
+    metrics_token: str = ""
+
+    # Statements SQL más lentos que esto (ms) se loguean como `slow_query`; 0 = apagado
+    slow_query_ms: int = 0
+
+    # Búsqueda de productos (/v1/search): presupuesto por query en Postgres
+    search_timeout_ms: int = 800
+
+    # Artefactos públicos precalculados (feed de catálogo): directorio compartido
+    # por los workers, cada cuánto revisan cambios y productos por página del feed
+    artifacts_path: str = "/data/artifacts"
+    artifacts_refresh_seconds: int = 60
+    catalog_feed_page_size: int = 5000
+
+    # URL pública del storefront: las URLs de los sitemaps (y de sus shards, que
+    # el storefront sirve en /sitemap.xml y /sitemaps/* como proxy) van en este host
+    store_public_url: str = "https://bigotesypaticas.com"
+
     # Sheets ETL
     sheet_url: str = ""
     google_service_account_json: str = ""
@@ -3,18 +3,21 @@
 from __future__ import annotations
 
 import json
+import time
 from collections.abc import AsyncGenerator
 from typing import Any, ClassVar
 
-from sqlalchemy import MetaData, event
+from sqlalchemy import MetaData, event, exc
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.config import get_settings
+from app.services import metrics
 
 settings = get_settings()
 
@@ -33,8 +36,23 @@ class Base(DeclarativeBase):
     type_annotation_map: ClassVar[dict[Any, Any]] = {}
 
 
+class _TimedQueuePool(AsyncAdaptedQueuePool):
+    """Pool que mide cuánto espera cada checkout (cola + conexión nueva + pre_ping)."""
+
+    def connect(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
 engine = create_async_engine(
     settings.database_url,
+    poolclass=_TimedQueuePool,
     pool_size=settings.db_pool_size,
     max_overflow=settings.db_max_overflow,
     pool_pre_ping=True,        # detecta conexiones muertas antes de usarlas
@@ -52,6 +70,31 @@ def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
     raw.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog", format="text")
 
 
+def _pool_metrics() -> dict[str, metrics.Family]:
+    pool = engine.sync_engine.pool
+    return {
+        "bp_db_pool_size": metrics.family(
+            "gauge", "Conexiones base del pool (db_pool_size).", [("", {}, pool.size())]
+        ),
+        "bp_db_pool_max_overflow": metrics.family(
+            "gauge",
+            "Conexiones extra permitidas (db_max_overflow).",
+            [("", {}, settings.db_max_overflow)],
+        ),
+        "bp_db_pool_checked_out": metrics.family(
+            "gauge", "Conexiones prestadas en este momento.", [("", {}, pool.checkedout())]
+        ),
+        "bp_db_pool_overflow": metrics.family(
+            "gauge",
+            "Conexiones abiertas por encima de pool_size.",
+            [("", {}, max(0, pool.overflow()))],
+        ),
+    }
+
+
+metrics.register_collector(_pool_metrics)
+
+
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -14,6 +14,12 @@ from app import __version__
 from app.api import api_router
 from app.config import get_settings
 from app.middleware import RequestIDMiddleware, configure_logging
+from app.services import catalog_feed, sitemaps
+from app.services.artifacts import get_artifacts
+from app.services.metrics import get_metrics_publisher
+from app.services.sales_rollup import get_rollup_folder
+from app.services.slug_redirects import get_redirects
+from app.services.typeahead import get_typeahead
 
 settings = get_settings()
 configure_logging(settings.log_level)
@@ -56,6 +62,29 @@ def create_app() -> FastAPI:
             version=__version__,
             environment=settings.environment,
         )
+        # Índice de autocompletado en memoria (/v1/search/suggest)
+        get_typeahead().start()
+        # Redirecciones de slugs en memoria (/v1/search/redirect)
+        await get_redirects().start()
+        # Deltas pendientes de los rollups de ventas → sales.sales_rollup_*
+        get_rollup_folder().start()
+        # Snapshot de métricas del worker en Redis (/metrics junta todos)
+        get_metrics_publisher().start()
+        # Feed de catálogo y sitemaps precalculados (/v1/catalog/products.xml,
+        # /v1/seo/sitemap.xml)
+        artifacts = get_artifacts()
+        artifacts.register(catalog_feed.ARTIFACT, catalog_feed.build_products_feed)
+        for source in sitemaps.SOURCES:
+            artifacts.register(source.artifact, source.build)
+        artifacts.start()
+
+    @app.on_event("shutdown")
+    async def _shutdown() -> None:
+        await get_typeahead().stop()
+        await get_redirects().stop()
+        await get_rollup_folder().stop()
+        await get_artifacts().stop()
+        await get_metrics_publisher().stop()
 
     @app.get("/", include_in_schema=False)
     async def root() -> dict:
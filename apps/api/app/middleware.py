@@ -1,4 +1,4 @@
-"""Middleware: Request ID + structured logging."""
+"""Middleware: Request ID + structured logging (+ statements SQL por request)."""
 
 from __future__ import annotations
 
@@ -10,40 +10,60 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from app.services import metrics
+from app.services.query_stats import server_timing, track_queries
+
 log = structlog.get_logger("http")
 
 
+def _route_label(request: Request) -> str:
+    """Plantilla de la ruta (`/v1/products/{product_id}`): cardinalidad acotada."""
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None) or "unmatched"
+
+
 class RequestIDMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         request_id = request.headers.get("X-Request-ID") or str(uuid.uuid4())
         request.state.request_id = request_id
 
         start = time.perf_counter()
-        try:
-            response: Response = await call_next(request)
-        except Exception as exc:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            log.error(
-                "http_error",
-                request_id=request_id,
-                method=request.method,
-                path=request.url.path,
-                duration_ms=round(elapsed_ms, 2),
-                error=str(exc),
-            )
-            raise
-        else:
-            elapsed_ms = (time.perf_counter() - start) * 1000
-            response.headers["X-Request-ID"] = request_id
-            log.info(
-                "http_request",
-                request_id=request_id,
-                method=request.method,
-                path=request.url.path,
-                status=response.status_code,
-                duration_ms=round(elapsed_ms, 2),
-            )
-            return response
+        with track_queries(request_id) as db_stats:
+            try:
+                response: Response = await call_next(request)
+            except Exception as exc:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                log.error(
+                    "http_error",
+                    request_id=request_id,
+                    method=request.method,
+                    path=request.url.path,
+                    duration_ms=round(elapsed_ms, 2),
+                    error=str(exc),
+                    **db_stats.log_fields(),
+                )
+                metrics.HTTP_REQUEST_SECONDS.observe(
+                    elapsed_ms / 1000, request.method, _route_label(request), "500"
+                )
+                raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        route = _route_label(request)
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            elapsed_ms / 1000, request.method, route, str(response.status_code)
+        )
+        metrics.HTTP_DB_STATEMENTS.inc(request.method, route, amount=db_stats.statements)
+        response.headers["X-Request-ID"] = request_id
+        response.headers["Server-Timing"] = server_timing(db_stats, elapsed_ms)
+        log.info(
+            "http_request",
+            request_id=request_id,
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code,
+            duration_ms=round(elapsed_ms, 2),
+            **db_stats.log_fields(),
+        )
+        return response
 
 
 def configure_logging(level: str = "INFO") -> None:
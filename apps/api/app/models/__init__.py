@@ -1,11 +1,11 @@
 """Re-exporta todos los modelos para que Alembic los detecte."""
 
 from app.models.auth import PERMISSIONS, ROLE_DEFAULTS, Role, User, user_roles
-from app.models.catalog import Brand, Category, Product
+from app.models.catalog import Brand, Category, Product, ProductRelated
 from app.models.common import Base
 from app.models.crm import Customer
 from app.models.finance import CashClosing
-from app.models.inventory import Stock, StockLocation, StockMovement
+from app.models.inventory import ProductAvailability, Stock, StockLocation, StockMovement
 from app.models.ops import AuditLog, LegacyIdMap
 from app.models.portal import (
     Appointment,
@@ -17,7 +17,16 @@ from app.models.portal import (
     PortalSession,
 )
 from app.models.purchasing import Purchase, PurchaseItem, Supplier, SupplierSkuMap
-from app.models.sales import Order, OrderItem, Payment
+from app.models.sales import (
+    Order,
+    OrderItem,
+    OrderNumberCounter,
+    Payment,
+    ProductCopurchase,
+    ProductOrderCount,
+    SalesRollupCategoryDaily,
+    SalesRollupHourly,
+)
 
 __all__ = [
     "Base",
@@ -29,13 +38,20 @@ __all__ = [
     "Brand",
     "Category",
     "Product",
+    "ProductRelated",
     "Customer",
     "StockLocation",
     "Stock",
     "StockMovement",
+    "ProductAvailability",
     "Order",
     "OrderItem",
+    "OrderNumberCounter",
     "Payment",
+    "SalesRollupHourly",
+    "SalesRollupCategoryDaily",
+    "ProductCopurchase",
+    "ProductOrderCount",
     "Purchase",
     "PurchaseItem",
     "Supplier",
@@ -9,10 +9,14 @@ from sqlalchemy import (
     ARRAY,
     Boolean,
     CheckConstraint,
+    Computed,
+    DateTime,
+    Float,
     ForeignKey,
     Index,
     Integer,
     Numeric,
+    SmallInteger,
     String,
     Text,
     UniqueConstraint,
@@ -131,13 +135,44 @@ class Product(UUIDPKMixin, TimestampMixin, SoftDeleteMixin, AuditMixin, Base):
     pet_type: Mapped[str | None] = mapped_column(String(20), nullable=True, default=None)
     brand_normalized: Mapped[str | None] = mapped_column(String(100), nullable=True, default=None)
 
+    # Texto de búsqueda (nombre + marca, minúsculas, sin tildes) con índice GIN
+    # trigram; lo calcula Postgres (migración 0034)
+    search_text: Mapped[str | None] = mapped_column(
+        Text,
+        Computed(
+            "catalog.f_unaccent(lower(name || ' ' || COALESCE(brand_normalized, '')))",
+            persisted=True,
+        ),
+        nullable=True,
+        deferred=True,
+    )
+
     # Rating agregado (recalculado por trigger trg_recalc_product_rating)
     rating_avg: Mapped[float | None] = mapped_column(Numeric(3, 2), nullable=True, default=None)
     rating_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     rating_distribution: Mapped[dict | None] = mapped_column(JSONB, nullable=True, default=None)
 
-    brand: Mapped[Brand | None] = relationship(Brand, lazy="joined")
-    category: Mapped[Category | None] = relationship(Category, lazy="joined")
+    # Sin carga implícita: cada endpoint pide lo que serializa con un perfil de
+    # `services.product_loading` (evita N+1 y JOINs que nadie usa)
+    brand: Mapped[Brand | None] = relationship(Brand, lazy="raise_on_sql")
+    category: Mapped[Category | None] = relationship(Category, lazy="raise_on_sql")
+
+
+class ProductRelated(Base):
+    """Top-N productos relacionados de `product_id`, ordenados por `rank`.
+
+    Lo calcula `catalog.rebuild_product_related()` (migración 0035): job nocturno
+    y recálculo del producto al crearlo/editarlo. Solo lectura desde la API.
+    """
+
+    __tablename__ = "product_related"
+    __table_args__ = ({"schema": "catalog"},)
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    related_product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    score: Mapped[float] = mapped_column(Float(precision=24), nullable=False)
+    computed_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
 
 class ProductReview(UUIDPKMixin, Base):
@@ -5,7 +5,16 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Date, DateTime, Integer, Numeric, String, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Integer,
+    Numeric,
+    SmallInteger,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.dialects.postgresql import CITEXT, JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -38,6 +47,22 @@ class Customer(UUIDPKMixin, TimestampMixin, SoftDeleteMixin, Base):
     rfm_frequency: Mapped[int | None] = mapped_column(Integer, nullable=True)
     rfm_monetary: Mapped[float | None] = mapped_column(Numeric(14, 2), nullable=True)
     last_purchase_at: Mapped[Date | None] = mapped_column(Date, nullable=True)  # type: ignore[name-defined]
+    # Motor RFM (migración 0032): trigger en sales.orders + rebuild nocturno
+    rfm_first_order_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    rfm_last_order_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    rfm_avg_interval_days: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rfm_favorite_product: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    rfm_r_score: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    rfm_f_score: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    rfm_m_score: Mapped[int | None] = mapped_column(SmallInteger, nullable=True)
+    rfm_at_risk: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default="false"
+    )
+    rfm_computed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     extra: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
 
@@ -8,6 +8,7 @@ from decimal import Decimal
 
 from sqlalchemy import (
     CheckConstraint,
+    Computed,
     DateTime,
     ForeignKey,
     Integer,
@@ -15,6 +16,7 @@ from sqlalchemy import (
     String,
     Text,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -100,6 +102,30 @@ class StockMovement(UUIDPKMixin, TimestampMixin, AuditMixin, Base):
     )
 
 
+class ProductAvailability(Base):
+    """Proyección de `stock` por producto (suma de todas las locations).
+
+    Read model de solo lectura para la app: la mantiene el trigger
+    `inventory.trg_sync_product_availability` en cada INSERT/UPDATE/DELETE de
+    `inventory.stock`, así que ningún endpoint necesita agregar stock por request.
+    """
+
+    __tablename__ = "product_availability"
+    __table_args__ = ({"schema": "inventory"},)
+
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("catalog.products.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    quantity: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    reserved: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    available: Mapped[int] = mapped_column(Integer, Computed("quantity - reserved", persisted=True))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 # ─── Physical Inventory Count ───────────────────────────────────────────
 
 
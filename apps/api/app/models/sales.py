@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 from sqlalchemy import (
+    BigInteger,
     CheckConstraint,
+    Date,
     DateTime,
     ForeignKey,
     Integer,
@@ -123,3 +125,84 @@ class Payment(UUIDPKMixin, TimestampMixin, AuditMixin, Base):
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     order: Mapped[Order] = relationship(Order, back_populates="payments")
+
+
+class OrderNumberCounter(Base):
+    """Desplazamiento diario de `sales.order_number_seq` para `BP-YYYYMMDD-XXXX`.
+
+    El consecutivo del día es `nextval - seq_offset`. Lo maneja
+    `sales.next_order_seq()` (vía `app.services.order_numbers`); nadie más
+    debería escribirlo.
+    """
+
+    __tablename__ = "order_number_counters"
+    __table_args__ = ({"schema": "sales"},)
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    seq_offset: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class SalesRollupHourly(Base):
+    """Ventas agregadas por hora x canal x medio de pago.
+
+    Mapeada a la vista `sales_rollup_hourly_live` (rollup plegado + deltas
+    pendientes de los triggers, migración 0031): una clave puede aparecer en
+    varias filas, así que siempre se lee con SUM. Solo lectura. `orders`,
+    `revenue` y `cogs` excluyen órdenes anuladas y reembolsadas; las
+    reembolsadas se cuentan aparte.
+    """
+
+    __tablename__ = "sales_rollup_hourly_live"
+    __table_args__ = ({"schema": "sales"},)
+
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    channel: Mapped[str] = mapped_column(String(30), primary_key=True)
+    payment_method: Mapped[str] = mapped_column(String(40), primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    refunded_orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+    cogs: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+
+
+# category_id de "Sin categoría" en SalesRollupCategoryDaily
+UNCATEGORIZED_ID = uuid.UUID(int=0)
+
+
+class SalesRollupCategoryDaily(Base):
+    """Ventas de línea por día (hora Bogotá) x categoría; vista `*_live` como
+    `SalesRollupHourly` (leer con SUM)."""
+
+    __tablename__ = "sales_rollup_category_daily_live"
+    __table_args__ = ({"schema": "sales"},)
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    revenue: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+    units: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    cogs: Mapped[float] = mapped_column(Numeric(16, 2), nullable=False, default=0)
+
+
+class ProductCopurchase(Base):
+    """Órdenes válidas que contienen a la vez `product_id` y `other_product_id`.
+
+    Guardada en ambas direcciones; mantenida por triggers (migración 0033),
+    solo lectura desde la aplicación.
+    """
+
+    __tablename__ = "product_copurchase"
+    __table_args__ = ({"schema": "sales"},)
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    other_product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ProductOrderCount(Base):
+    """Órdenes válidas que contienen el producto (misma mantención que
+    `ProductCopurchase`)."""
+
+    __tablename__ = "product_order_counts"
+    __table_args__ = ({"schema": "sales"},)
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    orders: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
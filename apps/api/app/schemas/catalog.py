@@ -131,3 +131,4 @@ class ProductListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: str | None = None
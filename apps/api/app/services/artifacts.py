@@ -0,0 +1,265 @@
+"""Artefactos públicos precalculados en disco (feed de catálogo, sitemaps).
+
+Un artefacto es un conjunto de archivos generados desde la base y servidos tal
+cual a crawlers, con ETag fuerte (sha256 del contenido) y Last-Modified. Los
+requests nunca tocan la base: solo leen el manifest y el archivo.
+
+Qué dispara una regeneración: los triggers de la migración 0036 encolan filas
+en `catalog.artifact_changes` cuando cambian los datos del artefacto. Cada
+worker revisa la cola cada `artifacts_refresh_seconds`; el que toma el advisory
+lock del artefacto lo regenera en un directorio nuevo, publica el manifest
+(reemplazo atómico) y borra los cambios que consumió. Sin cambios pendientes no
+se lee nada más que la cola.
+
+`artifacts_path` tiene que ser compartido por todos los workers que sirven el
+artefacto (mismo contenedor o un volumen común).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import shutil
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+import orjson
+import structlog
+from sqlalchemy import bindparam, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.db import AsyncSessionLocal
+from app.services import metrics
+
+log = structlog.get_logger("artifacts")
+
+_MANIFEST = "manifest.json"
+# Tiempo máximo que un request espera a que otro worker termine la primera generación
+_FIRST_BUILD_WAIT_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class ArtifactFile:
+    name: str
+    etag: str
+    size: int
+    items: int
+    # Última modificación del contenido (lastmod de un shard de sitemap)
+    lastmod: datetime | None = None
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> ArtifactFile:
+        lastmod = raw.get("lastmod")
+        return cls(**{**raw, "lastmod": datetime.fromisoformat(lastmod) if lastmod else None})
+
+
+@dataclass(frozen=True)
+class Manifest:
+    artifact: str
+    generation: str
+    generated_at: datetime
+    files: tuple[ArtifactFile, ...]
+
+    def file(self, name: str) -> ArtifactFile | None:
+        return next((f for f in self.files if f.name == name), None)
+
+    def to_json(self) -> bytes:
+        return orjson.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: bytes) -> Manifest:
+        raw = orjson.loads(data)
+        return cls(
+            artifact=raw["artifact"],
+            generation=raw["generation"],
+            generated_at=datetime.fromisoformat(raw["generated_at"]),
+            files=tuple(ArtifactFile.from_dict(f) for f in raw["files"]),
+        )
+
+
+class ArtifactWriter:
+    """Archivos de una generación: el builder escribe en `path(name)` y registra
+    cada archivo terminado con `done(name, items, lastmod)`."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.files: list[ArtifactFile] = []
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name: str) -> Path:
+        return self.directory / name
+
+    def done(self, name: str, items: int, lastmod: datetime | None = None) -> None:
+        digest = hashlib.sha256()
+        path = self.path(name)
+        with path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 16), b""):
+                digest.update(chunk)
+        self.files.append(
+            ArtifactFile(
+                name=name,
+                etag=f'"{digest.hexdigest()[:32]}"',
+                size=path.stat().st_size,
+                items=items,
+                lastmod=lastmod,
+            )
+        )
+
+
+Builder = Callable[[AsyncSession, ArtifactWriter], Awaitable[None]]
+
+
+class ArtifactStore:
+    """Registro de artefactos, generación bajo advisory lock y lectura de manifests."""
+
+    def __init__(self) -> None:
+        self._builders: dict[str, Builder] = {}
+        self._manifests: dict[str, tuple[int, Manifest]] = {}
+        self._task: asyncio.Task | None = None
+
+    @property
+    def root(self) -> Path:
+        return Path(get_settings().artifacts_path)
+
+    def register(self, name: str, builder: Builder) -> None:
+        self._builders[name] = builder
+
+    def manifest(self, name: str) -> Manifest | None:
+        """Manifest publicado (releído solo si cambió el archivo)."""
+        path = self.root / name / _MANIFEST
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._manifests.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        manifest = Manifest.from_json(path.read_bytes())
+        self._manifests[name] = (mtime, manifest)
+        return manifest
+
+    def file_path(self, manifest: Manifest, name: str) -> Path:
+        return self.root / manifest.artifact / manifest.generation / name
+
+    async def refresh(self, name: str, *, force: bool = False) -> bool:
+        """Regenera `name` si tiene cambios pendientes (o no existe todavía).
+
+        Devuelve False si otro worker tiene el lock o no había nada que hacer.
+        """
+        async with AsyncSessionLocal() as db:
+            locked = (
+                await db.execute(
+                    text("SELECT pg_try_advisory_xact_lock(hashtext(:key))"),
+                    {"key": f"artifact:{name}"},
+                )
+            ).scalar_one()
+            if not locked:
+                return False
+            # Primero la cola y después los datos: un cambio visible acá ya está
+            # en el snapshot del builder; uno que llegue después queda pendiente
+            pending = list(
+                (
+                    await db.execute(
+                        text("SELECT id FROM catalog.artifact_changes WHERE artifact = :name"),
+                        {"name": name},
+                    )
+                ).scalars()
+            )
+            if not pending and not force and self.manifest(name) is not None:
+                return False
+
+            started = time.monotonic()
+            generated_at = datetime.now(UTC)
+            generation = generated_at.strftime("%Y%m%dT%H%M%S%f")
+            base = self.root / name
+            writer = ArtifactWriter(base / generation)
+            try:
+                with metrics.time_job(f"artifact:{name}"):
+                    await self._builders[name](db, writer)
+            except BaseException:
+                shutil.rmtree(writer.directory, ignore_errors=True)
+                raise
+
+            manifest = Manifest(name, generation, generated_at, tuple(writer.files))
+            tmp = base / f".{_MANIFEST}.{generation}"
+            tmp.write_bytes(manifest.to_json())
+            os.replace(tmp, base / _MANIFEST)
+            # Se conserva la generación anterior para los workers que todavía
+            # tienen el manifest viejo en memoria; las demás se borran
+            generations = sorted(d.name for d in base.iterdir() if d.is_dir())
+            for old in generations[:-2]:
+                shutil.rmtree(base / old, ignore_errors=True)
+
+            if pending:
+                await db.execute(
+                    text("DELETE FROM catalog.artifact_changes WHERE id IN :ids").bindparams(
+                        bindparam("ids", expanding=True)
+                    ),
+                    {"ids": pending},
+                )
+            await db.commit()
+
+        log.info(
+            "artifact_built",
+            artifact=name,
+            files=len(manifest.files),
+            items=sum(f.items for f in manifest.files),
+            changes=len(pending),
+            ms=round((time.monotonic() - started) * 1000),
+        )
+        return True
+
+    async def ensure(self, name: str) -> Manifest | None:
+        """Manifest actual; si el artefacto nunca se generó lo genera (o espera
+        a que otro worker lo termine)."""
+        manifest = self.manifest(name)
+        if manifest is not None:
+            return manifest
+        deadline = time.monotonic() + _FIRST_BUILD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            await self.refresh(name)
+            manifest = self.manifest(name)
+            if manifest is not None:
+                return manifest
+            await asyncio.sleep(0.5)
+        return None
+
+    async def _refresh_loop(self) -> None:
+        interval = get_settings().artifacts_refresh_seconds
+        while True:
+            for name in list(self._builders):
+                try:
+                    await self.refresh(name)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    log.warning("artifact_build_failed", artifact=name, error=str(e))
+            await asyncio.sleep(interval)
+
+    def start(self) -> None:
+        """Lanza la revisión periódica de cambios (una por worker)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop(), name="artifacts-refresh")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+_store: ArtifactStore | None = None
+
+
+def get_artifacts() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore()
+    return _store
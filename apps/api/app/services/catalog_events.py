@@ -0,0 +1,65 @@
+"""Eventos de cambio de productos entre workers (Redis pub/sub).
+
+Los caminos de escritura de `catalog.products` publican, después del commit,
+los ids que cambiaron; las cargas masivas (import XLSX, ETL) publican
+"recargar todo". Cada worker escucha el canal y pone al día sus índices en
+memoria (`services.typeahead`).
+
+Es fire-and-forget: si Redis no responde el evento se pierde y los índices
+se corrigen en su recarga periódica completa.
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import orjson
+import redis.asyncio as aioredis
+import structlog
+from redis.asyncio.client import PubSub
+
+from app.config import get_settings
+
+log = structlog.get_logger("catalog_events")
+
+CHANNEL = "catalog:products"
+RELOAD_ALL = "*"
+
+_publisher: aioredis.Redis | None = None
+
+
+def _publisher_client() -> aioredis.Redis:
+    global _publisher
+    if _publisher is None:
+        _publisher = aioredis.from_url(
+            get_settings().redis_url, socket_connect_timeout=0.25, socket_timeout=0.25
+        )
+    return _publisher
+
+
+async def publish_product_changes(*product_ids: uuid.UUID) -> None:
+    """Avisa a todos los workers que cambiaron estos productos (sin ids = todos)."""
+    payload = orjson.dumps([str(p) for p in product_ids] or [RELOAD_ALL])
+    try:
+        await _publisher_client().publish(CHANNEL, payload)
+    except Exception as e:
+        log.warning("catalog_event_publish_failed", error=str(e))
+
+
+def parse_event(data: bytes | str) -> list[uuid.UUID] | None:
+    """Ids del evento; None = recargar todo (o payload que no se entiende)."""
+    try:
+        items = orjson.loads(data)
+        if RELOAD_ALL in items:
+            return None
+        return [uuid.UUID(i) for i in items]
+    except Exception:
+        return None
+
+
+async def subscribe() -> PubSub:
+    """Suscripción propia (conexión dedicada, sin timeout de lectura)."""
+    client = aioredis.from_url(get_settings().redis_url, socket_connect_timeout=0.25)
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(CHANNEL)
+    return pubsub
@@ -0,0 +1,89 @@
+"""Facetas del catálogo público (`/v1/products/catalog`) calculadas en SQL.
+
+Una sola query con `GROUP BY GROUPING SETS` devuelve los conteos de las cuatro
+facetas (etapa de vida, tamaño, marca, tipo de mascota) sin traer filas de
+producto a Python. Los conteos son *disjuntivos*: cada faceta se cuenta con
+todos los filtros activos excepto el suyo propio, que es lo que espera el
+storefront para que el usuario pueda ampliar la selección dentro de una faceta.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import and_, func, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.catalog import Product
+
+# clave de respuesta → (columna, valor comodín que no se cuenta)
+FACETS: dict[str, tuple[ColumnElement, str | None]] = {
+    "life_stages": (Product.life_stage, "all"),
+    "size_ranges": (Product.size_range, "all"),
+    "brands": (Product.brand_normalized, None),
+    "pet_types": (Product.pet_type, "both"),
+}
+
+# Filtro de selección de cada faceta (mismo nombre que el parámetro del endpoint)
+FACET_PARAM = {
+    "life_stages": "life_stage",
+    "size_ranges": "size_range",
+    "brands": "brand",
+    "pet_types": "pet_type",
+}
+
+BRANDS_LIMIT = 20
+
+
+def _all(conds: list[ColumnElement]) -> ColumnElement:
+    return and_(*conds) if conds else true()
+
+
+async def facet_counts(
+    db: AsyncSession,
+    base_conditions: list[ColumnElement],
+    selection: dict[str, ColumnElement],
+) -> dict[str, dict[str, int]]:
+    """Conteos por faceta para el catálogo publicado.
+
+    `base_conditions` son los filtros que no son facetas (categoría, precio,
+    salud). `selection` mapea el nombre de parámetro de faceta activo
+    (`life_stage`, `size_range`, `brand`, `pet_type`) a su condición SQL.
+    """
+    columns = [col for col, _ in FACETS.values()]
+    counts = []
+    for key in FACETS:
+        own = FACET_PARAM[key]
+        others = [cond for param, cond in selection.items() if param != own]
+        counts.append(func.count().filter(_all(others)))
+
+    stmt = (
+        select(
+            *columns,
+            *(func.grouping(col) for col in columns),
+            *counts,
+        )
+        .where(
+            Product.is_published == True,  # noqa: E712
+            Product.deleted_at.is_(None),
+            *base_conditions,
+        )
+        .group_by(func.grouping_sets(*(tuple_(col) for col in columns)))
+    )
+    rows = (await db.execute(stmt)).all()
+
+    n = len(columns)
+    facets: dict[str, dict[str, int]] = {key: {} for key in FACETS}
+    for row in rows:
+        values, grouping, totals = row[:n], row[n : 2 * n], row[2 * n :]
+        for idx, (key, (_col, wildcard)) in enumerate(FACETS.items()):
+            # GROUPING(col) = 0 → la fila pertenece al grouping set de esa columna
+            if grouping[idx] != 0:
+                continue
+            value = values[idx]
+            total = int(totals[idx] or 0)
+            if value and value != wildcard and total > 0:
+                facets[key][value] = total
+            break
+
+    facets["brands"] = dict(sorted(facets["brands"].items(), key=lambda x: -x[1])[:BRANDS_LIMIT])
+    return facets
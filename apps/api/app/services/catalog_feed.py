@@ -0,0 +1,197 @@
+"""Generación del feed de productos para Meta Catalog / Google Merchant.
+
+El feed es un artefacto precalculado (`services.artifacts`): se escribe en
+streaming (XMLGenerator, fila por fila desde un cursor del servidor) en páginas
+de `catalog_feed_page_size` productos, `products-1.xml`, `products-2.xml`, …
+Cada página se da de alta como feed (o feed suplementario) en Meta / Merchant.
+
+Las páginas se arman por orden de creación ascendente: un producto nuevo entra
+en la última página sin desplazar a los demás. No es una garantía de página
+fija: despublicar, borrar o quitarle la imagen o el precio a un producto corre
+una posición a todos los posteriores, y el que cruza un límite de página sale
+de un feed y entra en el siguiente (Meta lo da de baja y lo vuelve a crear).
+"""
+
+from __future__ import annotations
+
+from typing import BinaryIO
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.services.artifacts import ArtifactWriter
+
+ARTIFACT = "products_feed"
+
+STORE_URL = "https://bigotesypaticas.com"
+
+# Mapa de categoría propia → taxonomía Google Merchant
+_GOOGLE_CAT: dict[str, str] = {
+    "CONCENTRADO": "Animals & Pet Supplies > Pet Supplies > Dog Supplies > Dog Food",
+    "SNACK": "Animals & Pet Supplies > Pet Supplies > Dog Supplies > Dog Treats",
+    "MEDICAMENTO": "Animals & Pet Supplies > Pet Supplies > Pet Health Supplies",
+    "ARENA": "Animals & Pet Supplies > Pet Supplies > Cat Supplies > Cat Litter",
+    "Accesorios": "Animals & Pet Supplies > Pet Supplies",
+    "Aseo": "Animals & Pet Supplies > Pet Supplies > Pet Grooming Supplies",
+    "Juguetes": "Animals & Pet Supplies > Pet Supplies > Dog Supplies > Dog Toys",
+    "Perros": "Animals & Pet Supplies > Pet Supplies > Dog Supplies",
+    "Gatos": "Animals & Pet Supplies > Pet Supplies > Cat Supplies",
+    "Snacks": "Animals & Pet Supplies > Pet Supplies > Dog Supplies > Dog Treats",
+}
+
+# Mapa de categoría → tipo mascota (custom_label_1)
+_PET_TYPE: dict[str, str] = {
+    "CONCENTRADO": "perro-gato",
+    "SNACK": "perro",
+    "MEDICAMENTO": "perro-gato",
+    "ARENA": "gato",
+    "Accesorios": "perro-gato",
+    "Aseo": "perro-gato",
+    "Juguetes": "perro",
+    "Snacks": "perro",
+    "Perros": "perro",
+    "Gatos": "gato",
+}
+
+_FEED_SQL = text("""
+    SELECT
+        p.id::text, p.sku, p.name,
+        COALESCE(p.enriched_content->>'descripcion_corta', p.description, p.name) AS description,
+        p.price,
+        p.primary_image_url,
+        p.image_url_transparent,
+        p.slug,
+        b.name AS brand_name,
+        c.name AS category_name,
+        COALESCE(i.quantity, 0) AS stock_qty
+    FROM catalog.products p
+    LEFT JOIN catalog.brands b ON b.id = p.brand_id
+    LEFT JOIN catalog.categories c ON c.id = p.category_id
+    LEFT JOIN inventory.product_availability i ON i.product_id = p.id
+    WHERE p.is_active = true
+      AND p.is_published = true
+      AND p.deleted_at IS NULL
+      AND p.primary_image_url IS NOT NULL
+      AND p.price > 0
+    ORDER BY p.created_at, p.id
+""")
+
+_NO_ATTRS = AttributesImpl({})
+
+
+def page_name(page: int) -> str:
+    return f"products-{page}.xml"
+
+
+def _price_band(price: float) -> str:
+    """Segmento de precio para Smart Shopping."""
+    if price < 20000:
+        return "menos-20k"
+    if price < 50000:
+        return "20k-50k"
+    if price < 100000:
+        return "50k-100k"
+    return "mas-100k"
+
+
+class _FeedPage:
+    """Una página del feed RSS escrita de forma incremental."""
+
+    def __init__(self, out: BinaryIO) -> None:
+        self._xml = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self._xml.startDocument()
+        self._xml.startElement(
+            "rss", AttributesImpl({"version": "2.0", "xmlns:g": "http://base.google.com/ns/1.0"})
+        )
+        self._xml.startElement("channel", _NO_ATTRS)
+        self._el("title", "Bigotes y Paticas — Catálogo")
+        self._el("link", STORE_URL)
+        self._el("description", "Catálogo de productos para mascotas en Pereira y Dosquebradas")
+        self._xml.ignorableWhitespace("\n")
+
+    def _el(self, name: str, value: str) -> None:
+        self._xml.startElement(name, _NO_ATTRS)
+        self._xml.characters(value)
+        self._xml.endElement(name)
+
+    def item(self, p) -> None:
+        stock = int(p["stock_qty"] or 0)
+        price = float(p["price"] or 0)
+        cat_name = p["category_name"] or ""
+        brand = (p["brand_name"] or "Bigotes y Paticas")[:70]
+
+        self._xml.startElement("item", _NO_ATTRS)
+        self._el("g:id", str(p["sku"] or p["id"]))
+        self._el("g:title", (p["name"] or "")[:150])
+        self._el("g:description", (p["description"] or p["name"] or "")[:5000])
+        self._el("g:link", f"{STORE_URL}/producto/{p['slug']}")
+
+        # Imagen principal (transparente preferida) + imagen adicional si existe la otra
+        main_img = p["image_url_transparent"] or p["primary_image_url"]
+        self._el("g:image_link", main_img)
+        if p["image_url_transparent"] and p["primary_image_url"] != p["image_url_transparent"]:
+            self._el("g:additional_image_link", p["primary_image_url"])
+
+        self._el("g:availability", "in stock" if stock > 0 else "out of stock")
+        self._el("g:condition", "new")
+        # Formato requerido por Google: "XXXXX.XX COP" con 2 decimales
+        self._el("g:price", f"{price:.2f} COP")
+        self._el("g:brand", brand)
+        self._el("g:identifier_exists", "no")
+
+        # Categoría Google específica por tipo de producto
+        self._el(
+            "g:google_product_category",
+            _GOOGLE_CAT.get(cat_name, "Animals & Pet Supplies > Pet Supplies"),
+        )
+        if cat_name:
+            self._el("g:product_type", cat_name)
+
+        # Envío Colombia — gratis desde $30.000, sino $5.000
+        self._xml.startElement("g:shipping", _NO_ATTRS)
+        self._el("g:country", "CO")
+        self._el("g:service", "Domicilio Pereira y Dosquebradas")
+        self._el("g:price", "0.00 COP" if price >= 30000 else "5000.00 COP")
+        self._xml.endElement("g:shipping")
+
+        # Custom labels para segmentación en Google Ads
+        self._el("g:custom_label_0", cat_name.lower() if cat_name else "otro")
+        self._el("g:custom_label_1", _PET_TYPE.get(cat_name, "perro-gato"))
+        self._el("g:custom_label_2", brand.lower())
+        self._el("g:custom_label_3", _price_band(price))
+        self._el("g:custom_label_4", "in-stock" if stock > 0 else "out-of-stock")
+        self._xml.endElement("item")
+        self._xml.ignorableWhitespace("\n")
+
+    def close(self) -> None:
+        self._xml.endElement("channel")
+        self._xml.endElement("rss")
+        self._xml.endDocument()
+
+
+async def build_products_feed(db: AsyncSession, writer: ArtifactWriter) -> None:
+    """Escribe todas las páginas del feed (al menos una, aunque quede vacía)."""
+    page_size = get_settings().catalog_feed_page_size
+    result = await db.stream(_FEED_SQL.execution_options(yield_per=500))
+
+    page_no, count = 1, 0
+    out = writer.path(page_name(page_no)).open("wb")
+    feed = _FeedPage(out)
+    try:
+        async for row in result.mappings():
+            if count == page_size:
+                feed.close()
+                out.close()
+                writer.done(page_name(page_no), count)
+                page_no, count = page_no + 1, 0
+                out = writer.path(page_name(page_no)).open("wb")
+                feed = _FeedPage(out)
+            feed.item(row)
+            count += 1
+        feed.close()
+    finally:
+        out.close()
+    writer.done(page_name(page_no), count)
@@ -0,0 +1,106 @@
+"""Recomendaciones "se compra junto con" desde la matriz de co-compra.
+
+Lee `sales.product_copurchase` / `sales.product_order_counts` (migración
+0033, mantenidas por triggers), así que una recomendación de carrito es un
+range scan por índice sobre los pares de los productos del carrito, no un
+recorrido de `sales.order_items`. La usan el POS (/intelligence/frequently-bought),
+la ficha de producto (/products/{id}/related) y el portal de clientes.
+
+Métricas por candidato B frente al carrito {A1..An}:
+- `together`: suma de órdenes con Ai y B (una orden con dos productos del
+  carrito y B cuenta dos veces; para ordenar es suficiente).
+- `confidence`: máx. P(B | Ai).
+- `lift`: máx. P(Ai y B) / (P(Ai) P(B)); >1 = se compran juntos más que por azar.
+"""
+
+from __future__ import annotations
+
+import time
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import Float, Row, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.catalog import Product
+from app.models.sales import ProductCopurchase, ProductOrderCount, SalesRollupHourly
+from app.services.stock_availability import availability_join, available_col
+
+_TOTAL_TTL_SECONDS = 300.0
+_total_orders_cache: tuple[float, int] | None = None
+
+
+async def total_orders(db: AsyncSession) -> int:
+    """Órdenes válidas totales (denominador del lift), desde el rollup horario.
+
+    Cacheado unos minutos por worker: el lift no cambia de forma apreciable
+    orden a orden.
+    """
+    global _total_orders_cache
+    now = time.monotonic()
+    if _total_orders_cache is not None and _total_orders_cache[0] > now:
+        return _total_orders_cache[1]
+    total = (
+        await db.execute(select(func.coalesce(func.sum(SalesRollupHourly.orders), 0)))
+    ).scalar_one()
+    _total_orders_cache = (now + _TOTAL_TTL_SECONDS, int(total or 0))
+    return _total_orders_cache[1]
+
+
+async def copurchased_with(
+    db: AsyncSession,
+    product_ids: Iterable[uuid.UUID],
+    limit: int,
+    *,
+    published_only: bool = False,
+) -> list[Row]:
+    """Top `limit` productos comprados junto con `product_ids` (excluyéndolos).
+
+    Filas: (Product, together, confidence, lift, available). Solo productos
+    activos y no eliminados; `published_only` además exige publicados en la
+    tienda.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return []
+
+    total = await total_orders(db)
+    base = aliased(ProductOrderCount)
+    cand = aliased(ProductOrderCount)
+    pair = ProductCopurchase
+    together = cast(pair.orders, Float)
+    pairs = (
+        select(
+            pair.other_product_id.label("product_id"),
+            func.sum(pair.orders).label("together"),
+            func.max(together / func.nullif(base.orders, 0)).label("confidence"),
+            func.max(
+                together * total / func.nullif(cast(base.orders, Float) * cand.orders, 0)
+            ).label("lift"),
+        )
+        .join(base, base.product_id == pair.product_id)
+        .join(cand, cand.product_id == pair.other_product_id)
+        .where(pair.product_id.in_(ids))
+        .where(pair.other_product_id.notin_(ids))
+        .where(pair.orders > 0)
+        .group_by(pair.other_product_id)
+        .subquery()
+    )
+
+    stmt = availability_join(
+        select(
+            Product,
+            pairs.c.together,
+            pairs.c.confidence,
+            pairs.c.lift,
+            available_col.label("available"),
+        ).join(pairs, pairs.c.product_id == Product.id)
+    )
+    stmt = stmt.where(Product.deleted_at.is_(None)).where(Product.is_active == True)  # noqa: E712
+    if published_only:
+        stmt = stmt.where(Product.is_published == True)  # noqa: E712
+    stmt = stmt.order_by(
+        pairs.c.together.desc(), pairs.c.lift.desc().nulls_last(), Product.id
+    ).limit(limit)
+    return list((await db.execute(stmt)).all())
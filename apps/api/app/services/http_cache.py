@@ -0,0 +1,133 @@
+"""Validadores HTTP (ETag / Last-Modified) y respuestas 304.
+
+Comparación según RFC 9110: `If-None-Match` usa comparación débil (un GET
+condicional puede validar contra una ETag `W/`) y tiene prioridad sobre
+`If-Modified-Since`, que se ignora si el cliente mandó ETags.
+
+Para endpoints JSON públicos, `conditional()` calcula la ETag *antes* de
+ejecutar el handler a partir de una "versión" barata de los datos (updated_at
+máximos, conteos: una query por índice) y responde 304 sin correr la query
+pesada ni serializar. Uso (debajo del decorador del router):
+
+    @router.get("/brands", response_model=list[BrandOut])
+    @conditional(_brands_version, cache_control=TAXONOMY_CACHE)
+    async def list_brands(db: DBSession): ...
+
+El validador recibe los mismos argumentos que el handler (por nombre) y
+devuelve cualquier valor serializable a JSON; None = sin ETag para este request.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+# Headers que un 304 debe repetir de la respuesta 200 equivalente
+_VALIDATOR_HEADERS = ("etag", "last-modified", "cache-control", "vary", "link")
+
+
+def http_date(value: datetime) -> str:
+    """Fecha en formato IMF-fixdate (`Sun, 06 Nov 1994 08:49:37 GMT`)."""
+    return format_datetime(value.astimezone(UTC), usegmt=True)
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """True si alguna ETag de `If-None-Match` coincide (o es `*`)."""
+    wanted = _opaque(etag)
+    return any(t.strip() == "*" or _opaque(t) == wanted for t in if_none_match.split(","))
+
+
+def is_not_modified(
+    request: Request, etag: str | None, last_modified: datetime | None = None
+) -> bool:
+    """El cliente ya tiene esta representación (GET/HEAD condicional)."""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=UTC)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    """Respuesta 304 sin cuerpo con los validadores de la 200."""
+    kept = {k: v for k, v in headers.items() if k.lower() in _VALIDATOR_HEADERS}
+    return Response(status_code=304, headers=kept)
+
+
+def cache_control(max_age: int, stale_while_revalidate: int = 0) -> str:
+    """`Cache-Control` público para el storefront y la CDN."""
+    value = f"public, max-age={max_age}"
+    if stale_while_revalidate:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+def version_etag(request: Request, version: Any) -> str:
+    """ETag fuerte de (URL, versión de los datos)."""
+    digest = hashlib.sha256(str(request.url.path).encode())
+    digest.update(str(request.url.query).encode())
+    digest.update(orjson.dumps(version, default=str))
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def conditional(
+    validator: Callable[..., Awaitable[Any]], *, cache_control: str
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Decorador para endpoints GET: ETag por versión + 304 sin ejecutar el handler."""
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func, eval_str=True)
+        extra = [
+            inspect.Parameter("_http_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter(
+                "_http_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response
+            ),
+        ]
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            request: Request = kwargs.pop("_http_request")
+            response: Response = kwargs.pop("_http_response")
+            version = await validator(**kwargs)
+            if version is None:
+                return await func(*args, **kwargs)
+
+            headers = {"ETag": version_etag(request, version), "Cache-Control": cache_control}
+            if is_not_modified(request, headers["ETag"]):
+                return not_modified(headers)
+            result = await func(*args, **kwargs)
+            response.headers.update(headers)
+            return result
+
+        # FastAPI lee la firma para inyectar dependencias; Request/Response extra
+        # para la ETag, sin tocar la firma del handler
+        wrapper.__signature__ = signature.replace(  # type: ignore[attr-defined]
+            parameters=[*signature.parameters.values(), *extra]
+        )
+        return wrapper
+
+    return decorator
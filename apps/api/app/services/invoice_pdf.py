@@ -11,6 +11,8 @@ from __future__ import annotations
 import base64
 import io
 
+from app.services import metrics
+
 LOGO_PNG_B64 = (
     "iVBORw0KGgoAAAANSUhEUgAAAKAAAACgCAYAAACLz2ctAABLIklEQVR42u29d3xc1Zk+/rzn3HunqRdLtmTLZdzkbmFjY7BsMO6FJlqAZEnbzaZns7/NZhPH"
     "2ZTdJSGbSkJCAqEEEAQwxjY2YGTcsVyxbGO5yFaxept6y3l/f9yZkcySTb4b2i7z8BG2Z0bSzL3Pec9bnvc9QBpppJFGGmmkkUYaaaSRRhpppJFGGmmkkUYa"
@@ -689,4 +691,5 @@ def generate_invoice_pdf(html: str) -> bytes:
     """Renderiza el HTML a PDF real usando WeasyPrint (libs nativas ya en el Dockerfile)."""
     from weasyprint import HTML
 
-    return HTML(string=html).write_pdf()
+    with metrics.PDF_RENDER_SECONDS.time("invoice"):
+        return HTML(string=html).write_pdf()
@@ -0,0 +1,98 @@
+"""Paginación keyset (cursor) para listados del back-office.
+
+En lugar de `OFFSET (page-1)*page_size`, el cliente manda el token opaco
+`next_cursor` de la página anterior y la query arranca justo después de la
+última fila vista con `WHERE (k1, k2) < (:v1, :v2)`, que Postgres resuelve con
+el índice del orden sin recorrer las filas ya servidas.
+
+El token también lleva los totales calculados en la primera página (conteo,
+agregados) para no repetir el `count()` completo en cada página siguiente.
+Son totales "de la primera página": si entran filas nuevas mientras se pagina,
+no se reflejan hasta volver a empezar.
+"""
+
+from __future__ import annotations
+
+import base64
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from sqlalchemy import tuple_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+class InvalidCursorError(ValueError):
+    """Token `after` mal formado o emitido para otro orden/listado."""
+
+
+def _encode_value(v: Any) -> list:
+    if v is None:
+        return ["n", None]
+    if isinstance(v, datetime):
+        return ["dt", v.isoformat()]
+    if isinstance(v, date):
+        return ["d", v.isoformat()]
+    if isinstance(v, uuid.UUID):
+        return ["u", str(v)]
+    if isinstance(v, Decimal):
+        return ["dec", str(v)]
+    if isinstance(v, bool | int | float | str):
+        return ["v", v]
+    raise TypeError(f"Valor no soportado en cursor: {type(v).__name__}")
+
+
+def _decode_value(item: list) -> Any:
+    tag, raw = item
+    if tag == "n":
+        return None
+    if tag == "dt":
+        return datetime.fromisoformat(raw)
+    if tag == "d":
+        return date.fromisoformat(raw)
+    if tag == "u":
+        return uuid.UUID(raw)
+    if tag == "dec":
+        return Decimal(raw)
+    if tag == "v":
+        return raw
+    raise InvalidCursorError(f"tipo de valor desconocido: {tag}")
+
+
+def encode_cursor(scope: str, key: tuple, totals: dict[str, Any] | None = None) -> str:
+    """Token opaco con la clave de la última fila servida y los totales cacheados.
+
+    `scope` identifica listado + orden (p.ej. "orders", "stock:price:asc") para
+    rechazar un cursor reutilizado con otro orden.
+    """
+    payload = {"s": scope, "k": [_encode_value(v) for v in key], "t": totals or {}}
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode().rstrip("=")
+
+
+def decode_cursor(token: str, scope: str) -> tuple[tuple, dict[str, Any]]:
+    """Devuelve (clave, totales). Lanza InvalidCursorError si el token no sirve."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = orjson.loads(raw)
+        if payload["s"] != scope:
+            raise InvalidCursorError("el cursor corresponde a otro listado u orden")
+        key = tuple(_decode_value(item) for item in payload["k"])
+        totals = dict(payload.get("t") or {})
+    except InvalidCursorError:
+        raise
+    except Exception as e:
+        raise InvalidCursorError("cursor inválido") from e
+    return key, totals
+
+
+def after_condition(
+    columns: list[ColumnElement], key: tuple, descending: bool = True
+) -> ColumnElement:
+    """Condición "fila posterior a `key`" para un ORDER BY con todas las columnas
+    en la misma dirección (comparación de tuplas de fila)."""
+    if len(columns) != len(key):
+        raise InvalidCursorError("el cursor no coincide con el orden del listado")
+    lhs = tuple_(*columns)
+    return lhs < tuple(key) if descending else lhs > tuple(key)
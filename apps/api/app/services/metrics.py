@@ -0,0 +1,346 @@
+"""Métricas en formato de exposición de Prometheus (texto 0.0.4), sin dependencias.
+
+Cada worker de gunicorn lleva sus contadores/histogramas en memoria y cada
+`PUBLISH_SECONDS` publica un snapshot en Redis (`metrics:worker:<host>:<pid>`,
+con TTL: un worker muerto desaparece solo). El host va en la clave porque
+varios contenedores comparten el Redis y sus pids se repiten. `/metrics`
+responde con el snapshot propio (fresco) más los de los demás workers, con la
+etiqueta `worker` (`<host>:<pid>`), así que un scrape a cualquier worker ve
+todos. Sin Redis, solo el propio.
+
+Uso:
+
+    RENDER_SECONDS = Histogram("bp_pdf_render_seconds", "...", ("document",))
+    with RENDER_SECONDS.time("invoice"):
+        pdf = HTML(string=html).write_pdf()
+
+Los valores que ya viven en otro lado (pool de conexiones, `CACHE_STATS`) se
+exponen con `register_collector`, que se evalúa en cada snapshot.
+
+Los contadores se nombran con `_total` y sus muestras llevan el mismo nombre
+que la familia (`# TYPE bp_x_total counter` / `bp_x_total{...}`), como pide la
+convención de Prometheus/OpenMetrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import os
+import socket
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+import orjson
+import redis.asyncio as aioredis
+import structlog
+
+from app.config import get_settings
+
+log = structlog.get_logger("metrics")
+
+PUBLISH_SECONDS = 15.0
+_KEY_PREFIX = "metrics:worker:"
+
+# Latencias de requests HTTP / jobs (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Muestra: (sufijo del nombre, etiquetas, valor)
+Sample = tuple[str, dict[str, str], float]
+# Familia serializada: {"type", "help", "samples"}
+Family = dict[str, Any]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _REGISTRY.append(self)
+
+    def _labels(self, values: tuple[str, ...]) -> dict[str, str]:
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: se esperaban etiquetas {self.labelnames}")
+        return dict(zip(self.labelnames, values, strict=True))
+
+    def samples(self) -> list[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        if not name.endswith("_total"):
+            raise ValueError(f"{name}: el nombre de un contador debe terminar en _total")
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> list[Sample]:
+        return [("", self._labels(k), v) for k, v in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> list[Sample]:
+        return [("", self._labels(k), v) for k, v in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas → (conteo por bucket, no acumulado; suma; conteo)
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts, total, n = self._values.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                counts[i] += 1
+                break
+        self._values[labels] = (counts, total + value, n + 1)
+
+    @contextlib.contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> list[Sample]:
+        out: list[Sample] = []
+        for key, (counts, total, n) in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for upper, count in zip(self.buckets, counts, strict=True):
+                cumulative += count
+                out.append(("_bucket", {**labels, "le": _format_value(upper)}, cumulative))
+            out.append(("_bucket", {**labels, "le": "+Inf"}, n))
+            out.append(("_sum", labels, total))
+            out.append(("_count", labels, n))
+        return out
+
+
+_REGISTRY: list[_Metric] = []
+_COLLECTORS: list[Callable[[], dict[str, Family]]] = []
+
+
+def register_collector(collector: Callable[[], dict[str, Family]]) -> None:
+    """Familias calculadas al momento del snapshot (valores que viven en otro módulo)."""
+    _COLLECTORS.append(collector)
+
+
+def family(kind: str, documentation: str, samples: list[Sample]) -> Family:
+    return {"type": kind, "help": documentation, "samples": samples}
+
+
+# ── Métricas de la API ────────────────────────────────────────────────────────
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "bp_http_request_duration_seconds",
+    "Latencia de requests HTTP por ruta (plantilla de la ruta, no el path).",
+    ("method", "route", "status"),
+)
+HTTP_DB_STATEMENTS = Counter(
+    "bp_http_db_statements_total",
+    "Statements SQL ejecutados por requests HTTP, por ruta.",
+    ("method", "route"),
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "bp_db_pool_checkout_seconds",
+    "Espera para obtener una conexión del pool (incluye abrir una nueva).",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "bp_db_pool_timeouts_total",
+    "Checkouts del pool que agotaron pool_timeout.",
+)
+SSE_SUBSCRIBERS = Gauge(
+    "bp_sse_subscribers",
+    "Streams SSE abiertos suscritos a Redis pub/sub, por canal.",
+    ("channel",),
+)
+PDF_RENDER_SECONDS = Histogram(
+    "bp_pdf_render_seconds",
+    "Tiempo de render de WeasyPrint por tipo de documento.",
+    ("document",),
+)
+JOB_SECONDS = Histogram(
+    "bp_job_duration_seconds",
+    "Duración de jobs en segundo plano del worker.",
+    ("job",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+JOB_FAILURES = Counter(
+    "bp_job_failures_total",
+    "Jobs en segundo plano terminados con error.",
+    ("job",),
+)
+
+
+@contextlib.contextmanager
+def time_job(job: str) -> Iterator[None]:
+    """Mide un job en segundo plano (`JOB_SECONDS`) y cuenta sus fallas."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        JOB_FAILURES.inc(job)
+        raise
+    finally:
+        JOB_SECONDS.observe(time.perf_counter() - start, job)
+
+
+# ── Snapshot / exposición ─────────────────────────────────────────────────────
+
+
+def snapshot() -> dict[str, Family]:
+    """Todas las familias del worker, serializables a JSON."""
+    families = {
+        m.name: family(m.kind, m.documentation, m.samples()) for m in _REGISTRY if m.samples()
+    }
+    for collector in _COLLECTORS:
+        try:
+            families.update(collector())
+        except Exception as e:
+            log.warning("metrics_collector_failed", error=str(e))
+    return families
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(workers: dict[str, dict[str, Family]]) -> str:
+    """Texto de exposición con las familias de todos los workers (etiqueta `worker`)."""
+    merged: dict[str, Family] = {}
+    for worker, families in sorted(workers.items()):
+        for name, fam in families.items():
+            target = merged.setdefault(name, family(fam["type"], fam["help"], []))
+            target["samples"].extend(
+                (suffix, {"worker": worker, **labels}, value)
+                for suffix, labels, value in fam["samples"]
+            )
+
+    lines: list[str] = []
+    for name in sorted(merged):
+        fam = merged[name]
+        lines.append(f"# HELP {name} {_escape(fam['help'])}")
+        lines.append(f"# TYPE {name} {fam['type']}")
+        for suffix, labels, value in fam["samples"]:
+            label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{suffix}{{{label_str}}} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsPublisher:
+    """Publica el snapshot del worker en Redis y junta los de los demás."""
+
+    def __init__(self) -> None:
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._redis: aioredis.Redis | None = None
+        self._task: asyncio.Task | None = None
+
+    def _client(self) -> aioredis.Redis:
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                get_settings().redis_url, socket_connect_timeout=0.25, socket_timeout=0.5
+            )
+        return self._redis
+
+    async def publish(self) -> None:
+        await self._client().set(
+            _KEY_PREFIX + self.worker,
+            orjson.dumps(snapshot()),
+            ex=int(PUBLISH_SECONDS * 4),
+        )
+
+    async def collect(self) -> dict[str, dict[str, Family]]:
+        """{worker: familias}; el propio siempre fresco, los demás desde Redis."""
+        workers = {self.worker: snapshot()}
+        try:
+            client = self._client()
+            keys = [k async for k in client.scan_iter(match=_KEY_PREFIX + "*", count=100)]
+            for key, raw in zip(keys, await client.mget(keys) if keys else [], strict=True):
+                worker = key.decode().removeprefix(_KEY_PREFIX)
+                if raw is not None and worker != self.worker:
+                    workers[worker] = orjson.loads(raw)
+        except Exception as e:
+            log.warning("metrics_redis_unavailable", error=str(e))
+        return workers
+
+    async def _publish_loop(self) -> None:
+        while True:
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("metrics_publish_failed", error=str(e))
+            await asyncio.sleep(PUBLISH_SECONDS)
+
+    def start(self) -> None:
+        """Lanza la publicación periódica del snapshot (una por worker)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._publish_loop(), name="metrics-publish")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._redis is not None:
+            with contextlib.suppress(Exception):
+                await self._redis.delete(_KEY_PREFIX + self.worker)
+                await self._redis.aclose()
+            self._redis = None
+
+
+_publisher: MetricsPublisher | None = None
+
+
+def get_metrics_publisher() -> MetricsPublisher:
+    global _publisher
+    if _publisher is None:
+        _publisher = MetricsPublisher()
+    return _publisher
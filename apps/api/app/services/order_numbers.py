@@ -0,0 +1,31 @@
+"""Consecutivo de órdenes `BP-YYYYMMDD-XXXX`.
+
+El número sale de `sales.next_order_seq(día)` (migración 0030): un `nextval`
+sobre `sales.order_number_seq` menos el desplazamiento del día, sin escanear
+`sales.orders` por prefijo. Corre en la sesión del checkout, sin conexión
+aparte del pool: `nextval` no bloquea, así que el POS y el puente del portal no
+quedan en fila detrás de la transacción del otro. Si la orden falla después de
+tomar el número queda un hueco en el consecutivo; nunca un duplicado.
+
+Todo código que cree `sales.orders` debe pedir el número acá.
+"""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def format_order_number(day: datetime, seq: int) -> str:
+    return f"BP-{day.strftime('%Y%m%d')}-{seq:04d}"
+
+
+async def next_order_number(db: AsyncSession) -> str:
+    """Toma el siguiente número del día (UTC) en la transacción de `db`."""
+    now = datetime.now(UTC)
+    seq = (
+        await db.execute(text("SELECT sales.next_order_seq(:day)"), {"day": now.date()})
+    ).scalar_one()
+    return format_order_number(now, seq)
@@ -24,6 +24,7 @@ from app.models.portal import (
     PortalOrderItem,
     PortalReferral,
 )
+from app.services.order_numbers import next_order_number
 
 # ── Mapeo de workflow_status a template de notificación ───────────────────────
 
@@ -203,7 +204,6 @@ async def bridge_to_sales(order: PortalOrder, db: DBSession) -> str:
     if order.sales_order_id:
         return order.invoice_number or ""
 
-    from app.api.v1.sales import _next_order_number
     from app.models.sales import Order as SalesOrder
     from app.models.sales import OrderItem as SalesOrderItem
 
@@ -238,6 +238,9 @@ async def bridge_to_sales(order: PortalOrder, db: DBSession) -> str:
     else:
         stock_lines = []
 
+    # nextval no bloquea: el número se toma en la misma transacción
+    invoice_num = await next_order_number(db)
+
     if stock_lines:
         loc = (
             await db.execute(select(StockLocation).where(StockLocation.is_default == 1).limit(1))
@@ -250,7 +253,8 @@ async def bridge_to_sales(order: PortalOrder, db: DBSession) -> str:
         shortages: list[dict] = []
         locked_stocks: dict[uuid.UUID, Stock] = {}
         if loc:
-            for product_id, qty, name in stock_lines:
+            # Mismo orden de lock que el POS (por product_id) para evitar deadlocks
+            for product_id, qty, name in sorted(stock_lines, key=lambda line: line[0]):
                 stock = (
                     await db.execute(
                         select(Stock)
@@ -292,7 +296,6 @@ async def bridge_to_sales(order: PortalOrder, db: DBSession) -> str:
                     )
                 )
 
-    invoice_num = await _next_order_number(db)
     now = datetime.now(UTC)
 
     sales_order = SalesOrder(
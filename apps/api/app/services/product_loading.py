@@ -0,0 +1,44 @@
+"""Perfiles de carga de relaciones de `Product` por endpoint.
+
+`Product.brand` / `Product.category` son `lazy="raise_on_sql"`: un SELECT de
+productos no trae marca ni categoría salvo que el endpoint lo pida con uno de
+estos perfiles, y acceder a una relación no cargada falla en vez de disparar
+una query por fila (N+1; en AsyncSession además revienta con MissingGreenlet).
+
+Las dos relaciones son many-to-one, así que `joinedload` las resuelve en el
+mismo SELECT de la página: el número de statements no depende del número de
+filas. `tests/test_query_budgets.py` lo verifica por endpoint.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.models.catalog import Product
+
+LoadProfile = Sequence[LoaderOption]
+
+# ProductOut (brand + category anidados), export XLSX de catálogo
+PRODUCT_OUT: LoadProfile = (joinedload(Product.brand), joinedload(Product.category))
+# Resultados de búsqueda (solo el nombre de la marca)
+PRODUCT_BRAND: LoadProfile = (joinedload(Product.brand),)
+# Conteos de inventario (nombre de categoría por ítem)
+PRODUCT_CATEGORY: LoadProfile = (joinedload(Product.category),)
+
+
+async def load_product(
+    db: AsyncSession, *where: Any, profile: LoadProfile = PRODUCT_OUT
+) -> Product | None:
+    """Un producto con las relaciones de `profile`.
+
+    `populate_existing` pisa la instancia de la sesión: sirve también para
+    releer un producto recién creado/editado (en lugar de `db.refresh`).
+    """
+    stmt = select(Product).where(*where).options(*profile).execution_options(populate_existing=True)
+    return (await db.execute(stmt)).scalar_one_or_none()
@@ -0,0 +1,114 @@
+"""Estadísticas de statements SQL por contexto (request, bloque de un test).
+
+Listeners `before/after_cursor_execute` en el engine suman al `QueryStats`
+activo en el contexto actual (ContextVar: SQLAlchemy async corre el driver en
+un greenlet que comparte el contexto de la tarea que hizo el `await`).
+`RequestIDMiddleware` abre uno por request y lo vuelca en el log `http_request`
+y en `Server-Timing`; los tests de presupuesto lo usan directamente:
+
+    with track_queries() as stats:
+        await client.get("/v1/products")
+    assert stats.statements <= 4
+
+Con `slow_query_ms` > 0 cada statement que lo supere se loguea (`slow_query`),
+esté o no dentro de un request.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+from sqlalchemy import event
+
+from app.config import get_settings
+from app.db import engine
+
+log = structlog.get_logger("sql")
+
+_SQL_PREVIEW_CHARS = 300
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class QueryStats:
+    request_id: str | None = None
+    statements: int = 0
+    db_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_sql: str | None = None
+
+    def log_fields(self) -> dict[str, Any]:
+        return {
+            "db_statements": self.statements,
+            "db_ms": round(self.db_ms, 2),
+            "db_slowest_ms": round(self.slowest_ms, 2),
+            "db_slowest_sql": self.slowest_sql,
+        }
+
+
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+def _preview(statement: str) -> str:
+    return _WHITESPACE.sub(" ", statement).strip()[:_SQL_PREVIEW_CHARS]
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_statement(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _end_statement(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    # Un statement que falla no llega acá: su inicio queda en la pila y se
+    # descarta en el próximo checkout de la conexión (ver `_reset_timer`)
+    elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_ms += elapsed_ms
+        if elapsed_ms > stats.slowest_ms:
+            stats.slowest_ms = elapsed_ms
+            stats.slowest_sql = _preview(statement)
+
+    threshold = get_settings().slow_query_ms
+    if threshold and elapsed_ms >= threshold:
+        log.warning(
+            "slow_query",
+            request_id=stats.request_id if stats else None,
+            duration_ms=round(elapsed_ms, 2),
+            executemany=executemany,
+            sql=_preview(statement),
+        )
+
+
+@event.listens_for(engine.sync_engine, "engine_connect")
+def _reset_timer(conn: Any) -> None:
+    conn.info.pop("query_start", None)
+
+
+@contextmanager
+def track_queries(request_id: str | None = None) -> Iterator[QueryStats]:
+    """Acumula los statements ejecutados dentro del bloque (y de las tareas que lance)."""
+    stats = QueryStats(request_id=request_id)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def server_timing(stats: QueryStats, total_ms: float) -> str:
+    """Header `Server-Timing`: tiempo en base (con cantidad de statements) y total."""
+    return f'db;dur={stats.db_ms:.1f};desc="{stats.statements} queries", app;dur={total_ms:.1f}'
@@ -0,0 +1,55 @@
+"""Productos relacionados precalculados (`catalog.product_related`).
+
+El puntaje (categoría, marca, health_concerns, banda de precio, co-compra y
+especie) vive en `catalog.rebuild_product_related()` (migración 0035). Se
+recalcula completo cada noche (`python -m app.cli.rebuild_related`) y por
+producto cuando se crea o edita, así la ficha lee el top-N con una sola
+query por la PK `(product_id, rank)`.
+
+Un producto editado no reaparece en las listas de *otros* productos hasta el
+job nocturno; por eso la lectura vuelve a filtrar publicados/no eliminados.
+"""
+
+from __future__ import annotations
+
+import uuid
+
+from sqlalchemy import Row, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product, ProductRelated
+from app.services.product_loading import PRODUCT_OUT
+from app.services.stock_availability import availability_join, stock_qty_col
+
+DEFAULT_TOP_N = 12
+
+
+async def rebuild_related(
+    db: AsyncSession, product_id: uuid.UUID | None = None, top_n: int = DEFAULT_TOP_N
+) -> int:
+    """Recalcula los vecinos de `product_id` (None = todo el catálogo). No hace commit."""
+    rows = (
+        await db.execute(
+            text("SELECT catalog.rebuild_product_related(:product_id, :top_n)"),
+            {"product_id": product_id, "top_n": top_n},
+        )
+    ).scalar_one()
+    return int(rows or 0)
+
+
+async def related_for(db: AsyncSession, product_id: uuid.UUID, limit: int) -> list[Row]:
+    """Top `limit` relacionados publicados de `product_id`: filas (Product, stock_qty)."""
+    stmt = availability_join(
+        select(Product, stock_qty_col.label("stock_qty"))
+        .options(*PRODUCT_OUT)
+        .select_from(ProductRelated)
+        .join(Product, Product.id == ProductRelated.related_product_id)
+    )
+    stmt = (
+        stmt.where(ProductRelated.product_id == product_id)
+        .where(Product.deleted_at.is_(None))
+        .where(Product.is_published == True)  # noqa: E712
+        .order_by(ProductRelated.rank)
+        .limit(limit)
+    )
+    return list((await db.execute(stmt)).all())
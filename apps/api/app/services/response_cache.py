@@ -0,0 +1,258 @@
+"""Cache de respuestas para endpoints de lectura pesados (analytics, intelligence).
+
+Dos niveles:
+- L1 en proceso (dict con TTL, por worker), siempre consultado primero.
+- Redis (`settings.redis_url`), compartido entre workers.
+
+Invalidación por tags con versionado: cada tag tiene un contador
+(`cache:tag:<tag>`) que forma parte de la clave. `invalidate("sales")` solo
+incrementa el contador; las entradas viejas dejan de ser alcanzables y expiran
+por TTL. Si Redis no responde, el cache sigue funcionando solo con L1 y con
+las versiones de tag locales del worker, y se reintenta Redis tras una pausa.
+
+Uso en un endpoint (debajo del decorador del router):
+
+    @router.get("/overview", response_model=IntelligenceOut)
+    @cached("intelligence:overview", ttl=600, tags=("sales", "inventory"))
+    async def intelligence_overview(db: DBSession, ...): ...
+
+Y en los caminos de escritura, después del commit:
+
+    await invalidate("sales", "inventory")
+
+La clave usa solo los parámetros escalares del endpoint (query params); la
+sesión de DB se ignora. Una entrada se comparte entre todos los que pasan la
+autorización del endpoint, así que el permiso va en `dependencies=[...]` y no
+como parámetro: `cached` rechaza endpoints que reciben el `User` salvo que se
+declare `per_user=True`, que agrega el id del usuario a la clave.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import time
+import uuid
+from collections import Counter, OrderedDict
+from collections.abc import Awaitable, Callable, Iterable
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Annotated, Any, get_args, get_origin
+
+import orjson
+import redis.asyncio as aioredis
+import structlog
+from fastapi.encoders import jsonable_encoder
+
+from app.config import get_settings
+from app.models.auth import User
+from app.services import metrics
+
+log = structlog.get_logger("cache")
+
+_SCALARS = (str, int, float, bool, Decimal, date, datetime, uuid.UUID, Enum)
+_L1_MAX_ENTRIES = 512
+_REDIS_RETRY_SECONDS = 30.0
+
+# (namespace, resultado) → contador; resultado ∈ {"l1_hit", "redis_hit", "miss"}
+CACHE_STATS: Counter[tuple[str, str]] = Counter()
+
+
+def _cache_metrics() -> dict[str, metrics.Family]:
+    samples = [
+        ("", {"namespace": ns, "outcome": outcome}, n) for (ns, outcome), n in CACHE_STATS.items()
+    ]
+    return {
+        "bp_response_cache_lookups_total": metrics.family(
+            "counter", "Consultas al cache de respuestas por resultado.", samples
+        )
+    }
+
+
+metrics.register_collector(_cache_metrics)
+
+
+class _ResponseCache:
+    def __init__(self, redis_url: str) -> None:
+        self._redis_url = redis_url
+        self._redis: aioredis.Redis | None = None
+        self._redis_down_until = 0.0
+        self._l1: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._local_tags: dict[str, int] = {}
+
+    # ── Redis con corte rápido ───────────────────────────────
+    def _client(self) -> aioredis.Redis | None:
+        if time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(
+                self._redis_url, socket_connect_timeout=0.25, socket_timeout=0.25
+            )
+        return self._redis
+
+    def _mark_down(self, exc: Exception) -> None:
+        self._redis_down_until = time.monotonic() + _REDIS_RETRY_SECONDS
+        log.warning("cache_redis_unavailable", error=str(exc))
+
+    # ── Tags ─────────────────────────────────────────────────
+    async def tag_versions(self, tags: tuple[str, ...]) -> tuple[int, ...]:
+        local = tuple(self._local_tags.get(t, 0) for t in tags)
+        client = self._client()
+        if client is None or not tags:
+            return local
+        try:
+            remote = await client.mget([f"cache:tag:{t}" for t in tags])
+        except Exception as e:
+            self._mark_down(e)
+            return local
+        # max(): una invalidación hecha con Redis caído no se pierde al volver
+        return tuple(max(int(r or 0), lv) for r, lv in zip(remote, local, strict=True))
+
+    async def invalidate(self, *tags: str) -> None:
+        for t in tags:
+            self._local_tags[t] = self._local_tags.get(t, 0) + 1
+        client = self._client()
+        if client is None:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for t in tags:
+                    pipe.incr(f"cache:tag:{t}")
+                await pipe.execute()
+        except Exception as e:
+            self._mark_down(e)
+
+    # ── Entradas ─────────────────────────────────────────────
+    async def get(self, key: str) -> tuple[bytes | None, str]:
+        entry = self._l1.get(key)
+        if entry is not None:
+            expires_at, raw = entry
+            if expires_at > time.monotonic():
+                self._l1.move_to_end(key)
+                return raw, "l1_hit"
+            del self._l1[key]
+
+        client = self._client()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+            except Exception as e:
+                self._mark_down(e)
+                raw = None
+            if raw is not None:
+                ttl = await self._remaining_ttl(client, key)
+                self._l1_put(key, raw, ttl)
+                return raw, "redis_hit"
+        return None, "miss"
+
+    async def _remaining_ttl(self, client: aioredis.Redis, key: str) -> float:
+        try:
+            ttl = await client.ttl(key)
+        except Exception:
+            return 0.0
+        return float(ttl) if ttl and ttl > 0 else 0.0
+
+    async def set(self, key: str, raw: bytes, ttl: int) -> None:
+        self._l1_put(key, raw, ttl)
+        client = self._client()
+        if client is None:
+            return
+        try:
+            await client.set(key, raw, ex=ttl)
+        except Exception as e:
+            self._mark_down(e)
+
+    def _l1_put(self, key: str, raw: bytes, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._l1[key] = (time.monotonic() + ttl, raw)
+        self._l1.move_to_end(key)
+        while len(self._l1) > _L1_MAX_ENTRIES:
+            self._l1.popitem(last=False)
+
+
+_cache: _ResponseCache | None = None
+
+
+def get_cache() -> _ResponseCache:
+    global _cache
+    if _cache is None:
+        _cache = _ResponseCache(get_settings().redis_url)
+    return _cache
+
+
+async def invalidate(*tags: str) -> None:
+    """Invalida todas las respuestas cacheadas con alguno de estos tags."""
+    await get_cache().invalidate(*tags)
+
+
+def _params_digest(kwargs: dict[str, Any]) -> str:
+    params = {
+        k: (v.value if isinstance(v, Enum) else v)
+        for k, v in sorted(kwargs.items())
+        if v is None or isinstance(v, _SCALARS)
+    }
+    raw = orjson.dumps(params, default=str)
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def _user_params(signature: inspect.Signature) -> list[str]:
+    """Parámetros del endpoint que reciben al usuario que llama (`CurrentUser`)."""
+    names = []
+    for name, param in signature.parameters.items():
+        ann = param.annotation
+        if get_origin(ann) is Annotated:
+            ann = get_args(ann)[0]
+        if ann is User:
+            names.append(name)
+    return names
+
+
+def cached(
+    namespace: str, *, ttl: int, tags: Iterable[str] = (), per_user: bool = False
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """Decorador para endpoints async: cachea la respuesta serializada (JSON).
+
+    Sin `per_user` la respuesta se comparte entre usuarios: el endpoint no puede
+    recibir al `User` (TypeError al decorar). Con `per_user=True` la clave
+    incluye el id del usuario.
+    """
+    tag_tuple = tuple(tags)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func, eval_str=True)
+        user_params = _user_params(signature)
+        if user_params and not per_user:
+            raise TypeError(
+                f"@cached({namespace!r}): el endpoint recibe al usuario ({', '.join(user_params)}) "
+                "y la respuesta se compartiría entre usuarios; mover el permiso a "
+                "dependencies=[...] o declarar per_user=True"
+            )
+        if per_user and not user_params:
+            raise TypeError(f"@cached({namespace!r}, per_user=True): el endpoint no recibe al User")
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            cache = get_cache()
+            versions = await cache.tag_versions(tag_tuple)
+            scope = ",".join(str(kwargs[p].id) for p in user_params) if per_user else "*"
+            key = (
+                f"cache:{namespace}:{'.'.join(map(str, versions))}:{scope}:"
+                f"{_params_digest(kwargs)}"
+            )
+            raw, outcome = await cache.get(key)
+            CACHE_STATS[(namespace, outcome)] += 1
+            if raw is not None:
+                return orjson.loads(raw)
+
+            result = await func(*args, **kwargs)
+            await cache.set(key, orjson.dumps(jsonable_encoder(result)), ttl)
+            return result
+
+        # FastAPI lee la firma (con anotaciones ya resueltas) para inyectar dependencias
+        wrapper.__signature__ = signature  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,73 @@
+"""Segmentación RFM precalculada en `crm.customers.rfm_*`.
+
+El cálculo vive en Postgres (migración 0032):
+- los triggers de sales.orders y sales.order_items mantienen al día las
+  métricas crudas de cada cliente (última compra, frecuencia, monetario,
+  intervalo, favorito);
+- `crm.rebuild_customer_rfm()` recalcula todo en una pasada y asigna puntajes
+  R/F/M por quintil y segmento (`rebuild_rfm`, job nocturno).
+
+Los endpoints leen solo esas columnas. Lo que depende de "hoy" (días desde la
+última compra, atraso contra el intervalo) se calcula en la query con
+`days_since()`, así no envejece entre rebuilds.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, and_, cast, extract, func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.crm import Customer
+
+DEFAULT_AT_RISK_DAYS = 60
+
+# Ventana de recompra: desde 7 días antes del intervalo habitual hasta 2.5x el
+# intervalo (más allá el cliente se considera perdido, no "por recomprar").
+REPURCHASE_LEAD_DAYS = 7
+REPURCHASE_LAPSE_FACTOR = 2.5
+
+
+async def rebuild_rfm(db: AsyncSession, at_risk_days: int = DEFAULT_AT_RISK_DAYS) -> int:
+    """Recalcula métricas, puntajes y segmento de todos los clientes. No hace commit."""
+    rows = (
+        await db.execute(
+            text("SELECT crm.rebuild_customer_rfm(:at_risk_days)"),
+            {"at_risk_days": at_risk_days},
+        )
+    ).scalar_one()
+    return int(rows or 0)
+
+
+def days_since(now: datetime) -> ColumnElement:
+    """Días completos desde la última compra válida (como `(now - last).days`)."""
+    return cast(func.floor(extract("epoch", now - Customer.rfm_last_order_at) / 86400), Integer)
+
+
+def days_overdue(now: datetime) -> ColumnElement:
+    """Días de atraso contra el intervalo habitual (negativo = aún no le toca)."""
+    return days_since(now) - Customer.rfm_avg_interval_days
+
+
+def repurchase_condition(now: datetime) -> ColumnElement:
+    """Cliente recurrente al que le toca (o está por tocarle) volver a comprar."""
+    return and_(
+        Customer.rfm_frequency >= 2,
+        Customer.rfm_avg_interval_days.isnot(None),
+        days_overdue(now) >= -REPURCHASE_LEAD_DAYS,
+        days_since(now) <= Customer.rfm_avg_interval_days * REPURCHASE_LAPSE_FACTOR,
+    )
+
+
+def at_risk_condition(now: datetime, at_risk_days: int = DEFAULT_AT_RISK_DAYS) -> ColumnElement:
+    """Cliente recurrente (≥2 compras) sin comprar hace `at_risk_days` o más.
+
+    Con el umbral por defecto coincide con `Customer.rfm_at_risk` del último
+    cálculo; aquí se evalúa contra `now` para cualquier umbral.
+    """
+    return and_(
+        Customer.rfm_frequency >= 2,
+        Customer.rfm_last_order_at <= now - timedelta(days=at_risk_days),
+    )
@@ -0,0 +1,74 @@
+"""Plegado en segundo plano de los rollups de ventas (migración 0031).
+
+Los triggers de sales.orders/order_items/payments no tocan los rollups: anexan
+el delta a `sales.sales_rollup_*_pending`, así que los checkouts concurrentes
+no se serializan sobre la fila de la hora actual ni se bloquean entre sí por
+categorías. Cada worker llama a `sales.fold_sales_rollup()` cada
+`FOLD_SECONDS`; la función toma un lock consultivo (un solo fold a la vez en
+todo el cluster) y suma los pendientes en orden de clave.
+
+La API lee las vistas `*_live` (rollup + pendientes), así que un fold atrasado
+solo hace que esas lecturas recorran más filas pendientes; los números no
+cambian.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+
+import structlog
+from sqlalchemy import text
+
+from app.db import AsyncSessionLocal
+from app.services import metrics
+
+log = structlog.get_logger("sales_rollup")
+
+FOLD_SECONDS = 30.0
+
+
+async def fold() -> int:
+    """Suma los deltas pendientes a los rollups; filas de rollup tocadas."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(text("SELECT sales.fold_sales_rollup()"))).scalar_one()
+        await db.commit()
+    return int(rows or 0)
+
+
+class RollupFolder:
+    def __init__(self) -> None:
+        self._task: asyncio.Task | None = None
+
+    async def _fold_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(FOLD_SECONDS)
+                with metrics.time_job("sales_rollup_fold"):
+                    await fold()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("sales_rollup_fold_error", error=str(e))
+
+    def start(self) -> None:
+        """Lanza el fold periódico en segundo plano (uno por worker)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._fold_loop(), name="sales-rollup-fold")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+_folder: RollupFolder | None = None
+
+
+def get_rollup_folder() -> RollupFolder:
+    global _folder
+    if _folder is None:
+        _folder = RollupFolder()
+    return _folder
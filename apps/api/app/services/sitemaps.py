@@ -0,0 +1,201 @@
+"""Sitemaps XML precalculados, en shards por tipo de página.
+
+Cada tipo (productos, categorías, posts, landings) es un artefacto propio de
+`services.artifacts` con shards `<tipo>-N.xml` de hasta 50.000 URLs (límite
+del protocolo) y `lastmod` por shard. Los regeneran los triggers de la
+migración 0037 solo cuando cambia su tipo; el índice (`sitemap.xml`) se arma
+en memoria con los manifests de los cuatro, sin tocar la base.
+
+Los crawlers rechazan sitemaps hijos en otro host, así que todo se publica en
+el host del storefront (`store_public_url`): el storefront sirve `/sitemap.xml`
+y `/sitemaps/<shard>` como proxy de `/v1/seo/...`, y aporta sus páginas fijas
+en `/sitemap-pages.xml`, que el índice lista primero.
+
+La regeneración es por tipo, no por shard: los shards se cortan por posición
+en el orden de la query, así que un alta o una despublicación corre los
+límites de todos los siguientes, y la cola de cambios es por sentencia (sin
+ids de fila). Lo que ven los crawlers sí es por shard: un shard cuyo contenido
+no cambió conserva ETag y `lastmod`, y no se vuelve a descargar.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import BinaryIO
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
+
+from sqlalchemy import TextClause, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.services.artifacts import ArtifactWriter, Manifest
+
+MAX_URLS_PER_SHARD = 50_000
+# Sitemap de páginas fijas (home, nosotros, …) que arma el storefront
+STATIC_SITEMAP_PATH = "/sitemap-pages.xml"
+
+_NS = {"xmlns": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+_NO_ATTRS = AttributesImpl({})
+
+
+def store_url(path: str = "") -> str:
+    """URL absoluta en el host público del storefront."""
+    return get_settings().store_public_url.rstrip("/") + path
+
+
+def shard_url(name: str) -> str:
+    """URL pública de un shard (el storefront la sirve como proxy)."""
+    return store_url(f"/sitemaps/{name}")
+
+
+def _w3c(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.astimezone(UTC).replace(microsecond=0).isoformat()
+
+
+class _XmlDoc:
+    """Documento de sitemap (`urlset` o `sitemapindex`) escrito de forma incremental."""
+
+    def __init__(self, out: BinaryIO, root: str) -> None:
+        self._root = root
+        self._xml = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self._xml.startDocument()
+        self._xml.startElement(root, AttributesImpl(_NS))
+        self._xml.ignorableWhitespace("\n")
+
+    def entry(self, tag: str, fields: Iterable[tuple[str, str]]) -> None:
+        self._xml.startElement(tag, _NO_ATTRS)
+        for name, value in fields:
+            self._xml.startElement(name, _NO_ATTRS)
+            self._xml.characters(value)
+            self._xml.endElement(name)
+        self._xml.endElement(tag)
+        self._xml.ignorableWhitespace("\n")
+
+    def close(self) -> None:
+        self._xml.endElement(self._root)
+        self._xml.endDocument()
+
+
+@dataclass(frozen=True)
+class SitemapSource:
+    """Un tipo de página del sitemap: query (slug, lastmod, priority) + prefijo de URL."""
+
+    kind: str
+    path: str
+    changefreq: str
+    sql: TextClause
+
+    @property
+    def artifact(self) -> str:
+        return f"sitemap_{self.kind}"
+
+    def shard_name(self, n: int) -> str:
+        return f"{self.kind}-{n}.xml"
+
+    async def build(self, db: AsyncSession, writer: ArtifactWriter) -> None:
+        base = store_url(f"/{self.path}/")
+        result = await db.stream(self.sql.execution_options(yield_per=1000))
+        shard, count, lastmod = 1, 0, None
+        out = writer.path(self.shard_name(shard)).open("wb")
+        doc = _XmlDoc(out, "urlset")
+        try:
+            async for slug, row_lastmod, priority in result:
+                if count == MAX_URLS_PER_SHARD:
+                    doc.close()
+                    out.close()
+                    writer.done(self.shard_name(shard), count, lastmod)
+                    shard, count, lastmod = shard + 1, 0, None
+                    out = writer.path(self.shard_name(shard)).open("wb")
+                    doc = _XmlDoc(out, "urlset")
+                fields = [("loc", base + slug)]
+                if row_lastmod is not None:
+                    if row_lastmod.tzinfo is None:
+                        row_lastmod = row_lastmod.replace(tzinfo=UTC)
+                    lastmod = max(lastmod, row_lastmod) if lastmod else row_lastmod
+                    fields.append(("lastmod", _w3c(row_lastmod)))
+                fields += [("changefreq", self.changefreq), ("priority", f"{priority:.1f}")]
+                doc.entry("url", fields)
+                count += 1
+            doc.close()
+        finally:
+            out.close()
+        writer.done(self.shard_name(shard), count, lastmod)
+
+
+SOURCES: tuple[SitemapSource, ...] = (
+    SitemapSource(
+        kind="products",
+        path="producto",
+        changefreq="weekly",
+        # Los agotados quedan en el sitemap pero con menor prioridad
+        sql=text("""
+            SELECT p.slug, p.updated_at,
+                   CASE WHEN COALESCE(pa.quantity, 0) > 0 THEN 0.7 ELSE 0.4 END
+            FROM catalog.products p
+            LEFT JOIN inventory.product_availability pa ON pa.product_id = p.id
+            WHERE p.is_published = true AND p.deleted_at IS NULL
+            ORDER BY p.created_at, p.id
+        """),
+    ),
+    SitemapSource(
+        kind="categories",
+        path="categorias",
+        changefreq="daily",
+        sql=text("""
+            SELECT slug, updated_at, 0.9
+            FROM catalog.categories
+            WHERE is_active = true AND deleted_at IS NULL
+            ORDER BY slug
+        """),
+    ),
+    SitemapSource(
+        kind="posts",
+        path="blog",
+        changefreq="monthly",
+        sql=text("""
+            SELECT slug, GREATEST(updated_at, published_at), 0.6
+            FROM content.blog_posts
+            WHERE published_at IS NOT NULL
+            ORDER BY published_at, slug
+        """),
+    ),
+    SitemapSource(
+        kind="landings",
+        path="landing",
+        changefreq="weekly",
+        sql=text("""
+            SELECT slug, updated_at, 0.75
+            FROM content.seo_landings
+            WHERE is_active = true AND slug NOT LIKE 'test-%'
+            ORDER BY slug
+        """),
+    ),
+)
+
+SOURCES_BY_KIND = {s.kind: s for s in SOURCES}
+
+
+def index_etag(manifests: Iterable[Manifest]) -> str:
+    """ETag del índice: cambia solo si cambia algún shard."""
+    digest = hashlib.sha256()
+    for m in manifests:
+        for f in m.files:
+            digest.update(f"{f.name}={f.etag};".encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def render_index(entries: Iterable[tuple[str, datetime | None]], out: BinaryIO) -> None:
+    """`sitemapindex` con (URL del shard, lastmod)."""
+    doc = _XmlDoc(out, "sitemapindex")
+    for loc, lastmod in entries:
+        fields = [("loc", loc)]
+        if lastmod is not None:
+            fields.append(("lastmod", _w3c(lastmod)))
+        doc.entry("sitemap", fields)
+    doc.close()
@@ -0,0 +1,145 @@
+"""Mapa en memoria de redirecciones 301 de slugs (`catalog.slug_redirects`).
+
+`/v1/search/redirect` lo consulta cada vez que el storefront cae en un 404 de
+producto, así que la búsqueda no puede escribir en la base por request:
+
+- el mapa old_slug → new_slug se carga completo al arrancar (la tabla es
+  chica) y se recarga cuando cambia su huella (conteo + hash de los pares),
+  que se revisa cada `SYNC_SECONDS`; la tabla la escriben el ETL y SQL a mano,
+  así que no hay un camino de escritura en la API que pueda avisar;
+- los hits se acumulan por worker y se vuelcan en un solo UPDATE por lote en
+  el mismo ciclo (y al apagar el worker). Un worker que muere sin apagarse
+  pierde como mucho `SYNC_SECONDS` de conteos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections import Counter
+
+import structlog
+from sqlalchemy import text
+
+from app.db import AsyncSessionLocal
+from app.services import metrics
+
+log = structlog.get_logger("slug_redirects")
+
+SYNC_SECONDS = 30.0
+
+_FINGERPRINT_SQL = text("""
+    SELECT COUNT(*), COALESCE(SUM(hashtext(old_slug || '>' || new_slug)::BIGINT), 0)
+    FROM catalog.slug_redirects
+""")
+
+# Orden por old_slug: dos workers que vuelcan a la vez toman los locks en el mismo orden
+_FLUSH_SQL = text("""
+    UPDATE catalog.slug_redirects r
+    SET redirect_count = COALESCE(r.redirect_count, 0) + v.hits,
+        last_redirect_at = now()
+    FROM (
+        SELECT * FROM unnest(CAST(:slugs AS TEXT[]), CAST(:hits AS INTEGER[])) AS t(old_slug, hits)
+        ORDER BY old_slug
+    ) v
+    WHERE r.old_slug = v.old_slug
+""")
+
+
+class RedirectMap:
+    def __init__(self) -> None:
+        self._map: dict[str, str] = {}
+        self._fingerprint: tuple[int, int] | None = None
+        self._hits: Counter[str] = Counter()
+        self._load_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._fingerprint is not None
+
+    def lookup(self, old_slug: str) -> str | None:
+        """Slug nuevo (y cuenta el hit) o None si no hay redirección."""
+        new_slug = self._map.get(old_slug)
+        if new_slug is not None:
+            self._hits[old_slug] += 1
+        return new_slug
+
+    async def reload(self, *, force: bool = False) -> None:
+        """Recarga el mapa si cambió la tabla (o siempre con `force`)."""
+        async with self._load_lock:
+            async with AsyncSessionLocal() as db:
+                count, checksum = (await db.execute(_FINGERPRINT_SQL)).one()
+                fingerprint = (int(count), int(checksum))
+                if not force and fingerprint == self._fingerprint:
+                    return
+                rows = await db.execute(
+                    text("SELECT old_slug, new_slug FROM catalog.slug_redirects")
+                )
+                self._map = dict(rows.tuples().all())
+            self._fingerprint = fingerprint
+        log.info("slug_redirects_loaded", redirects=len(self._map))
+
+    async def ensure_loaded(self) -> None:
+        if not self.ready:
+            await self.reload(force=True)
+
+    async def flush_hits(self) -> None:
+        """Vuelca los hits acumulados en un UPDATE; si falla se reintentan después."""
+        if not self._hits:
+            return
+        pending, self._hits = self._hits, Counter()
+        slugs = sorted(pending)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(_FLUSH_SQL, {"slugs": slugs, "hits": [pending[s] for s in slugs]})
+                await db.commit()
+        except Exception:
+            self._hits.update(pending)
+            raise
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.sleep(SYNC_SECONDS)
+                with metrics.time_job("slug_redirects_sync"):
+                    await self.flush_hits()
+                    await self.reload()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("slug_redirects_sync_error", error=str(e))
+
+    async def start(self) -> None:
+        """Carga el mapa y lanza el volcado de hits / recarga en segundo plano
+        (una por worker).
+
+        Si la base no responde al arrancar, el worker arranca igual: el primer
+        request lo carga con `ensure_loaded` y el ciclo lo reintenta.
+        """
+        if not self.ready:
+            try:
+                await self.reload(force=True)
+            except Exception as e:
+                log.warning("slug_redirects_initial_load_failed", error=str(e))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sync_loop(), name="slug-redirects-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        with contextlib.suppress(Exception):
+            await self.flush_hits()
+
+
+_redirects: RedirectMap | None = None
+
+
+def get_redirects() -> RedirectMap:
+    global _redirects
+    if _redirects is None:
+        _redirects = RedirectMap()
+    return _redirects
@@ -0,0 +1,55 @@
+"""Lectura de disponibilidad por producto desde `inventory.product_availability`.
+
+Todos los endpoints que muestran stock de producto (catálogo, búsqueda, ficha,
+feed, sitemap, portal) leen de aquí en lugar de agregar `inventory.stock` por
+request. La tabla la mantiene un trigger (migración 0028), así que esto es
+siempre un lookup por PK.
+"""
+
+from __future__ import annotations
+
+import uuid
+from collections.abc import Iterable
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.catalog import Product
+from app.models.inventory import ProductAvailability
+
+# Cantidad física total (todas las locations); 0 si el producto nunca tuvo stock
+stock_qty_col = func.coalesce(ProductAvailability.quantity, 0)
+available_col = func.coalesce(ProductAvailability.available, 0)
+
+
+def availability_join(stmt):
+    """Agrega el LEFT JOIN a la proyección sobre un select que ya incluye Product."""
+    return stmt.outerjoin(ProductAvailability, ProductAvailability.product_id == Product.id)
+
+
+def in_stock_condition():
+    """Condición `Product` con stock físico > 0 (usable en WHERE sin join)."""
+    return Product.id.in_(
+        select(ProductAvailability.product_id).where(ProductAvailability.quantity > 0)
+    )
+
+
+async def stock_quantities(
+    db: AsyncSession, product_ids: Iterable[uuid.UUID]
+) -> dict[uuid.UUID, int]:
+    """{product_id: cantidad física total}. Productos sin fila no aparecen."""
+    ids = list(product_ids)
+    if not ids:
+        return {}
+    rows = (
+        await db.execute(
+            select(ProductAvailability.product_id, ProductAvailability.quantity).where(
+                ProductAvailability.product_id.in_(ids)
+            )
+        )
+    ).all()
+    return {pid: int(qty or 0) for pid, qty in rows}
+
+
+async def stock_quantity(db: AsyncSession, product_id: uuid.UUID) -> int:
+    return (await stock_quantities(db, [product_id])).get(product_id, 0)
@@ -0,0 +1,399 @@
+"""Autocompletado de productos en memoria para /v1/search/suggest.
+
+Cada worker tiene un índice de los productos publicados:
+- prefijos de cada palabra (nombre, marca, SKU y sinónimos) → ids;
+- trigramas de cada palabra → ids, para tolerar errores de tipeo cuando
+  ningún producto coincide por prefijo.
+
+`TypeaheadIndex.suggest()` es CPU puro, no toca la base. El índice se carga
+completo al arrancar y cada `REFRESH_SECONDS`; entre medio se actualiza por
+producto con los eventos de `services.catalog_events`. La página completa de
+resultados sigue en Postgres (`GET /v1/search`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import heapq
+import re
+import time
+import unicodedata
+import uuid
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import structlog
+from sqlalchemy import select
+
+from app.db import AsyncSessionLocal
+from app.models.catalog import Brand, Product
+from app.services import catalog_events, metrics
+
+log = structlog.get_logger("typeahead")
+
+REFRESH_SECONDS = 900.0
+_MAX_PREFIX = 12
+_MIN_TRIGRAM_SCORE = 0.45
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Grupos de sinónimos: un producto que contiene cualquiera de las palabras se
+# encuentra buscando cualquier otra del grupo.
+SYNONYM_GROUPS: tuple[tuple[str, ...], ...] = (
+    ("perro", "perros", "canino", "dog", "dogs"),
+    ("gato", "gatos", "felino", "cat", "cats"),
+    ("cachorro", "puppy", "junior"),
+    ("gatito", "kitten"),
+    ("adulto", "adult"),
+    ("senior", "mayor"),
+    ("alimento", "concentrado", "comida", "food"),
+    ("snack", "premio", "galleta", "treat", "treats"),
+    ("arena", "litter"),
+    ("juguete", "toy"),
+    ("collar", "pechera", "arnes"),
+    ("antipulgas", "pulgas", "garrapatas"),
+)
+_SYNONYMS: dict[str, frozenset[str]] = {
+    word: frozenset(group) for group in SYNONYM_GROUPS for word in group
+}
+
+
+def normalize(text: str | None) -> list[str]:
+    """Palabras en minúsculas y sin tildes (mismo criterio que `catalog.f_unaccent`)."""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(plain)
+
+
+def _trigrams(token: str) -> set[str]:
+    padded = f"  {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    id: uuid.UUID
+    sku: str
+    name: str
+    slug: str
+    brand: str | None
+    price: float
+    primary_image_url: str | None
+    name_key: str
+    sku_key: str
+    terms: frozenset[str]
+    sort_key: tuple[int, str]
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        id: uuid.UUID,
+        sku: str,
+        name: str,
+        slug: str,
+        brand: str | None,
+        price: float,
+        primary_image_url: str | None,
+    ) -> Suggestion:
+        name_tokens = normalize(name)
+        sku_tokens = normalize(sku)
+        words = {*name_tokens, *normalize(brand), *sku_tokens}
+        if sku_tokens:
+            words.add("".join(sku_tokens))  # "BP-0012" también como "bp0012"
+        terms = set(words)
+        for w in words:
+            terms |= _SYNONYMS.get(w, frozenset())
+        return cls(
+            id=id,
+            sku=sku,
+            name=name,
+            slug=slug,
+            brand=brand,
+            price=price,
+            primary_image_url=primary_image_url,
+            name_key=" ".join(name_tokens),
+            sku_key="".join(sku_tokens),
+            terms=frozenset(terms),
+            sort_key=(len(name), name),
+        )
+
+    def as_dict(self) -> dict:
+        return {
+            "id": str(self.id),
+            "sku": self.sku,
+            "name": self.name,
+            "slug": self.slug,
+            "brand": self.brand,
+            "price": self.price,
+            "primary_image_url": self.primary_image_url,
+        }
+
+
+class TypeaheadIndex:
+    def __init__(self) -> None:
+        self._entries: dict[uuid.UUID, Suggestion] = {}
+        # Postings: clave → ids de producto
+        self._prefixes: dict[str, set[uuid.UUID]] = {}  # prefijos de cada palabra
+        self._words: dict[str, set[uuid.UUID]] = {}  # palabras completas
+        self._name_starts: dict[str, set[uuid.UUID]] = {}  # prefijos del nombre entero
+        self._skus: dict[str, set[uuid.UUID]] = {}
+        self._trigram_postings: dict[str, set[uuid.UUID]] = {}
+        self.loaded_at: float | None = None
+        self._task: asyncio.Task | None = None
+        self._load_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    # ── Mantención (sin awaits: cada cambio es atómico para el event loop) ──
+    def replace_all(self, entries: Iterable[Suggestion]) -> None:
+        fresh = TypeaheadIndex()
+        for e in entries:
+            fresh._add(e)
+        self._swap(fresh)
+
+    def _swap(self, fresh: TypeaheadIndex) -> None:
+        self._entries = fresh._entries
+        self._prefixes = fresh._prefixes
+        self._words = fresh._words
+        self._name_starts = fresh._name_starts
+        self._skus = fresh._skus
+        self._trigram_postings = fresh._trigram_postings
+        self.loaded_at = time.monotonic()
+
+    def upsert(self, entry: Suggestion) -> None:
+        self.remove(entry.id)
+        self._add(entry)
+
+    def _postings(self, entry: Suggestion):
+        """(diccionario, clave) de todas las postings donde aparece la entrada."""
+        for term in entry.terms:
+            for i in range(1, min(len(term), _MAX_PREFIX) + 1):
+                yield self._prefixes, term[:i]
+            yield self._words, term
+            for tri in _trigrams(term):
+                yield self._trigram_postings, tri
+        for i in range(1, min(len(entry.name_key), _MAX_PREFIX) + 1):
+            yield self._name_starts, entry.name_key[:i]
+        if entry.sku_key:
+            yield self._skus, entry.sku_key
+
+    def remove(self, product_id: uuid.UUID) -> None:
+        old = self._entries.pop(product_id, None)
+        if old is None:
+            return
+        for postings, key in self._postings(old):
+            ids = postings.get(key)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del postings[key]
+
+    def _add(self, entry: Suggestion) -> None:
+        self._entries[entry.id] = entry
+        for postings, key in self._postings(entry):
+            postings.setdefault(key, set()).add(entry.id)
+
+    # ── Consulta ─────────────────────────────────────────────
+    def _prefix_matches(self, token: str) -> set[uuid.UUID]:
+        ids = self._prefixes.get(token[:_MAX_PREFIX], set())
+        if len(token) <= _MAX_PREFIX:
+            return ids
+        return {i for i in ids if any(t.startswith(token) for t in self._entries[i].terms)}
+
+    def _fuzzy_matches(self, tokens: list[str]) -> dict[uuid.UUID, float]:
+        wanted: set[str] = set()
+        for t in tokens:
+            wanted |= _trigrams(t)
+        hits: Counter[uuid.UUID] = Counter()
+        for tri in wanted:
+            hits.update(self._trigram_postings.get(tri, ()))
+        return {
+            pid: n / len(wanted) for pid, n in hits.items() if n / len(wanted) >= _MIN_TRIGRAM_SCORE
+        }
+
+    def _rank(self, tokens: list[str], candidates: set[uuid.UUID], limit: int) -> list[Suggestion]:
+        """Top `limit` por niveles, sin puntuar cada candidato: SKU exacto,
+        nombre que empieza con la consulta, palabras completas, resto; dentro
+        de cada nivel, nombres más cortos primero."""
+        q_key = " ".join(tokens)
+        name_starts = self._name_starts.get(q_key[:_MAX_PREFIX], set())
+        if len(q_key) > _MAX_PREFIX:
+            name_starts = {i for i in name_starts if self._entries[i].name_key.startswith(q_key)}
+        whole: set[uuid.UUID] | None = None
+        for t in tokens:
+            ids = self._words.get(t, set())
+            whole = set(ids) if whole is None else whole & ids
+        tiers = (
+            self._skus.get("".join(tokens), set()),
+            name_starts,
+            whole or set(),
+            candidates,
+        )
+
+        out: list[Suggestion] = []
+        seen: set[uuid.UUID] = set()
+        for tier in tiers:
+            pool = (tier & candidates) - seen
+            if not pool:
+                continue
+            best = heapq.nsmallest(limit - len(out), pool, key=lambda i: self._entries[i].sort_key)
+            out.extend(self._entries[i] for i in best)
+            seen.update(best)
+            if len(out) >= limit:
+                break
+        return out
+
+    def suggest(self, query: str, limit: int = 8) -> list[Suggestion]:
+        tokens = normalize(query)
+        if not tokens:
+            return []
+
+        candidates: set[uuid.UUID] | None = None
+        for t in tokens:
+            ids = self._prefix_matches(t)
+            candidates = set(ids) if candidates is None else candidates & ids
+            if not candidates:
+                break
+
+        if candidates:
+            return self._rank(tokens, candidates, limit)
+
+        scores = self._fuzzy_matches(tokens)
+        ranked = sorted(scores, key=lambda i: (-scores[i], len(self._entries[i].name)))
+        return [self._entries[i] for i in ranked[:limit]]
+
+    # ── Sincronización con la base ───────────────────────────
+    @staticmethod
+    def _select():
+        return (
+            select(
+                Product.id,
+                Product.sku,
+                Product.name,
+                Product.slug,
+                Product.price,
+                Product.primary_image_url,
+                Product.is_published,
+                Product.deleted_at,
+                Brand.name.label("brand_name"),
+            )
+            .select_from(Product)
+            .outerjoin(Brand, Brand.id == Product.brand_id)
+        )
+
+    @staticmethod
+    def _entry(row) -> Suggestion:
+        return Suggestion.build(
+            id=row.id,
+            sku=row.sku,
+            name=row.name,
+            slug=row.slug,
+            brand=row.brand_name,
+            price=float(row.price or 0),
+            primary_image_url=row.primary_image_url,
+        )
+
+    @classmethod
+    def _build(cls, rows) -> TypeaheadIndex:
+        fresh = cls()
+        for r in rows:
+            fresh._add(cls._entry(r))
+        return fresh
+
+    async def load_all(self) -> None:
+        async with self._load_lock:
+            stmt = (
+                self._select()
+                .where(Product.is_published == True)  # noqa: E712
+                .where(Product.deleted_at.is_(None))
+            )
+            with metrics.time_job("typeahead_load"):
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(stmt)).all()
+                # Construcción fuera del event loop; el swap final es atómico
+                fresh = await asyncio.to_thread(self._build, rows)
+                self._swap(fresh)
+        log.info("typeahead_loaded", products=len(self))
+
+    async def refresh(self, product_ids: list[uuid.UUID]) -> None:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(self._select().where(Product.id.in_(product_ids)))).all()
+        found = set()
+        for r in rows:
+            found.add(r.id)
+            if r.is_published and r.deleted_at is None:
+                self.upsert(self._entry(r))
+            else:
+                self.remove(r.id)
+        for pid in set(product_ids) - found:
+            self.remove(pid)
+
+    async def ensure_loaded(self) -> None:
+        if not self.ready:
+            await self.load_all()
+
+    async def _sync_loop(self) -> None:
+        pubsub = None
+        next_full = 0.0
+        while True:
+            try:
+                if pubsub is None:
+                    with contextlib.suppress(Exception):
+                        pubsub = await catalog_events.subscribe()
+                        # (Re)conectado: recarga completa para no perder eventos
+                        next_full = 0.0
+                if time.monotonic() >= next_full:
+                    await self.load_all()
+                    next_full = time.monotonic() + REFRESH_SECONDS
+                if pubsub is None:
+                    await asyncio.sleep(5)
+                    continue
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if msg is None:
+                    continue
+                ids = catalog_events.parse_event(msg["data"])
+                if ids is None:
+                    await self.load_all()
+                    next_full = time.monotonic() + REFRESH_SECONDS
+                elif ids:
+                    await self.refresh(ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("typeahead_sync_error", error=str(e))
+                if pubsub is not None:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()
+                    pubsub = None
+                await asyncio.sleep(5)
+
+    def start(self) -> None:
+        """Lanza la sincronización en segundo plano (una por worker)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sync_loop(), name="typeahead-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+_index: TypeaheadIndex | None = None
+
+
+def get_typeahead() -> TypeaheadIndex:
+    global _index
+    if _index is None:
+        _index = TypeaheadIndex()
+    return _index
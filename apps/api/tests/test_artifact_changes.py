@@ -0,0 +1,67 @@
+"""Triggers de la cola de artefactos (requiere el Postgres de test).
+
+Se saltea si `DATABASE_URL` no responde; todo corre en una transacción que se
+deshace al final.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+# (UPDATE sin filas, artefactos de sitemap que debe encolar). Los triggers de
+# sentencia con `UPDATE OF` disparan aunque el WHERE no toque filas
+SITEMAP_CHANGES = [
+    ("UPDATE catalog.categories SET slug = slug WHERE false", {"sitemap_categories"}),
+    ("UPDATE catalog.categories SET sort_order = sort_order WHERE false", set()),
+    ("UPDATE catalog.products SET is_published = is_published WHERE false", {"sitemap_products"}),
+    ("UPDATE content.blog_posts SET published_at = published_at WHERE false", {"sitemap_posts"}),
+    ("UPDATE content.seo_landings SET is_active = is_active WHERE false", {"sitemap_landings"}),
+]
+
+
+@pytest.mark.integration
+def test_sitemap_change_feed() -> None:
+    """Cada tipo de sitemap encola solo su artefacto y solo por columnas publicadas."""
+    import asyncio
+
+    from app.db import engine
+    from sqlalchemy import text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    async def run() -> list[tuple[str, set[str], set[str]]]:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, SQLAlchemyError):
+            pytest.skip("Postgres de test no disponible")
+
+        results = []
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                for sql, expected in SITEMAP_CHANGES:
+                    last = (
+                        await conn.execute(
+                            text("SELECT COALESCE(max(id), 0) FROM catalog.artifact_changes")
+                        )
+                    ).scalar_one()
+                    await conn.execute(text(sql))
+                    queued = set(
+                        (
+                            await conn.execute(
+                                text(
+                                    "SELECT artifact FROM catalog.artifact_changes "
+                                    "WHERE id > :last AND artifact LIKE 'sitemap_%'"
+                                ),
+                                {"last": last},
+                            )
+                        ).scalars()
+                    )
+                    results.append((sql, expected, queued))
+            finally:
+                await trans.rollback()
+        await engine.dispose()
+        return results
+
+    for sql, expected, queued in asyncio.run(run()):
+        assert queued == expected, f"{sql}: encoló {queued or 'nada'}"
@@ -0,0 +1,54 @@
+"""Presupuesto de statements SQL por endpoint (requiere el Postgres de test).
+
+Se saltea si `DATABASE_URL` no responde; en CI corre contra `bp_test` migrada.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+# Statements por request: (path, máximo). Cada uno se pide con 1 y 50 filas por
+# página; si el conteo cambia con el tamaño de página hay un N+1
+STATEMENT_BUDGETS = [
+    ("/v1/products?per_page={n}", 4),
+    ("/v1/products/catalog?page_size={n}", 4),
+    ("/v1/search?q=perro&limit={n}", 2),
+]
+
+
+@pytest.mark.integration
+def test_statement_budgets() -> None:
+    """Presupuesto de queries de los endpoints de catálogo (requiere Postgres de test)."""
+    import asyncio
+
+    import httpx
+    from app.db import engine
+    from app.main import app
+    from app.services.query_stats import track_queries
+    from sqlalchemy import text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    async def run() -> list[tuple[str, int, int, int]]:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, SQLAlchemyError):
+            pytest.skip("Postgres de test no disponible")
+
+        results = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path, budget in STATEMENT_BUDGETS:
+                counts = []
+                for n in (1, 50):
+                    with track_queries() as stats:
+                        resp = await client.get(path.format(n=n))
+                    assert resp.status_code == 200, (path, resp.text)
+                    counts.append(stats.statements)
+                results.append((path, budget, *counts))
+        await engine.dispose()
+        return results
+
+    for path, budget, small, large in asyncio.run(run()):
+        assert large <= budget, f"{path}: {large} statements (presupuesto {budget})"
+        assert small == large, f"{path}: {small} vs {large} statements según tamaño de página"
@@ -50,3 +50,740 @@ def test_app_starts() -> None:
     assert "/v1/auth/login" in routes
     assert "/v1/products" in routes
     assert "/v1/sales/orders" in routes
+
+
+def test_keyset_cursor_roundtrip() -> None:
+    import uuid
+    from datetime import UTC, datetime
+
+    import pytest
+    from app.services.keyset import InvalidCursorError, decode_cursor, encode_cursor
+
+    key = (datetime(2026, 1, 2, 3, 4, 5, tzinfo=UTC), uuid.uuid4())
+    token = encode_cursor("orders", key, {"total": 42})
+    assert decode_cursor(token, "orders") == (key, {"total": 42})
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, "products")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("no-es-un-cursor", "orders")
+
+
+def test_response_cache_l1_and_invalidation() -> None:
+    import asyncio
+
+    from app.services.response_cache import CACHE_STATS, cached, invalidate
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    calls = []
+    app = FastAPI()
+
+    @app.get("/x")
+    @cached("test:x", ttl=60, tags=("test",))
+    async def endpoint(n: int = 1) -> dict:
+        calls.append(n)
+        return {"n": n, "calls": len(calls)}
+
+    client = TestClient(app)
+    assert client.get("/x?n=1").json() == {"n": 1, "calls": 1}
+    assert client.get("/x?n=1").json() == {"n": 1, "calls": 1}
+    assert client.get("/x?n=2").json() == {"n": 2, "calls": 2}
+    asyncio.run(invalidate("test"))
+    assert client.get("/x?n=1").json() == {"n": 1, "calls": 3}
+    assert CACHE_STATS[("test:x", "l1_hit")] == 1
+
+
+def test_response_cache_scopes_by_caller() -> None:
+    import asyncio
+    import uuid
+
+    import pytest
+    from app.deps import CurrentUser
+    from app.models.auth import User
+    from app.services.response_cache import cached
+
+    calls = []
+
+    async def endpoint(user, n: int = 1) -> dict:
+        calls.append(user.email)
+        return {"email": user.email}
+
+    # Con `from __future__ import annotations` un nombre local no se resuelve
+    endpoint.__annotations__["user"] = CurrentUser
+
+    with pytest.raises(TypeError, match="per_user"):
+        cached("test:shared", ttl=60)(endpoint)
+
+    mine = cached("test:mine", ttl=60, per_user=True)(endpoint)
+    a = User(id=uuid.uuid4(), email="a@bp.co")
+    b = User(id=uuid.uuid4(), email="b@bp.co")
+    assert asyncio.run(mine(user=a)) == {"email": "a@bp.co"}
+    assert asyncio.run(mine(user=b)) == {"email": "b@bp.co"}
+    assert asyncio.run(mine(user=a)) == {"email": "a@bp.co"}
+    assert calls == ["a@bp.co", "b@bp.co"]
+
+
+def test_typeahead_prefix_synonyms_and_typos() -> None:
+    import uuid
+
+    from app.services.typeahead import Suggestion, TypeaheadIndex
+
+    def entry(name: str, sku: str, brand: str | None = None) -> Suggestion:
+        return Suggestion.build(
+            id=uuid.uuid4(),
+            sku=sku,
+            name=name,
+            slug=sku.lower(),
+            brand=brand,
+            price=1000.0,
+            primary_image_url=None,
+        )
+
+    puppy = entry("Pro Plan Puppy Razas Pequeñas 3kg", "PP-0031", "Purina")
+    cat = entry("Whiskas Gatito Pollo 1kg", "WH-0100")
+    index = TypeaheadIndex()
+    index.replace_all([puppy, cat])
+
+    assert index.suggest("pro pla")[0].id == puppy.id
+    assert index.suggest("pequenas")[0].id == puppy.id  # sin tilde
+    assert index.suggest("cachorro")[0].id == puppy.id  # sinónimo
+    assert index.suggest("pp0031")[0].id == puppy.id  # SKU compacto
+    assert index.suggest("whiskaz")[0].id == cat.id  # typo → trigramas
+
+    index.remove(cat.id)
+    assert index.suggest("whiskas") == []
+    index.upsert(entry("Whiskas Adulto", "WH-0100"))
+    assert index.suggest("whis")[0].name == "Whiskas Adulto"
+
+
+def test_http_cache_conditional_get() -> None:
+    from datetime import UTC, datetime
+
+    from app.services.http_cache import http_date, is_not_modified
+    from starlette.requests import Request
+
+    def request(**headers: str) -> Request:
+        raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+        return Request({"type": "http", "method": "GET", "headers": raw})
+
+    built = datetime(2026, 10, 17, 12, 30, 5, 123456, tzinfo=UTC)
+    assert is_not_modified(request(if_none_match='W/"a1", "b2"'), '"b2"', built)
+    assert not is_not_modified(request(if_none_match='"zz"'), '"b2"', built)
+    # If-None-Match manda aunque If-Modified-Since diga que no cambió
+    assert not is_not_modified(
+        request(if_none_match='"zz"', if_modified_since=http_date(built)), '"b2"', built
+    )
+    assert is_not_modified(request(if_modified_since=http_date(built)), '"b2"', built)
+    assert not is_not_modified(
+        request(if_modified_since="Fri, 16 Oct 2026 00:00:00 GMT"), None, built
+    )
+
+
+def test_conditional_etag_skips_handler() -> None:
+    from app.services.http_cache import cache_control, conditional
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    state = {"version": 1, "calls": 0}
+
+    async def version(**_) -> int:
+        return state["version"]
+
+    app = FastAPI()
+
+    @app.get("/items")
+    @conditional(version, cache_control=cache_control(60, stale_while_revalidate=600))
+    async def items(page: int = 1) -> dict:
+        state["calls"] += 1
+        return {"page": page}
+
+    client = TestClient(app)
+    first = client.get("/items?page=2")
+    etag = first.headers["etag"]
+    assert first.json() == {"page": 2}
+    assert first.headers["cache-control"] == "public, max-age=60, stale-while-revalidate=600"
+
+    again = client.get("/items?page=2", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    assert state["calls"] == 1  # el 304 no ejecutó el handler
+
+    assert client.get("/items?page=3", headers={"If-None-Match": etag}).status_code == 200
+    state["version"] = 2
+    assert client.get("/items?page=2", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_metrics_exposition(monkeypatch) -> None:
+    import pytest
+    from app.config import get_settings
+    from app.main import app
+    from app.services import metrics
+    from fastapi.testclient import TestClient
+
+    hist = metrics.Histogram("bp_test_seconds", "Test.", ("job",), buckets=(0.1, 1.0))
+    counter = metrics.Counter("bp_test_events_total", "Test.", ("job",))
+    try:
+        hist.observe(0.05, "a")
+        hist.observe(0.5, "a")
+        hist.observe(3.0, "a")
+        counter.inc("a")
+        text = metrics.render({"1": metrics.snapshot()})
+    finally:
+        metrics._REGISTRY.remove(hist)
+        metrics._REGISTRY.remove(counter)
+    assert 'bp_test_seconds_bucket{worker="1",job="a",le="0.1"} 1' in text
+    assert 'bp_test_seconds_bucket{worker="1",job="a",le="1"} 2' in text
+    assert 'bp_test_seconds_bucket{worker="1",job="a",le="+Inf"} 3' in text
+    assert 'bp_test_seconds_sum{worker="1",job="a"} 3.55' in text
+    assert "# TYPE bp_test_events_total counter" in text
+    assert 'bp_test_events_total{worker="1",job="a"} 1' in text
+    assert "# TYPE bp_db_pool_size gauge" in text
+    assert "bp_test" not in metrics.render({"1": metrics.snapshot()})
+    with pytest.raises(ValueError):
+        metrics.Counter("bp_test_events", "Sin _total.")
+
+    client = TestClient(app)
+    client.get("/health")
+    # Sin token configurado, /metrics no queda público
+    monkeypatch.setattr(get_settings(), "metrics_token", "")
+    assert client.get("/metrics").status_code == 403
+    monkeypatch.setattr(get_settings(), "metrics_token", "secreto")
+    assert client.get("/metrics").status_code == 403
+    resp = client.get("/metrics", headers={"Authorization": "Bearer secreto"})
+    assert resp.status_code == 200
+    assert 'route="/health",status="200"' in resp.text
+
+
+def _sitemap_rows(*rows):
+    """Sesión falsa: `stream()` devuelve las filas (slug, lastmod, priority)."""
+
+    class FakeDb:
+        async def stream(self, _stmt):
+            async def gen():
+                for row in rows:
+                    yield row
+
+            return gen()
+
+    return FakeDb()
+
+
+def test_sitemap_shards_boundaries_and_lastmod(monkeypatch, tmp_path) -> None:
+    import asyncio
+    import xml.etree.ElementTree as ET
+    from datetime import UTC, datetime
+
+    from app.services import sitemaps
+    from app.services.artifacts import ArtifactWriter
+
+    monkeypatch.setattr(sitemaps, "MAX_URLS_PER_SHARD", 2)
+    source = sitemaps.SOURCES_BY_KIND["posts"]
+    ns = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+
+    def build(name: str, *rows) -> ArtifactWriter:
+        writer = ArtifactWriter(tmp_path / name)
+        asyncio.run(source.build(_sitemap_rows(*rows), writer))
+        return writer
+
+    d1 = datetime(2026, 1, 1, 10, 0, 0, 500, tzinfo=UTC)
+    d2 = datetime(2026, 2, 1, 10, 0, 0)  # naive: se toma como UTC
+    d3 = datetime(2026, 3, 1, 10, 0, 0, tzinfo=UTC)
+    rows = [("a", d2, 0.6), ("b", d1, 0.6), ("c", None, 0.6), ("d", d3, 0.6), ("e", None, 0.6)]
+    writer = build("gen1", *rows)
+
+    assert [(f.name, f.items) for f in writer.files] == [
+        ("posts-1.xml", 2),
+        ("posts-2.xml", 2),
+        ("posts-3.xml", 1),
+    ]
+    # lastmod del shard = el mayor de sus filas; sin fechas, None
+    assert [f.lastmod for f in writer.files] == [d2.replace(tzinfo=UTC), d3, None]
+
+    urls = ET.parse(writer.path("posts-1.xml")).getroot().findall("s:url", ns)
+    assert [u.findtext("s:loc", namespaces=ns) for u in urls] == [
+        "https://bigotesypaticas.com/blog/a",
+        "https://bigotesypaticas.com/blog/b",
+    ]
+    assert urls[1].findtext("s:lastmod", namespaces=ns) == "2026-01-01T10:00:00+00:00"
+    assert urls[0].findtext("s:priority", namespaces=ns) == "0.6"
+    assert ET.parse(writer.path("posts-2.xml")).getroot()[0].find("s:lastmod", ns) is None
+
+    # Justo en el límite no queda un shard vacío de más; sin filas, uno vacío
+    assert [f.items for f in build("gen2", *rows[:2]).files] == [2]
+    assert [f.items for f in build("gen3").files] == [0]
+
+    # Un cambio dentro de un shard deja idénticos (ETag y lastmod) a los demás
+    changed = build("gen4", *rows[:3], ("d2", d3, 0.6), rows[4])
+    assert changed.files[0] == writer.files[0]
+    assert changed.files[1].etag != writer.files[1].etag
+    assert changed.files[2] == writer.files[2]
+
+
+def test_sitemap_index(monkeypatch) -> None:
+    import io
+    import xml.etree.ElementTree as ET
+    from datetime import UTC, datetime
+
+    from app.api.v1 import seo
+    from app.main import app
+    from app.services import sitemaps
+    from app.services.artifacts import ArtifactFile, Manifest
+    from fastapi.testclient import TestClient
+
+    ns = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+    generated = datetime(2026, 10, 17, 12, 0, tzinfo=UTC)
+    shard_lastmod = datetime(2026, 10, 1, 8, 0, tzinfo=UTC)
+
+    def manifest(source, *files: ArtifactFile) -> Manifest:
+        return Manifest(source.artifact, "g1", generated, files)
+
+    manifests = {
+        s.artifact: manifest(s, ArtifactFile(s.shard_name(1), f'"{s.kind}"', 10, 0))
+        for s in sitemaps.SOURCES
+    }
+    manifests["sitemap_products"] = manifest(
+        sitemaps.SOURCES_BY_KIND["products"],
+        ArtifactFile("products-1.xml", '"p1"', 10, 2, shard_lastmod),
+        ArtifactFile("products-2.xml", '"p2"', 10, 1),
+    )
+
+    class FakeStore:
+        async def ensure(self, name: str) -> Manifest | None:
+            return manifests.get(name)
+
+    monkeypatch.setattr(seo, "get_artifacts", lambda: FakeStore())
+    client = TestClient(app)
+    resp = client.get("/v1/seo/sitemap.xml")
+    assert resp.status_code == 200
+    entries = [
+        (s.findtext("s:loc", namespaces=ns), s.findtext("s:lastmod", namespaces=ns))
+        for s in ET.fromstring(resp.content).findall("s:sitemap", ns)
+    ]
+    # Todo en el host del storefront (no el de la API): primero sus páginas
+    # fijas; los shards vacíos no se listan; sin lastmod propio va la generación
+    assert entries == [
+        ("https://bigotesypaticas.com/sitemap-pages.xml", None),
+        ("https://bigotesypaticas.com/sitemaps/products-1.xml", "2026-10-01T08:00:00+00:00"),
+        ("https://bigotesypaticas.com/sitemaps/products-2.xml", "2026-10-17T12:00:00+00:00"),
+    ]
+    etag = resp.headers["etag"]
+    assert etag == sitemaps.index_etag(manifests[s.artifact] for s in sitemaps.SOURCES)
+    assert client.get("/v1/seo/sitemap.xml", headers={"If-None-Match": etag}).status_code == 304
+
+    # El ETag del índice cambia solo si cambia algún shard
+    before = sitemaps.index_etag(manifests.values())
+    manifests["sitemap_posts"] = Manifest("sitemap_posts", "g2", generated, ())
+    assert sitemaps.index_etag(manifests.values()) != before
+
+    manifests.pop("sitemap_landings")
+    assert client.get("/v1/seo/sitemap.xml").status_code == 503
+
+    buf = io.BytesIO()
+    sitemaps.render_index([("https://x/a.xml", None)], buf)
+    assert b"<sitemap><loc>https://x/a.xml</loc></sitemap>" in buf.getvalue()
+
+
+def _feed_row(n: int, stock: int = 3, price: float = 25000) -> dict:
+    return {
+        "id": f"id-{n}",
+        "sku": f"SKU-{n}",
+        "name": f"Producto {n}",
+        "description": "Desc",
+        "price": price,
+        "primary_image_url": f"https://img/{n}.jpg",
+        "image_url_transparent": None,
+        "slug": f"producto-{n}",
+        "brand_name": None,
+        "category_name": "ARENA",
+        "stock_qty": stock,
+    }
+
+
+class _FakeFeedDb:
+    """Sesión falsa para `artifacts.refresh` + `build_products_feed`.
+
+    `rows` son los productos del feed, `pending` la cola de `artifact_changes`
+    y `locked` simula que otro worker tiene el advisory lock.
+    """
+
+    def __init__(self) -> None:
+        self.rows: list[dict] = []
+        self.pending: list[int] = []
+        self.locked = False
+        self.streams = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def execute(self, stmt, params=None):
+        from unittest.mock import Mock
+
+        sql = str(stmt)
+        if "pg_try_advisory_xact_lock" in sql:
+            return Mock(scalar_one=Mock(return_value=not self.locked))
+        if sql.lstrip().startswith("SELECT id FROM catalog.artifact_changes"):
+            return Mock(scalars=Mock(return_value=list(self.pending)))
+        if sql.lstrip().startswith("DELETE FROM catalog.artifact_changes"):
+            self.pending = [i for i in self.pending if i not in params["ids"]]
+            return Mock()
+        raise AssertionError(sql)
+
+    async def stream(self, _stmt):
+        self.streams += 1
+        rows = list(self.rows)
+
+        class Result:
+            async def mappings(self):
+                for row in rows:
+                    yield row
+
+        return Result()
+
+    async def commit(self) -> None:
+        return None
+
+
+def test_catalog_feed_pages(monkeypatch, tmp_path) -> None:
+    import asyncio
+    import xml.etree.ElementTree as ET
+
+    from app.config import get_settings
+    from app.services import catalog_feed
+
+    monkeypatch.setattr(get_settings(), "catalog_feed_page_size", 2)
+    db = _FakeFeedDb()
+    db.rows = [_feed_row(1), _feed_row(2, stock=0, price=120000), _feed_row(3)]
+    writer = asyncio.run(_build_feed(db, tmp_path / "gen"))
+
+    assert [(f.name, f.items) for f in writer.files] == [
+        ("products-1.xml", 2),
+        ("products-2.xml", 1),
+    ]
+    g = "{http://base.google.com/ns/1.0}"
+    items = ET.parse(writer.path("products-1.xml")).getroot().findall("channel/item")
+    assert [i.findtext(f"{g}id") for i in items] == ["SKU-1", "SKU-2"]
+    assert items[0].findtext(f"{g}availability") == "in stock"
+    assert items[1].findtext(f"{g}availability") == "out of stock"
+    assert items[1].findtext(f"{g}price") == "120000.00 COP"
+    assert items[1].findtext(f"{g}custom_label_3") == "mas-100k"
+    assert items[0].findtext(f"{g}link") == f"{catalog_feed.STORE_URL}/producto/producto-1"
+
+    # Justo en el límite no queda una página vacía de más; sin productos, una vacía
+    db.rows = db.rows[:2]
+    assert [f.items for f in asyncio.run(_build_feed(db, tmp_path / "gen2")).files] == [2]
+    db.rows = []
+    assert [f.items for f in asyncio.run(_build_feed(db, tmp_path / "gen3")).files] == [0]
+
+
+async def _build_feed(db, directory):
+    from app.services import catalog_feed
+    from app.services.artifacts import ArtifactWriter
+
+    writer = ArtifactWriter(directory)
+    await catalog_feed.build_products_feed(db, writer)
+    return writer
+
+
+def test_artifact_store_refresh_and_cleanup(monkeypatch, tmp_path) -> None:
+    import asyncio
+
+    import pytest
+    from app.api.v1 import catalog_feed as feed_api
+    from app.config import get_settings
+    from app.main import app
+    from app.services import artifacts, catalog_feed
+    from fastapi.testclient import TestClient
+
+    db = _FakeFeedDb()
+    db.rows = [_feed_row(1), _feed_row(2), _feed_row(3)]
+    monkeypatch.setattr(artifacts, "AsyncSessionLocal", db)
+    monkeypatch.setattr(get_settings(), "artifacts_path", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "catalog_feed_page_size", 2)
+    store = artifacts.ArtifactStore()
+    store.register(catalog_feed.ARTIFACT, catalog_feed.build_products_feed)
+    monkeypatch.setattr(feed_api, "get_artifacts", lambda: store)
+    base = tmp_path / catalog_feed.ARTIFACT
+
+    def generations() -> list[str]:
+        return sorted(d.name for d in base.iterdir() if d.is_dir())
+
+    # Primera generación: el request la dispara (ensure) y escribe el manifest
+    client = TestClient(app)
+    first = client.get("/v1/catalog/products.xml")
+    assert first.status_code == 200
+    assert 'rel="next"' in first.headers["link"]
+    assert b"SKU-1" in first.content
+    manifest = store.manifest(catalog_feed.ARTIFACT)
+    assert [(f.name, f.items) for f in manifest.files] == [
+        ("products-1.xml", 2),
+        ("products-2.xml", 1),
+    ]
+    assert (base / "manifest.json").exists() and generations() == [manifest.generation]
+    last = client.get("/v1/catalog/products.xml?page=2")
+    assert last.status_code == 200 and "link" not in last.headers
+    assert client.get("/v1/catalog/products.xml?page=3").status_code == 404
+    etag = first.headers["etag"]
+    assert (
+        client.get("/v1/catalog/products.xml", headers={"If-None-Match": etag}).status_code == 304
+    )
+
+    # Sin cambios pendientes no se regenera ni se lee la base
+    assert asyncio.run(store.refresh(catalog_feed.ARTIFACT)) is False
+    assert db.streams == 1
+
+    # Un cambio encolado regenera, publica otro manifest y consume la cola
+    db.rows[0] = _feed_row(1, price=99000)
+    db.pending = [7, 8]
+    assert asyncio.run(store.refresh(catalog_feed.ARTIFACT)) is True
+    assert db.pending == [] and db.streams == 2
+    changed = client.get("/v1/catalog/products.xml", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert b"99000.00 COP" in changed.content
+    # La página que no cambió conserva su ETag
+    assert client.get("/v1/catalog/products.xml?page=2").headers["etag"] == last.headers["etag"]
+
+    # Se conservan solo la generación publicada y la anterior
+    for _ in range(3):
+        db.pending = [9]
+        assert asyncio.run(store.refresh(catalog_feed.ARTIFACT)) is True
+    current = store.manifest(catalog_feed.ARTIFACT)
+    assert len(generations()) == 2 and generations()[-1] == current.generation
+
+    # Con el lock tomado por otro worker no se hace nada
+    db.pending, db.locked = [10], True
+    assert asyncio.run(store.refresh(catalog_feed.ARTIFACT)) is False
+    assert db.pending == [10]
+    db.locked = False
+
+    # Un builder que falla no deja su directorio ni toca el manifest publicado
+    async def broken(_db, writer) -> None:
+        writer.path("products-1.xml").write_bytes(b"<rss>")
+        raise RuntimeError("boom")
+
+    store.register(catalog_feed.ARTIFACT, broken)
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.refresh(catalog_feed.ARTIFACT))
+    assert store.manifest(catalog_feed.ARTIFACT) == current
+    assert len(generations()) == 2 and db.pending == [10]
+
+
+def test_stock_delta_upsert_negative_delta() -> None:
+    import uuid
+
+    from app.api.v1.inventory import BatchAdjustmentItem, _stock_delta_upsert
+    from sqlalchemy.dialects import postgresql
+
+    loc, p1, p2 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    stmt = _stock_delta_upsert(
+        loc,
+        [
+            BatchAdjustmentItem(product_id=p1, quantity_delta=-3),
+            BatchAdjustmentItem(product_id=p2, quantity_delta=5),
+        ],
+    )
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    params = compiled.params
+    # La fila propuesta nunca es negativa (el CHECK se evalúa antes del ON CONFLICT)
+    inserted = {params[f"product_id_m{i}"]: params[f"quantity_m{i}"] for i in range(2)}
+    assert inserted == {p1: 0, p2: 5}
+    # El delta real va en el DO UPDATE
+    sql = str(compiled)
+    assert "ON CONFLICT ON CONSTRAINT uq_stock_product_location DO UPDATE" in sql
+    assert "quantity = (inventory.stock.quantity + CASE inventory.stock.product_id" in sql
+    assert {-3, 5} <= set(params.values())
+
+
+class _FakeRedirectDb:
+    """Sesión falsa para `RedirectMap`: tabla de redirecciones en memoria."""
+
+    def __init__(self, redirects: dict[str, str]) -> None:
+        self.redirects = dict(redirects)
+        self.loads = 0
+        self.flushes: list[dict[str, int]] = []
+        self.fail_flush = False
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def execute(self, stmt, params=None):
+        from unittest.mock import Mock
+
+        sql = str(stmt)
+        if "COUNT(*)" in sql:
+            pairs = sorted(self.redirects.items())
+            return Mock(one=Mock(return_value=(len(pairs), hash(tuple(pairs)))))
+        if sql.lstrip().startswith("SELECT old_slug, new_slug"):
+            self.loads += 1
+            rows = list(self.redirects.items())
+            return Mock(tuples=Mock(return_value=Mock(all=Mock(return_value=rows))))
+        if "UPDATE catalog.slug_redirects" in sql:
+            if self.fail_flush:
+                raise ConnectionError("db caída")
+            self.flushes.append(dict(zip(params["slugs"], params["hits"], strict=True)))
+            return Mock()
+        raise AssertionError(sql)
+
+    async def commit(self) -> None:
+        return None
+
+
+def test_slug_redirects_lookup_flush_and_reload(monkeypatch) -> None:
+    import asyncio
+
+    import pytest
+    from app.services import slug_redirects
+
+    db = _FakeRedirectDb({"old-a": "new-a", "old-b": "new-b"})
+    monkeypatch.setattr(slug_redirects, "AsyncSessionLocal", db)
+    monkeypatch.setattr(slug_redirects, "SYNC_SECONDS", 3600)
+
+    async def run() -> None:
+        redirects = slug_redirects.RedirectMap()
+        # start() deja el mapa cargado antes del primer request
+        await redirects.start()
+        try:
+            assert redirects.ready and db.loads == 1
+
+            assert redirects.lookup("old-a") == "new-a"
+            assert redirects.lookup("old-a") == "new-a"
+            assert redirects.lookup("old-b") == "new-b"
+            assert redirects.lookup("nada") is None
+
+            # Los hits se acumulan y se vuelcan en un solo UPDATE, ordenados
+            await redirects.flush_hits()
+            assert db.flushes == [{"old-a": 2, "old-b": 1}]
+            await redirects.flush_hits()
+            assert len(db.flushes) == 1  # sin hits no hay UPDATE
+
+            # Si el UPDATE falla, los hits vuelven a la cola junto con los nuevos
+            redirects.lookup("old-a")
+            db.fail_flush = True
+            with pytest.raises(ConnectionError):
+                await redirects.flush_hits()
+            redirects.lookup("old-a")
+            db.fail_flush = False
+            await redirects.flush_hits()
+            assert db.flushes[-1] == {"old-a": 2}
+
+            # Sin cambios en la tabla no se relee; si cambia la huella, sí
+            await redirects.reload()
+            assert db.loads == 1
+            db.redirects["old-c"] = "new-c"
+            await redirects.reload()
+            assert db.loads == 2 and redirects.lookup("old-c") == "new-c"
+            db.redirects["old-c"] = "otro"
+            await redirects.reload()
+            assert redirects.lookup("old-c") == "otro"
+        finally:
+            # stop() vuelca los hits pendientes
+            await redirects.stop()
+        assert db.flushes[-1] == {"old-c": 2}
+
+    asyncio.run(run())
+
+
+def test_metrics_workers_keyed_by_host_and_pid() -> None:
+    import asyncio
+    import os
+    import socket
+
+    import orjson
+    from app.services import metrics
+
+    publisher = metrics.MetricsPublisher()
+    assert publisher.worker == f"{socket.gethostname()}:{os.getpid()}"
+
+    # Otro contenedor con el mismo pid (los de gunicorn arrancan en pids bajos)
+    other = f"otro-host:{os.getpid()}"
+    store = {
+        f"metrics:worker:{publisher.worker}".encode(): orjson.dumps({}),
+        f"metrics:worker:{other}".encode(): orjson.dumps({"bp_x": {}}),
+    }
+
+    class FakeRedis:
+        async def scan_iter(self, match: str, count: int):
+            for key in store:
+                yield key
+
+        async def mget(self, keys):
+            return [store[k] for k in keys]
+
+    publisher._redis = FakeRedis()
+    workers = asyncio.run(publisher.collect())
+    assert set(workers) == {publisher.worker, other}
+    assert workers[other] == {"bp_x": {}}
+
+
+def test_server_timing_and_slow_query_log(monkeypatch) -> None:
+    import re
+    from types import SimpleNamespace
+
+    from app.config import get_settings
+    from app.middleware import RequestIDMiddleware
+    from app.services import metrics, query_stats
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    # Engine falso: el endpoint dispara los listeners como lo haría el cursor,
+    # con un reloj que da 10 ms, 10 ms y 80 ms por statement
+    clock = iter([0.0, 0.010, 1.0, 1.010, 2.0, 2.080])
+    monkeypatch.setattr(query_stats, "time", SimpleNamespace(perf_counter=lambda: next(clock)))
+    warnings: list[dict] = []
+    monkeypatch.setattr(
+        query_stats,
+        "log",
+        SimpleNamespace(warning=lambda event, **kw: warnings.append({"event": event, **kw})),
+    )
+    monkeypatch.setattr(get_settings(), "slow_query_ms", 50)
+
+    def run_statement(sql: str) -> None:
+        conn = SimpleNamespace(info={})
+        query_stats._start_statement(conn, None, sql, None, None, False)
+        query_stats._end_statement(conn, None, sql, None, None, False)
+
+    app = FastAPI()
+    app.add_middleware(RequestIDMiddleware)
+
+    @app.get("/q")
+    async def q() -> dict:
+        run_statement("SELECT 1")
+        run_statement("SELECT 2")
+        run_statement("SELECT   *\n  FROM catalog.products")
+        return {}
+
+    def db_statements() -> float:
+        return metrics.HTTP_DB_STATEMENTS._values.get(("GET", "/q"), 0.0)
+
+    before = db_statements()
+    resp = TestClient(app).get("/q", headers={"X-Request-ID": "req-1"})
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    assert re.fullmatch(r'db;dur=100\.0;desc="3 queries", app;dur=\d+\.\d', timing), timing
+    assert db_statements() - before == 3
+
+    # Solo el statement de 80 ms supera el umbral; el SQL va compactado
+    assert warnings == [
+        {
+            "event": "slow_query",
+            "request_id": "req-1",
+            "duration_ms": 80.0,
+            "executemany": False,
+            "sql": "SELECT * FROM catalog.products",
+        }
+    ]
+    # Con el umbral en 0 no se loguea nada
+    monkeypatch.setattr(get_settings(), "slow_query_ms", 0)
+    clock = iter([0.0, 5.0])
+    run_statement("SELECT pg_sleep(5)")
+    assert len(warnings) == 1
@@ -0,0 +1,62 @@
+"""UPSERT de ajustes de stock contra filas existentes (requiere el Postgres de test).
+
+Se saltea si `DATABASE_URL` no responde o no hay stock cargado; todo corre en
+una transacción que se deshace al final.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+
+@pytest.mark.integration
+def test_negative_delta_on_existing_row() -> None:
+    """Un delta negativo que la fila absorbe se aplica; uno que la deja bajo cero falla
+    en el CHECK (que el endpoint traduce a 409)."""
+    import asyncio
+
+    from app.api.v1.inventory import BatchAdjustmentItem, _stock_delta_upsert
+    from app.db import engine
+    from sqlalchemy import text
+    from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+    async def run() -> tuple[int, int, str]:
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except (OSError, SQLAlchemyError):
+            pytest.skip("Postgres de test no disponible")
+
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            try:
+                row = (
+                    await conn.execute(
+                        text(
+                            "SELECT product_id, location_id, quantity FROM inventory.stock "
+                            "WHERE quantity > 0 LIMIT 1"
+                        )
+                    )
+                ).first()
+                if row is None:
+                    pytest.skip("Sin filas de stock en la base de test")
+                product_id, location_id, before = row
+
+                item = BatchAdjustmentItem(product_id=product_id, quantity_delta=-1)
+                after = dict((await conn.execute(_stock_delta_upsert(location_id, [item]))).all())
+
+                error = ""
+                item = BatchAdjustmentItem(product_id=product_id, quantity_delta=-(before + 1))
+                try:
+                    async with conn.begin_nested():
+                        await conn.execute(_stock_delta_upsert(location_id, [item]))
+                except IntegrityError as e:
+                    error = str(e.orig)
+            finally:
+                await trans.rollback()
+        await engine.dispose()
+        return before, after[product_id], error
+
+    before, after, error = asyncio.run(run())
+    assert after == before - 1
+    assert "quantity_non_negative" in error
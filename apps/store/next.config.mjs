@@ -35,7 +35,14 @@ const nextConfig = {
   },
   async rewrites() {
     const api = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:8000';
-    return [{ source: '/api/v1/:path*', destination: `${api}/v1/:path*` }];
+    return [
+      { source: '/api/v1/:path*', destination: `${api}/v1/:path*` },
+      // Sitemaps precalculados por la API, publicados en este host (los crawlers
+      // rechazan sitemaps hijos en otro dominio). Las páginas fijas las sirve
+      // app/sitemap-pages.xml
+      { source: '/sitemap.xml', destination: `${api}/v1/seo/sitemap.xml` },
+      { source: '/sitemaps/:name', destination: `${api}/v1/seo/sitemaps/:name` },
+    ];
   },
 };
 export default nextConfig;
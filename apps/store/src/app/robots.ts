@@ -13,6 +13,7 @@ export default function robots(): MetadataRoute.Robots {
         disallow: '/',
       },
     ],
+    // Índice de sitemaps (proxy de /v1/seo/sitemap.xml, ver next.config.mjs)
     sitemap: 'https://bigotesypaticas.com/sitemap.xml',
     host: 'https://bigotesypaticas.com',
   };
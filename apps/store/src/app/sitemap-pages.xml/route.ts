@@ -0,0 +1,43 @@
+import { NextResponse } from 'next/server';
+
+// Páginas fijas del storefront. Productos, categorías, posts y landings vienen
+// de los shards precalculados de la API (/sitemap.xml es su índice, servido
+// como proxy en next.config.mjs), que lista este sitemap primero.
+
+const BASE = 'https://bigotesypaticas.com';
+
+const PAGES: { path: string; changefreq: string; priority: number }[] = [
+  { path: '', changefreq: 'daily', priority: 1.0 },
+  { path: '/categorias/perros', changefreq: 'daily', priority: 0.9 },
+  { path: '/categorias/gatos', changefreq: 'daily', priority: 0.9 },
+  { path: '/categorias/accesorios', changefreq: 'weekly', priority: 0.85 },
+  { path: '/categorias/snacks', changefreq: 'weekly', priority: 0.85 },
+  { path: '/categorias/todos', changefreq: 'daily', priority: 0.9 },
+  { path: '/blog', changefreq: 'weekly', priority: 0.8 },
+  { path: '/nosotros', changefreq: 'monthly', priority: 0.5 },
+  { path: '/contacto', changefreq: 'monthly', priority: 0.6 },
+  { path: '/pereira-dosquebradas-mascotas', changefreq: 'monthly', priority: 0.9 },
+  { path: '/tarjeta.html', changefreq: 'monthly', priority: 0.6 },
+];
+
+export function GET() {
+  const urls = PAGES.map(
+    (p) => `
+  <url>
+    <loc>${BASE}${p.path}</loc>
+    <changefreq>${p.changefreq}</changefreq>
+    <priority>${p.priority.toFixed(1)}</priority>
+  </url>`,
+  ).join('');
+
+  const xml = `<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">${urls}
+</urlset>`;
+
+  return new NextResponse(xml, {
+    headers: {
+      'Content-Type': 'application/xml; charset=utf-8',
+      'Cache-Control': 'public, max-age=3600, stale-while-revalidate=86400',
+    },
+  });
+}
@@ -3,7 +3,8 @@
 from __future__ import annotations
 
 import re
-from typing import Any
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
 
 try:  # opcional, sólo si pandas/numpy están disponibles
     import numpy as np  # type: ignore
@@ -14,6 +15,10 @@ except Exception:  # pragma: no cover
     _NP_INT = ()
     _NP_FLOAT = ()
 
+if TYPE_CHECKING:  # pragma: no cover
+    import numpy.typing as npt
+    import pandas as pd
+
 
 def clean_currency(val: Any) -> int:
     """Parsea cualquier representación de moneda colombiana a entero.
@@ -98,3 +103,177 @@ def format_cop(val: Any) -> str:
     n = clean_currency(val)
     sign = "-" if n < 0 else ""
     return f"{sign}${abs(n):,}".replace(",", ".")
+
+
+# ---------------------------------------------------------------------------
+# Versiones vectorizadas (columnas completas de pandas)
+# ---------------------------------------------------------------------------
+
+_INT64_MAX = 2.0**63
+# Textos más largos no van a la matriz de code points (ancho = texto más largo)
+_MAX_VECTOR = 64
+
+
+def map_unique(series: pd.Series, func: Callable[[Any], Any]) -> pd.Series:
+    """`series.apply(func)` evaluando `func` una sola vez por texto distinto.
+
+    Las columnas de Sheets repiten mucho (precios, montos, categorías): se
+    factorizan los `str` y se expande el resultado por código. Los demás
+    valores (nulos, números, bools) se evalúan uno a uno, porque el hash los
+    mezclaría (`1 == 1.0 == True`) y `func` puede distinguirlos por tipo.
+    """
+    import pandas as pd
+
+    if series.empty:
+        vacia: pd.Series = series.apply(func)
+        return vacia
+    if pd.api.types.infer_dtype(series, skipna=False) == "string":
+        # Sólo textos (lo habitual en Sheets): factorizar toda la columna. Una
+        # columna `string` con `pd.NA` también se infiere "string", pero el NA
+        # queda con código -1: esa va por el camino general
+        codes, uniques = pd.factorize(series.to_numpy(object))
+        if (codes >= 0).all():
+            expandido = pd.Series(uniques, dtype=object).map(func).to_numpy()[codes]
+            return pd.Series(expandido, index=series.index, name=series.name)
+    valores = series.tolist()
+    textos = [i for i, v in enumerate(valores) if type(v) is str]
+    salida = [None if type(v) is str else func(v) for v in valores]
+    if textos:
+        codes, uniques = pd.factorize(np.asarray([valores[i] for i in textos], dtype=object))
+        por_texto = [func(u) for u in uniques.tolist()]
+        for i, c in zip(textos, codes.tolist(), strict=True):
+            salida[i] = por_texto[c]
+    return pd.Series(salida, index=series.index, name=series.name)
+
+
+def _parse_strings(textos: list[str]) -> npt.NDArray[np.int64] | None:
+    """`clean_currency` sobre muchos `str` a la vez, sin bucle de Python.
+
+    Los textos se pasan a un arreglo Unicode de NumPy y se ven como matriz de
+    code points (una fila por texto): la limpieza de caracteres, el conteo y
+    la posición de "," / "." y la elección miles/decimal son máscaras sobre
+    esa matriz; el texto resultante se compacta por fila y se convierte con
+    `astype(float64)` (mismo redondeo correcto que `float()`).
+
+    Devuelve int64, o None si algún resultado no cabe en int64 (el llamador
+    cae a la versión escalar, que produce `int` de Python).
+    """
+    a = np.strings.lstrip(np.asarray(textos, dtype=str))
+    n, ancho = len(a), a.dtype.itemsize // 4
+    if ancho == 0:
+        return np.zeros(n, dtype=np.int64)
+    cp = a.view(np.uint32).reshape(n, ancho)
+
+    # strip() + quitar "$" y " " + startswith("-")
+    salta = (cp == ord("$")) | (cp == ord(" "))
+    neg = cp[np.arange(n), np.argmax(~salta, axis=1)] == ord("-")
+
+    # re.sub(r"[^0-9,\.]", "", s): se conservan dígitos ASCII, "," y "."
+    digito = (cp >= ord("0")) & (cp <= ord("9"))
+    coma = cp == ord(",")
+    punto = cp == ord(".")
+    queda = digito | coma | punto
+    pos = np.cumsum(queda, axis=1) - 1  # índice dentro del texto limpio
+    largo = queda.sum(axis=1)
+    n_coma, n_punto = coma.sum(axis=1), punto.sum(axis=1)
+    r_coma = np.where(coma, pos, -1).max(axis=1)
+    r_punto = np.where(punto, pos, -1).max(axis=1)
+
+    # Mismas ramas que la versión escalar
+    ambos = (n_coma > 0) & (n_punto > 0)
+    coma_decimal = ambos & (r_coma > r_punto)
+    sin_comas = (ambos & ~coma_decimal) | (~ambos & (n_coma > 1))
+    sin_puntos = ~ambos & (n_coma <= 1) & (n_punto > 1)
+    # Un único separador: decimal si le siguen ≤2 dígitos, o 3 con >3 a la izquierda
+    unico = ~ambos & (n_coma + n_punto == 1)
+    sep = np.maximum(r_coma, r_punto)
+    derecha = largo - sep - 1
+    decimal = unico & ((derecha <= 2) | ((derecha == 3) & (sep > 3)))
+    concatenar = unico & ~decimal
+
+    borra_coma = (sin_comas | (concatenar & (n_coma == 1)))[:, None]
+    borra_punto = (coma_decimal | sin_puntos | (concatenar & (n_punto == 1)))[:, None]
+    coma_a_punto = (coma_decimal | (decimal & (n_coma == 1)))[:, None]
+    deja_coma = coma & ~borra_coma
+    deja = digito | deja_coma | (punto & ~borra_punto)
+    puntos_finales = (deja & ~digito).sum(axis=1)  # "," conservadas pasan a "."
+    # float() acepta dígitos con a lo sumo un punto ("5", "5.", ".5")
+    ok = (digito.sum(axis=1) > 0) & (puntos_finales <= 1)
+
+    def compactar(
+        cps: npt.NDArray[np.uint32], mascara: npt.NDArray[np.bool_]
+    ) -> npt.NDArray[np.str_]:
+        # Cada carácter conservado va a la columna = cuántos conservados le preceden
+        filas, cols = np.nonzero(mascara)
+        destino = np.cumsum(mascara, axis=1)[filas, cols] - 1
+        out = np.zeros(cps.shape, dtype=np.uint32)
+        out[filas, destino] = cps[filas, cols]
+        return out.view(f"U{ancho}").ravel()
+
+    limpio = compactar(np.where(deja_coma & coma_a_punto, ord("."), cp), deja)
+    numeros = np.zeros(n, dtype=np.float64)
+    numeros[ok] = limpio[ok].astype(np.float64)
+    numeros = np.rint(numeros)  # round() de Python: mitad al par
+    if np.any(np.abs(numeros) >= _INT64_MAX):
+        return None
+    out = numeros.astype(np.int64)
+
+    # Fallback legacy: `int(re.sub(r"[^0-9]", "", s) or 0)` (p. ej. "1.23.4")
+    malos = np.flatnonzero(~ok)
+    if len(malos):
+        enteros = [int(d or 0) for d in compactar(cp[malos], digito[malos]).tolist()]
+        if any(e >= 2**63 for e in enteros):
+            return None
+        out[malos] = enteros
+    return np.where(neg, -out, out)
+
+
+def clean_currency_series(series: pd.Series) -> pd.Series:
+    """Equivalente vectorizado (bit-exact) de `series.apply(clean_currency)`.
+
+    - Columnas int/bool: conversión directa; float: `np.rint` (mitad al par,
+      igual que `round`).
+    - Columnas object (lo que llega de Sheets): los `str` DISTINTOS se parsean
+      juntos con `_parse_strings` (un valor repetido se parsea una sola vez);
+      el resto de tipos, y textos muy largos, usan `clean_currency`.
+    - Cualquier caso fuera de int64 o NaN cae a `series.apply(clean_currency)`
+      para reproducir exactamente su resultado o su excepción.
+    """
+    import pandas as pd
+
+    if series.empty:
+        return series.apply(clean_currency)
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        if series.hasnans:
+            return series.apply(clean_currency)
+        return series.astype(np.int64)
+    if pd.api.types.is_float_dtype(dtype):
+        numeros = np.rint(series.to_numpy(np.float64))
+        if series.hasnans or np.any(np.abs(numeros) >= _INT64_MAX):
+            return series.apply(clean_currency)
+        return pd.Series(numeros.astype(np.int64), index=series.index, name=series.name)
+
+    valores = series.to_numpy(object)
+    if pd.api.types.infer_dtype(valores, skipna=False) == "string":
+        es_str = np.ones(len(valores), dtype=bool)
+    else:
+        es_str = np.fromiter((isinstance(v, str) for v in valores), bool, len(valores))
+    out = np.empty(len(valores), dtype=np.int64)
+    try:
+        if es_str.any():
+            # Memo: cada texto distinto se parsea una sola vez
+            codes, uniques = pd.factorize(valores[es_str])
+            cortos = np.fromiter(map(len, uniques), np.int64, len(uniques)) <= _MAX_VECTOR
+            parseados = np.empty(len(uniques), dtype=np.int64)
+            vectorizados = _parse_strings(uniques[cortos].tolist())
+            if vectorizados is None:
+                return series.apply(clean_currency)
+            parseados[cortos] = vectorizados
+            parseados[~cortos] = [clean_currency(u) for u in uniques[~cortos]]
+            out[es_str] = parseados[codes]
+        if not es_str.all():
+            out[~es_str] = [clean_currency(v) for v in valores[~es_str]]
+    except (OverflowError, ValueError, TypeError):
+        return series.apply(clean_currency)
+    return pd.Series(out, index=series.index, name=series.name)
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Any
 
+from bp_common.currency import map_unique
+
 try:
     import pandas as pd  # type: ignore
 
@@ -38,6 +40,42 @@ def normalizar_id_producto(id_prod: Any) -> str:
     return s
 
 
+def normalizar_id_producto_series(series: pd.Series) -> pd.Series:
+    """Equivalente (bit-exact) de `series.apply(normalizar_id_producto)`.
+
+    Normaliza cada texto DISTINTO una sola vez (`map_unique`): los SKU se
+    repiten mucho en ventas, historial y proveedores. Se midió una versión
+    con ufuncs de NumPy sobre code points y era más lenta que los métodos de
+    `str` de CPython, que ya son C; el ahorro está en no repetir trabajo.
+    """
+    return map_unique(series, normalizar_id_producto)
+
+
+def buscar_por_claves(claves: pd.DataFrame, tabla: pd.DataFrame) -> pd.DataFrame:
+    """Para cada fila de `claves`, la fila de `tabla` del primer candidato que exista.
+
+    `claves` tiene una columna por tipo de clave EN ORDEN DE PRIORIDAD (p. ej.
+    UID, SKU normalizado); `tabla` está indexada por clave. Es un merge de la
+    forma larga (fila, prioridad, clave) contra `tabla`, quedándose con la
+    coincidencia de menor prioridad por fila. Claves vacías o nulas se
+    ignoran; las filas sin coincidencia quedan en NaN. Conserva `claves.index`.
+    """
+    n = len(claves)
+    largo = pd.concat(
+        [
+            pd.DataFrame({"_fila": range(n), "_prio": prio, "_clave": claves[col].to_numpy()})
+            for prio, col in enumerate(claves.columns)
+        ],
+        ignore_index=True,
+    )
+    largo = largo[largo["_clave"].notna() & (largo["_clave"] != "")]
+    hits = largo.merge(tabla, left_on="_clave", right_index=True, how="inner")
+    hits = hits.sort_values(["_fila", "_prio"], kind="stable").drop_duplicates("_fila")
+    out = hits.set_index("_fila")[list(tabla.columns)].reindex(range(n))
+    out.index = claves.index
+    return out
+
+
 def limpiar_tel(tel: Any) -> str:
     """Normaliza un teléfono colombiano. Bit-exact a `BigotesyPaticas.py::limpiar_tel`."""
     t = (
@@ -0,0 +1,177 @@
+"""Gateway de lectura de Google Sheets compartido por todas las páginas.
+
+Cada página abría su propia conexión y pedía cada pestaña por separado
+(`sh.worksheet(...)` + `get_all_values`/`get_all_records`): dos requests por
+pestaña contra la cuota de 60 lecturas/min, que `safe_api_call` terminaba
+pagando con esperas de hasta 16 s. El gateway:
+
+- guarda un snapshot por pestaña a nivel de proceso (todas las sesiones y
+  páginas) con TTL;
+- al `leer` una lista de pestañas pide las vencidas en UN
+  `spreadsheets.values.batchGet`;
+- resuelve los `Worksheet` (para escrituras) con un solo `sh.worksheets()`
+  cacheado, en vez de un request de metadata por `sh.worksheet(nombre)`.
+
+Uso en una página:
+
+    gw = obtener_gateway(conectar_db())
+    gw.leer(["Inventario", "Ventas"], llamar=safe_google_op)  # 1 request
+    df_inv = pd.DataFrame(gw.registros("Inventario"))          # sin request
+    ...
+    safe_google_op(gw.hoja("Inventario").update, ...)
+    gw.invalidar("Inventario")
+
+`valores` devuelve lo mismo que `get_all_values` y `registros` lo mismo que
+`get_all_records` (con la misma conversión numérica de gspread).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+from gspread.exceptions import GSpreadException, WorksheetNotFound
+from gspread.utils import numericise_all, to_records
+
+Filas = list[list[str]]
+Llamar = Callable[..., Any]
+
+
+def _directo(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    return func(*args, **kwargs)
+
+
+def _rellenar(valores: list[list[Any]]) -> Filas:
+    """Filas rectangulares como las de `get_all_values` (la API recorta vacíos al final)."""
+    ancho = max((len(f) for f in valores), default=0)
+    return [[*map(str, f), *[""] * (ancho - len(f))] for f in valores]
+
+
+def _rango(titulo: str) -> str:
+    return "'" + titulo.replace("'", "''") + "'"
+
+
+@dataclass
+class _Snapshot:
+    valores: Filas
+    leido_en: float
+
+
+class SheetsGateway:
+    def __init__(
+        self,
+        sh: Any,
+        *,
+        ttl: float = 60.0,
+        ttl_hojas: float = 600.0,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.sh = sh
+        self.ttl = ttl
+        self.ttl_hojas = ttl_hojas
+        self._reloj = reloj
+        self._snapshots: dict[str, _Snapshot] = {}
+        self._hojas: dict[str, Any] = {}
+        self._hojas_en = float("-inf")
+        self._lock = threading.RLock()
+
+    # ── Worksheets (metadata) ───────────────────────────────
+    def _cargar_hojas(self, llamar: Llamar) -> None:
+        self._hojas = {ws.title: ws for ws in llamar(self.sh.worksheets)}
+        self._hojas_en = self._reloj()
+
+    def titulos(self, *, llamar: Llamar = _directo) -> set[str]:
+        with self._lock:
+            if self._reloj() - self._hojas_en >= self.ttl_hojas:
+                self._cargar_hojas(llamar)
+            return set(self._hojas)
+
+    def hoja(self, titulo: str, *, llamar: Llamar = _directo) -> Any:
+        """`Worksheet` por título; `WorksheetNotFound` si no existe."""
+        with self._lock:
+            if titulo not in self.titulos(llamar=llamar):
+                # Puede haberse creado después de la última lectura de metadata
+                self._cargar_hojas(llamar)
+            try:
+                return self._hojas[titulo]
+            except KeyError:
+                raise WorksheetNotFound(titulo) from None
+
+    def registrar_hoja(self, ws: Any) -> None:
+        """Agrega una hoja recién creada (`add_worksheet`) sin releer metadata."""
+        with self._lock:
+            self._hojas[ws.title] = ws
+
+    # ── Valores ─────────────────────────────────────────────
+    def leer(
+        self, titulos: Iterable[str], *, llamar: Llamar = _directo, fresco: bool = False
+    ) -> dict[str, Filas]:
+        """{título: valores}; las pestañas vencidas se piden en un solo batchGet.
+
+        Una pestaña que no existe devuelve `[]` (como una hoja vacía).
+        """
+        titulos = list(dict.fromkeys(titulos))
+        with self._lock:
+            ahora = self._reloj()
+            existentes = self.titulos(llamar=llamar)
+            pedir = [
+                t
+                for t in titulos
+                if t in existentes
+                and (
+                    fresco
+                    or t not in self._snapshots
+                    or ahora - self._snapshots[t].leido_en >= self.ttl
+                )
+            ]
+            if pedir:
+                respuesta = llamar(self.sh.values_batch_get, [_rango(t) for t in pedir])
+                rangos = respuesta.get("valueRanges", [])
+                for t, vr in zip(pedir, rangos, strict=True):
+                    self._snapshots[t] = _Snapshot(_rellenar(vr.get("values", [])), ahora)
+            return {t: self._snapshots[t].valores if t in self._snapshots else [] for t in titulos}
+
+    def valores(self, titulo: str, *, llamar: Llamar = _directo) -> Filas:
+        """Equivalente a `ws.get_all_values()` (desde el snapshot si está vigente)."""
+        return self.leer([titulo], llamar=llamar)[titulo]
+
+    def registros(self, titulo: str, *, llamar: Llamar = _directo) -> list[dict[str, Any]]:
+        """Equivalente a `ws.get_all_records()` (encabezado en la fila 1)."""
+        valores = self.valores(titulo, llamar=llamar)
+        if not valores:
+            return []
+        claves, filas = valores[0], valores[1:]
+        repetidas = [c for c, n in Counter(claves).items() if n > 1]
+        if repetidas:
+            raise GSpreadException(
+                f"the header row in the worksheet contains duplicates: {repetidas}"
+            )
+        return to_records(claves, [numericise_all(f) for f in filas])
+
+    def invalidar(self, *titulos: str) -> None:
+        """Descarta snapshots (todos si no se indica ninguno) tras una escritura."""
+        with self._lock:
+            if not titulos:
+                self._snapshots.clear()
+            for t in titulos:
+                self._snapshots.pop(t, None)
+
+
+_gateways: dict[str, SheetsGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def obtener_gateway(sh: Any, **opciones: Any) -> SheetsGateway:
+    """Gateway del proceso para el Spreadsheet `sh` (uno por id de Spreadsheet)."""
+    with _gateways_lock:
+        gw = _gateways.get(sh.id)
+        if gw is None:
+            gw = _gateways[sh.id] = SheetsGateway(sh, **opciones)
+        else:
+            # `st.cache_resource` puede haber reabierto la conexión
+            gw.sh = sh
+        return gw
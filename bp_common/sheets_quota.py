@@ -0,0 +1,208 @@
+"""Control de cuota de la API de Google Sheets compartido por todas las sesiones.
+
+`safe_api_call` (y sus copias `safe_google_op`) solo reaccionaban al 429:
+`time.sleep` con backoff exponencial fijo, cada sesión por su cuenta. Con
+varios usuarios todos reintentaban a la vez (mismos 2 s, 4 s, 8 s...) y
+volvían a chocar contra la cuota de 60 requests/min hasta terminar en
+"API saturada". Este módulo, a nivel de proceso:
+
+- `TokenBucket`: limitador proactivo; cada request toma una ficha y, si no
+  hay, espera en cola a que se repongan en vez de salir y recibir un 429.
+  Lecturas y escrituras tienen cubetas separadas (cuotas separadas en Google).
+- `SingleFlight`: lecturas de valores idénticas concurrentes (mismo método,
+  misma hoja, mismos argumentos) comparten una sola llamada y su resultado.
+- `llamada_api`: ficha + coalescencia + reintentos con backoff exponencial y
+  jitter completo; ante un 429 pausa la cubeta para que TODAS las sesiones
+  esperen juntas en lugar de seguir gastando cuota.
+
+Uso:
+
+    from bp_common.sheets_quota import llamada_api
+    datos = llamada_api(ws.get_all_values)
+"""
+
+from __future__ import annotations
+
+import copy
+import random
+import threading
+import time
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Any
+
+# Métodos de gspread que solo leen valores: se pueden coalescer y usan la cubeta de lectura
+LECTURAS = frozenset(
+    {
+        "batch_get",
+        "col_values",
+        "get",
+        "get_all_records",
+        "get_all_values",
+        "get_values",
+        "row_values",
+        "values_batch_get",
+        "values_get",
+    }
+)
+# Lecturas de metadata que devuelven handles (`Worksheet`): gastan cuota de lectura
+# pero no se coalescen, porque copiar el handle copiaría el cliente HTTP entero
+HANDLES = frozenset({"worksheet", "worksheets"})
+
+
+class TokenBucket:
+    """Cubeta de fichas thread-safe: `capacidad` en ráfaga, `por_segundo` de reposición."""
+
+    def __init__(
+        self,
+        capacidad: float,
+        por_segundo: float,
+        *,
+        reloj: Callable[[], float] = time.monotonic,
+        dormir: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self._reloj = reloj
+        self._dormir = dormir
+        self._fichas = capacidad
+        self._ultimo = reloj()
+        self._pausa_hasta = float("-inf")
+        self._lock = threading.Lock()
+
+    def _reponer(self, ahora: float) -> None:
+        desde = max(self._ultimo, self._pausa_hasta)
+        if ahora > desde:
+            self._fichas = min(self.capacidad, self._fichas + (ahora - desde) * self.por_segundo)
+        self._ultimo = max(self._ultimo, ahora)
+
+    def _tomar(self) -> float:
+        """Toma una ficha y devuelve 0, o los segundos a esperar antes de reintentar."""
+        with self._lock:
+            ahora = self._reloj()
+            self._reponer(ahora)
+            if ahora < self._pausa_hasta:
+                return self._pausa_hasta - ahora + 1 / self.por_segundo
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return 0.0
+            return (1 - self._fichas) / self.por_segundo
+
+    def adquirir(self) -> float:
+        """Bloquea hasta tomar una ficha; devuelve los segundos esperados en cola."""
+        esperado = 0.0
+        while (espera := self._tomar()) > 0:
+            self._dormir(espera)
+            esperado += espera
+        return esperado
+
+    def pausar(self, segundos: float) -> None:
+        """Vacía la cubeta y no repone durante `segundos` (Google respondió 429)."""
+        with self._lock:
+            ahora = self._reloj()
+            self._reponer(ahora)
+            self._fichas = 0.0
+            self._pausa_hasta = max(self._pausa_hasta, ahora + segundos)
+
+
+class SingleFlight:
+    """Una sola ejecución en vuelo por clave; las llamadas concurrentes esperan su resultado."""
+
+    def __init__(self) -> None:
+        self._en_vuelo: dict[Hashable, Future[Any]] = {}
+        self._lock = threading.Lock()
+
+    def hacer(self, clave: Hashable, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            existente = self._en_vuelo.get(clave)
+            if existente is None:
+                futuro: Future[Any] = Future()
+                self._en_vuelo[clave] = futuro
+        if existente is not None:
+            # Copia: el resultado del líder puede ser modificado por su sesión
+            return copy.deepcopy(existente.result())
+        try:
+            futuro.set_result(func())
+        except BaseException as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._en_vuelo[clave]
+        return futuro.result()
+
+
+def es_cuota(e: BaseException) -> bool:
+    """True si la excepción es un 429 / cuota excedida de Google."""
+    if getattr(e, "code", None) == 429:
+        return True
+    msg = str(e).lower()
+    return "429" in msg or "quota" in msg or "rate limit" in msg
+
+
+def _clave(
+    func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]
+) -> Hashable | None:
+    """Clave de coalescencia de una lectura de gspread; None si no se puede identificar."""
+    nombre = getattr(func, "__name__", "")
+    obj = getattr(func, "__self__", None)
+    if obj is None:
+        return None
+    # Spreadsheet: `id`; Worksheet: `spreadsheet_id` + `id` de la pestaña
+    destino = (getattr(obj, "spreadsheet_id", None), getattr(obj, "id", None))
+    if destino == (None, None):
+        return None
+    try:
+        return (type(obj).__name__, destino, nombre, repr(args), repr(sorted(kwargs.items())))
+    except Exception:
+        return None
+
+
+# Cuota de Sheets: 60 lecturas y 60 escrituras por minuto por usuario de servicio
+_BUCKETS = {
+    "lectura": TokenBucket(capacidad=10, por_segundo=1.0),
+    "escritura": TokenBucket(capacidad=10, por_segundo=1.0),
+}
+_VUELOS = SingleFlight()
+
+
+def bucket(tipo: str) -> TokenBucket:
+    return _BUCKETS[tipo]
+
+
+def llamada_api(
+    func: Callable[..., Any],
+    *args: Any,
+    reintentos: int = 8,
+    base: float = 1.0,
+    tope: float = 30.0,
+    pausa_429: float = 10.0,
+    dormir: Callable[[float], None] = time.sleep,
+    **kwargs: Any,
+) -> Any:
+    """Ejecuta una llamada de gspread respetando la cuota compartida del proceso.
+
+    Espera en cola por una ficha, coalesce lecturas idénticas concurrentes y
+    reintenta los 429 con backoff exponencial con jitter completo
+    (`uniform(0, min(tope, base * 2**intento))`). Otros errores se propagan
+    sin reintentar; el 429 solo se propaga si se agotan los `reintentos`.
+    """
+    nombre = getattr(func, "__name__", "")
+    cubeta = _BUCKETS["lectura" if nombre in LECTURAS | HANDLES else "escritura"]
+    clave = _clave(func, args, kwargs) if nombre in LECTURAS else None
+
+    def ejecutar() -> Any:
+        intento = 0
+        while True:
+            cubeta.adquirir()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not es_cuota(e) or intento + 1 >= reintentos:
+                    raise
+                cubeta.pausar(pausa_429)
+                dormir(random.uniform(0, min(tope, base * 2**intento)))
+                intento += 1
+
+    if clave is None:
+        return ejecutar()
+    return _VUELOS.hacer(clave, ejecutar)
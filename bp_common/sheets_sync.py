@@ -0,0 +1,242 @@
+"""Sincronización incremental de pestañas de Google Sheets a DataFrames.
+
+`cargar_datos_iniciales` leía cinco pestañas completas con `get_all_values` en
+cada sincronización, así que el tiempo y la cuota crecían con el histórico de
+Ventas. `SheetsDeltaSync` guarda, por proceso, las filas crudas y el DataFrame
+limpio de cada pestaña y en las siguientes sincronizaciones pide en UN
+`values_batch_get`:
+
+- pestañas en modo `"completa"` (Inventario, Clientes: se editan en el
+  lugar): la hoja entera;
+- pestañas en modo `"anexar"` (Ventas, Gastos, Cierres: crecen por el final):
+  la fila de encabezados y desde las últimas `ventana` filas conocidas hasta
+  el final. Las filas nuevas se limpian y se anexan; si alguna de la ventana
+  cambió (p. ej. `Estado_Envio` de una venta reciente) se rehace desde ahí.
+
+Se recarga completa una pestaña si cambió su encabezado (esquema), si tiene
+menos filas que antes (borrados), si aparecen columnas nuevas o cada
+`recarga_completa_s` segundos, para recoger ediciones de filas viejas. Quien
+edite una fila vieja desde la app la marca con `invalidar("ven")`, y el botón
+de sincronizar pide `forzar_completa=True`.
+
+Uso:
+
+    sync = obtener_sync("pos", TABS_POS, limpiar_dataframe)
+    st.session_state.db = sync.sincronizar(sh, llamar=safe_api_call)
+
+Cada llamada devuelve copias: las sesiones modifican sus DataFrames en el
+lugar y no deben tocar el snapshot compartido.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import pandas as pd
+
+Modo = Literal["anexar", "completa"]
+Filas = list[list[str]]
+
+
+@dataclass(frozen=True)
+class TabSpec:
+    clave: str  # clave en `st.session_state.db` ("ven")
+    titulo: str  # nombre de la pestaña en el Spreadsheet ("Ventas")
+    modo: Modo = "completa"
+
+
+@dataclass
+class _EstadoTab:
+    encabezado: list[str]  # fila 1 cruda, rellenada a `ancho`
+    ancho: int
+    filas: int  # filas de datos (sin encabezado)
+    cola: Filas  # últimas `ventana` filas crudas, para detectar ediciones
+    df: pd.DataFrame
+
+
+@dataclass
+class ResultadoSync:
+    completas: list[str] = field(default_factory=list)
+    incrementales: dict[str, int] = field(default_factory=dict)  # clave → filas nuevas/rehechas
+
+
+def columna_a1(n: int) -> str:
+    """Letra de columna A1 (1 → A, 27 → AA)."""
+    letras = ""
+    while n > 0:
+        n, resto = divmod(n - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _rellenar(filas: Iterable[Sequence[Any]], ancho: int) -> Filas:
+    """Filas rectangulares como las de `get_all_values` (la API recorta vacíos al final)."""
+    return [[*map(str, f), *[""] * (ancho - len(f))] for f in filas]
+
+
+def _rango(titulo: str, a1: str | None = None) -> str:
+    nombre = "'" + titulo.replace("'", "''") + "'"
+    return f"{nombre}!{a1}" if a1 else nombre
+
+
+class SheetsDeltaSync:
+    def __init__(
+        self,
+        tabs: Sequence[TabSpec],
+        limpiar: Callable[[Filas], pd.DataFrame],
+        *,
+        ventana: int = 200,
+        recarga_completa_s: float = 1800.0,
+        reloj: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.tabs = list(tabs)
+        self._limpiar = limpiar
+        self._ventana = ventana
+        self._recarga_completa_s = recarga_completa_s
+        self._reloj = reloj
+        self._estado: dict[str, _EstadoTab] = {}
+        self._ultima_completa = 0.0
+        self._sucias: set[str] = set()
+        self._lock = threading.Lock()
+        self.ultimo = ResultadoSync()
+
+    @property
+    def cargado(self) -> bool:
+        return len(self._estado) == len(self.tabs)
+
+    def invalidar(self, *claves: str) -> None:
+        """La próxima sincronización relee completas esas pestañas (todas si no se dan)."""
+        with self._lock:
+            if claves:
+                self._sucias.update(claves)
+            else:
+                self._estado.clear()
+
+    def sincronizar(
+        self,
+        sh: Any,
+        *,
+        llamar: Callable[..., Any] = lambda f, *a, **k: f(*a, **k),
+        forzar_completa: bool = False,
+    ) -> dict[str, pd.DataFrame]:
+        """{clave: DataFrame} al día con el Spreadsheet `sh` (copias por sesión)."""
+        with self._lock:
+            ahora = self._reloj()
+            if forzar_completa or ahora - self._ultima_completa >= self._recarga_completa_s:
+                self._estado.clear()
+            if not self._estado:
+                self._ultima_completa = ahora
+
+            resultado = ResultadoSync()
+            completas = [
+                t
+                for t in self.tabs
+                if t.modo == "completa"
+                or t.clave not in self._estado
+                or t.clave in self._sucias
+                or self._estado[t.clave].ancho == 0  # hoja vacía: no hay rango que pedir
+            ]
+            anexar = [t for t in self.tabs if t not in completas]
+
+            self._sucias.clear()
+
+            rangos: list[str] = [_rango(t.titulo) for t in completas]
+            inicios: dict[str, int] = {}
+            for t in anexar:
+                est = self._estado[t.clave]
+                k = min(self._ventana, est.filas)
+                inicios[t.clave] = k
+                # Fila de hoja de la primera fila de la ventana (encabezado = fila 1)
+                desde = est.filas - k + 2
+                rangos.append(_rango(t.titulo, "1:1"))
+                rangos.append(_rango(t.titulo, f"A{desde}:{columna_a1(est.ancho)}"))
+
+            valores = self._leer(sh, rangos, llamar)
+            for t in completas:
+                self._cargar_completa(t, valores.pop(0))
+                resultado.completas.append(t.clave)
+
+            rehacer: list[TabSpec] = []
+            for t in anexar:
+                encabezado, datos = valores.pop(0), valores.pop(0)
+                aplicadas = self._aplicar_delta(t, encabezado, datos, inicios[t.clave])
+                if aplicadas is None:
+                    rehacer.append(t)
+                else:
+                    resultado.incrementales[t.clave] = aplicadas
+
+            if rehacer:
+                # Esquema cambiado / filas borradas: segunda lectura solo de esas pestañas
+                releidas = self._leer(sh, [_rango(t.titulo) for t in rehacer], llamar)
+                for t, filas in zip(rehacer, releidas, strict=True):
+                    self._cargar_completa(t, filas)
+                    resultado.completas.append(t.clave)
+
+            self.ultimo = resultado
+            return {t.clave: self._estado[t.clave].df.copy() for t in self.tabs}
+
+    @staticmethod
+    def _leer(sh: Any, rangos: list[str], llamar: Callable[..., Any]) -> list[Filas]:
+        respuesta = llamar(sh.values_batch_get, rangos)
+        return [vr.get("values", []) for vr in respuesta.get("valueRanges", [])]
+
+    def _cargar_completa(self, tab: TabSpec, valores: Filas) -> None:
+        ancho = max((len(f) for f in valores), default=0)
+        filas = _rellenar(valores, ancho)
+        encabezado = filas[0] if filas else []
+        datos = filas[1:]
+        self._estado[tab.clave] = _EstadoTab(
+            encabezado=encabezado,
+            ancho=ancho,
+            filas=len(datos),
+            cola=datos[len(datos) - min(self._ventana, len(datos)) :],
+            df=self._limpiar(filas),
+        )
+
+    def _aplicar_delta(self, tab: TabSpec, encabezado: Filas, datos: Filas, k: int) -> int | None:
+        """Filas limpiadas de nuevo, o None si hace falta recarga completa."""
+        est = self._estado[tab.clave]
+        crudo = encabezado[0] if encabezado else []
+        if len(crudo) > est.ancho or any(len(f) > est.ancho for f in datos):
+            return None
+        if _rellenar([crudo], est.ancho)[0] != est.encabezado or len(datos) < k:
+            return None
+
+        datos = _rellenar(datos, est.ancho)
+        # Primera fila de la ventana que cambió (k si ninguna): se rehace desde ahí
+        corte = next((i for i in range(k) if datos[i] != est.cola[i]), k)
+        nuevas = datos[corte:]
+        if not nuevas:
+            return 0
+
+        base = est.filas - k + corte
+        df_nuevas = self._limpiar([est.encabezado, *nuevas])
+        est.df = (
+            pd.concat([est.df.iloc[:base], df_nuevas], ignore_index=True) if base else df_nuevas
+        )
+        est.filas = base + len(nuevas)
+        todas = [*est.cola[:corte], *nuevas]
+        est.cola = todas[len(todas) - min(self._ventana, len(todas)) :]
+        return len(nuevas)
+
+
+_registro: dict[str, SheetsDeltaSync] = {}
+_registro_lock = threading.Lock()
+
+
+def obtener_sync(
+    nombre: str,
+    tabs: Sequence[TabSpec],
+    limpiar: Callable[[Filas], pd.DataFrame],
+    **opciones: Any,
+) -> SheetsDeltaSync:
+    """Sync compartido por todas las sesiones del proceso (uno por `nombre`)."""
+    with _registro_lock:
+        sync = _registro.get(nombre)
+        if sync is None:
+            sync = _registro[nombre] = SheetsDeltaSync(tabs, limpiar, **opciones)
+        return sync
@@ -8,6 +8,8 @@ from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
 
+from bp_common.currency import clean_currency_series
+
 
 def money_int(val):
     if isinstance(val, (np.integer, int)):
@@ -246,7 +248,7 @@ def preparar_ventas(df_ven: pd.DataFrame) -> pd.DataFrame:
         df = df.rename(columns={col_total: "Total"})
     if "Total" not in df.columns:
         df["Total"] = 0.0
-    df["Total"] = df["Total"].apply(money_int)
+    df["Total"] = clean_currency_series(df["Total"])
 
     # Costo (si existe)
     col_costo = _col_pick(df, ["Costo_Total", "Costo total", "Costo", "COGS"])
@@ -254,7 +256,7 @@ def preparar_ventas(df_ven: pd.DataFrame) -> pd.DataFrame:
         df = df.rename(columns={col_costo: "Costo_Total"})
     if "Costo_Total" not in df.columns:
         df["Costo_Total"] = 0.0
-    df["Costo_Total"] = df["Costo_Total"].apply(money_int)
+    df["Costo_Total"] = clean_currency_series(df["Costo_Total"])
 
     # Método de pago (si existe)
     col_pago = _col_pick(df, ["Metodo_Pago", "Método_Pago", "Metodo", "Pago"])
@@ -291,7 +293,7 @@ def preparar_gastos(df_gas: pd.DataFrame) -> pd.DataFrame:
         df = df.rename(columns={col_monto: "Monto"})
     if "Monto" not in df.columns:
         df["Monto"] = 0.0
-    df["Monto"] = df["Monto"].apply(money_int)
+    df["Monto"] = clean_currency_series(df["Monto"])
 
     # Tipo gasto (en tu app principal es Tipo_Gasto)
     col_tipo = _col_pick(df, ["Tipo_Gasto", "Tipo", "tipo", "Tipo gasto"])
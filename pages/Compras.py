@@ -10,6 +10,10 @@ import re
 import uuid
 from difflib import SequenceMatcher
 
+from bp_common.currency import map_unique
+from bp_common.sheets_gateway import obtener_gateway
+from bp_common.sheets_quota import llamada_api
+
 try:
     # si normalizar_id_producto vive en el módulo principal
     from BigotesyPaticas import normalizar_id_producto
@@ -669,9 +673,11 @@ def conectar_sheets():
 
         gc = gspread.service_account_from_dict(st.secrets["google_service_account"])
         sh = gc.open_by_url(st.secrets["SHEET_URL"])
+        # Metadata de pestañas con un solo `sh.worksheets()` cacheado
+        gw = obtener_gateway(sh)
 
         try:
-            ws_inv = sh.worksheet("Inventario")
+            ws_inv = gw.hoja("Inventario", llamar=llamada_api)
         except:
             st.error("Falta hoja 'Inventario'")
             st.stop()
@@ -694,9 +700,10 @@ def conectar_sheets():
         )
 
         try:
-            ws_map = sh.worksheet("Maestro_Proveedores")
+            ws_map = gw.hoja("Maestro_Proveedores", llamar=llamada_api)
         except:
             ws_map = sh.add_worksheet("Maestro_Proveedores", 1000, 10)
+            gw.registrar_hoja(ws_map)
             ws_map.append_row(
                 [
                     "ID_Proveedor",
@@ -729,9 +736,10 @@ def conectar_sheets():
         )
 
         try:
-            ws_hist = sh.worksheet("Historial_Recepciones")
+            ws_hist = gw.hoja("Historial_Recepciones", llamar=llamada_api)
         except:
             ws_hist = sh.add_worksheet("Historial_Recepciones", 1000, 24)
+            gw.registrar_hoja(ws_hist)
 
         _ensure_sheet_schema(
             ws_hist,
@@ -763,9 +771,10 @@ def conectar_sheets():
         )
 
         try:
-            ws_gas = sh.worksheet("Gastos")
+            ws_gas = gw.hoja("Gastos", llamar=llamada_api)
         except:
             ws_gas = sh.add_worksheet("Gastos", 1000, 8)
+            gw.registrar_hoja(ws_gas)
             ws_gas.append_row(
                 [
                     "ID_Gasto",
@@ -804,6 +813,11 @@ def conectar_sheets():
 # ==========================================
 
 
+def _registros(ws) -> list[dict]:
+    """`get_all_records` desde el snapshot compartido del gateway (sin request si está vigente)."""
+    return obtener_gateway(ws.spreadsheet).registros(ws.title, llamar=llamada_api)
+
+
 @st.cache_data(ttl=120)
 def cargar_proveedores(_ws_map) -> tuple[list[str], dict[str, str]]:
     """
@@ -812,7 +826,7 @@ def cargar_proveedores(_ws_map) -> tuple[list[str], dict[str, str]]:
       - nombre_to_id (Nombre_Proveedor -> ID_Proveedor)
     """
     try:
-        recs = _ws_map.get_all_records()
+        recs = _registros(_ws_map)
         if not recs:
             return (["(Nuevo proveedor)"], {})
         df = pd.DataFrame(recs)
@@ -835,7 +849,7 @@ def cargar_proveedores(_ws_map) -> tuple[list[str], dict[str, str]]:
 @st.cache_data(ttl=60)
 def cargar_cerebro(_ws_inv, _ws_map):
     try:
-        d_inv = _ws_inv.get_all_records()
+        d_inv = _registros(_ws_inv)
         df_inv = pd.DataFrame(d_inv)
         col_id = next((c for c in df_inv.columns if "ID" in c or "SKU" in c), "ID_Producto")
         col_nm = next((c for c in df_inv.columns if "Nombre" in c), "Nombre")
@@ -843,14 +857,14 @@ def cargar_cerebro(_ws_inv, _ws_map):
         lista_prods = sorted(df_inv["Display"].unique().tolist())
         lista_prods.insert(0, "NUEVO (Crear Producto)")
         dict_prods = pd.Series(
-            df_inv["Display"].values, index=df_inv[col_id].apply(normalizar_id_producto)
+            df_inv["Display"].values, index=map_unique(df_inv[col_id], normalizar_id_producto)
         ).to_dict()
     except:
         lista_prods, dict_prods = ["NUEVO (Crear Producto)"], {}
 
     memoria = {}
     try:
-        d_map = _ws_map.get_all_records()
+        d_map = _registros(_ws_map)
         for r in d_map:
             k = f"{normalizar_str(r.get('ID_Proveedor'))}_{normalizar_str(r.get('SKU_Proveedor'))}"
             iva_guardado = r.get("Ultimo_IVA")
@@ -874,7 +888,7 @@ def cargar_cerebro(_ws_inv, _ws_map):
 @st.cache_data(ttl=60)
 def cargar_catalogo_inventario(_ws_inv):
     try:
-        df_inv = pd.DataFrame(_ws_inv.get_all_records())
+        df_inv = pd.DataFrame(_registros(_ws_inv))
         if df_inv.empty:
             return []
 
@@ -1469,11 +1483,13 @@ def main():
 
     # Conexión
     sh, ws_inv, ws_map, ws_hist, ws_gas = conectar_sheets()
+    gw = obtener_gateway(sh)
 
     # ✅ Botón para recargar catálogo (cuando alguien cambia Sheets)
     cR1, cR2 = st.columns([1, 3])
     if cR1.button("🔄 Recargar catálogo", help="Recarga Inventario/Proveedores/Memory"):
         st.cache_data.clear()
+        gw.invalidar("Inventario", "Maestro_Proveedores")
         for k in [
             "lst_prods_cache",
             "dct_prods_cache",
@@ -1485,6 +1501,9 @@ def main():
                 del st.session_state[k]
         st.rerun()
 
+    # Inventario + Maestro en un solo batchGet para cerebro, catálogo y categorías
+    gw.leer(["Inventario", "Maestro_Proveedores"], llamar=llamada_api)
+
     # Cerebro (productos + memoria)
     if "lst_prods_cache" not in st.session_state:
         l, d, m = cargar_cerebro(ws_inv, ws_map)
@@ -1503,7 +1522,7 @@ def main():
     # ✅ Categorías reales desde Inventario
     categorias = []
     try:
-        df_inv = pd.DataFrame(ws_inv.get_all_records())
+        df_inv = pd.DataFrame(_registros(ws_inv))
         col_cat = (
             "Categoria"
             if "Categoria" in df_inv.columns
@@ -1864,6 +1883,7 @@ def main():
 
                 # Limpiar caché y recargar memoria para sugerencias inmediatas
                 st.cache_data.clear()
+                gw.invalidar()
                 for k in [
                     "lst_prods_cache",
                     "dct_prods_cache",
@@ -11,6 +11,11 @@ from datetime import datetime, timedelta, date
 from urllib.parse import quote
 import unicodedata
 
+from bp_common.currency import clean_currency_series, map_unique
+from bp_common.ids import buscar_por_claves
+from bp_common.sheets_gateway import obtener_gateway
+from bp_common.sheets_quota import llamada_api
+
 # ==========================================
 # 0. CONFIGURACIÓN E INICIALIZACIÓN
 # ==========================================
@@ -294,19 +299,12 @@ def aplicar_correccion_costos(ws_inv, ws_map, df_correcciones: pd.DataFrame):
 
 
 def safe_google_op(func, *args, **kwargs):
-    max_retries = 5
-    wait = 2
-    for attempt in range(max_retries):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            if "429" in str(e).lower() or "quota" in str(e).lower():
-                if attempt < max_retries - 1:
-                    time.sleep(wait)
-                    wait *= 2
-                    continue
-            st.error(f"Error de conexión con Google: {e}")
-            raise e
+    # Cola por cuota compartida + reintentos con jitter (bp_common.sheets_quota)
+    try:
+        return llamada_api(func, *args, **kwargs)
+    except Exception as e:
+        st.error(f"Error de conexión con Google: {e}")
+        raise e
 
 
 @st.cache_resource
@@ -323,11 +321,14 @@ def conectar_db():
 
 
 def get_worksheet_safe(sh, name, headers):
+    gw = obtener_gateway(sh)
     try:
-        return sh.worksheet(name)
+        return gw.hoja(name, llamar=safe_google_op)
     except gspread.exceptions.WorksheetNotFound:
         ws = sh.add_worksheet(title=name, rows=1000, cols=max(len(headers), 20))
         ws.append_row(headers)
+        gw.registrar_hoja(ws)
+        gw.invalidar(name)
         return ws
 
 
@@ -336,7 +337,7 @@ def get_worksheet_safe(sh, name, headers):
 # ==========================================
 
 
-def cargar_datos_snapshot():
+def cargar_datos_snapshot(fresco=False):
     sh = conectar_db()
     if not sh:
         return None
@@ -410,10 +411,14 @@ def cargar_datos_snapshot():
     }
 
     data_store = {}
+    gw = obtener_gateway(sh)
     with st.spinner("🔄 Sincronizando Core de Datos..."):
+        hojas = {name: get_worksheet_safe(sh, name, cols) for name, cols in schemas.items()}
+        # Todas las pestañas en un solo batchGet (snapshot compartido entre sesiones)
+        gw.leer(schemas, llamar=safe_google_op, fresco=fresco)
         for sheet_name, cols in schemas.items():
-            ws = get_worksheet_safe(sh, sheet_name, cols)
-            records = safe_google_op(ws.get_all_records)
+            ws = hojas[sheet_name]
+            records = gw.registros(sheet_name, llamar=safe_google_op)
             df = pd.DataFrame(records)
             if df.empty:
                 df = pd.DataFrame(columns=cols)
@@ -429,16 +434,16 @@ def cargar_datos_snapshot():
     df_prov = data_store.get("df_Maestro_Proveedores", pd.DataFrame())
 
     df_inv["Stock"] = pd.to_numeric(df_inv["Stock"], errors="coerce").fillna(0)
-    df_inv["Costo"] = df_inv["Costo"].apply(clean_currency)
-    df_inv["Precio"] = df_inv["Precio"].apply(clean_currency)
-    df_inv["ID_Producto_Norm"] = df_inv["ID_Producto"].apply(normalizar_id_producto)
+    df_inv["Costo"] = clean_currency_series(df_inv["Costo"])
+    df_inv["Precio"] = clean_currency_series(df_inv["Precio"])
+    df_inv["ID_Producto_Norm"] = map_unique(df_inv["ID_Producto"], normalizar_id_producto)
     df_inv["Categoria"] = df_inv["Categoria"].replace("", "Sin Categoría").fillna("Sin Categoría")
 
     # Limpieza Maestro_Proveedores
     if df_prov is not None and not df_prov.empty:
         if "Costo_Proveedor" not in df_prov.columns:
             df_prov["Costo_Proveedor"] = 0.0
-        df_prov["Costo_Proveedor"] = df_prov["Costo_Proveedor"].apply(clean_currency)
+        df_prov["Costo_Proveedor"] = clean_currency_series(df_prov["Costo_Proveedor"])
 
         if "Factor_Pack" not in df_prov.columns:
             df_prov["Factor_Pack"] = 1.0
@@ -507,12 +512,12 @@ def calcular_master_df() -> pd.DataFrame:
 
     mask_empty = df_inv["ID_Producto_Norm"].astype(str).str.strip().eq("")
     if mask_empty.any():
-        df_inv.loc[mask_empty, "ID_Producto_Norm"] = df_inv.loc[mask_empty, "ID_Producto"].apply(
-            normalizar_id_producto
+        df_inv.loc[mask_empty, "ID_Producto_Norm"] = map_unique(
+            df_inv.loc[mask_empty, "ID_Producto"], normalizar_id_producto
         )
 
     for c in ["Stock", "Costo", "Precio"]:
-        df_inv[c] = df_inv[c].apply(clean_currency)
+        df_inv[c] = clean_currency_series(df_inv[c])
 
     # 2. PROVEEDORES ROBUSTO
     df_prov = _ensure_cols(
@@ -524,14 +529,16 @@ def calcular_master_df() -> pd.DataFrame:
             "Nombre_Proveedor": "Sin Asignar",
         },
     )
-    df_prov["Costo_Proveedor"] = df_prov["Costo_Proveedor"].apply(clean_currency)
+    df_prov["Costo_Proveedor"] = clean_currency_series(df_prov["Costo_Proveedor"])
     df_prov["Factor_Pack"] = pd.to_numeric(df_prov["Factor_Pack"], errors="coerce").fillna(1.0)
     df_prov["Factor_Pack"] = np.where(df_prov["Factor_Pack"] <= 0, 1.0, df_prov["Factor_Pack"])
 
     if "SKU_Interno_Norm" not in df_prov.columns:
-        df_prov["SKU_Interno_Norm"] = df_prov["SKU_Interno"].apply(normalizar_id_producto)
+        df_prov["SKU_Interno_Norm"] = map_unique(df_prov["SKU_Interno"], normalizar_id_producto)
     else:
-        df_prov["SKU_Interno_Norm"] = df_prov["SKU_Interno_Norm"].apply(normalizar_id_producto)
+        df_prov["SKU_Interno_Norm"] = map_unique(
+            df_prov["SKU_Interno_Norm"], normalizar_id_producto
+        )
     df_prov["Costo_Proveedor_Unitario"] = df_prov["Costo_Proveedor"]
     if "Ultima_Actualizacion" in df_prov.columns:
         df_prov["Ultima_Actualizacion"] = df_prov["Ultima_Actualizacion"].astype(str).str.strip()
@@ -652,21 +659,19 @@ def calcular_master_df() -> pd.DataFrame:
     # 5. VENTAS / ROTACIÓN
     stats = analizar_ventas(df_ven, master)
 
-    def buscar_ventas(row, key):
-        posibles = set()
-        if "Producto_UID" in row and str(row["Producto_UID"]).strip():
-            posibles.add(str(row["Producto_UID"]).strip().lower())
-        if "ID_Producto_Norm" in row and str(row["ID_Producto_Norm"]).strip():
-            posibles.add(str(row["ID_Producto_Norm"]).strip().lower())
-        if "ID_Producto" in row and str(row["ID_Producto"]).strip():
-            posibles.add(normalizar_id_producto(row["ID_Producto"]).lower())
-        for k in posibles:
-            if k in stats and key in stats[k]:
-                return stats[k][key]
-        return 0.0
-
-    master["v90"] = master.apply(lambda row: buscar_ventas(row, "v90"), axis=1)
-    master["v30"] = master.apply(lambda row: buscar_ventas(row, "v30"), axis=1)
+    # Ventas por clave con prioridad fija: UID > ID normalizado > referencia original
+    ref = master["ID_Producto"].astype(str).str.strip()
+    claves = pd.DataFrame(
+        {
+            "uid": master["Producto_UID"].astype(str).str.strip().str.lower(),
+            "norm": master["ID_Producto_Norm"].astype(str).str.strip().str.lower(),
+            "id": map_unique(master["ID_Producto"], normalizar_id_producto)
+            .str.lower()
+            .where(ref != "", ""),
+        }
+    )
+    ventas = pd.DataFrame.from_dict(stats, orient="index", columns=["v90", "v30"])
+    master[["v90", "v30"]] = buscar_por_claves(claves, ventas)
     master["v90"] = pd.to_numeric(master["v90"], errors="coerce").fillna(0.0)
     master["v30"] = pd.to_numeric(master["v30"], errors="coerce").fillna(0.0)
 
@@ -825,6 +830,7 @@ def crear_orden_compra(proveedor: str, items_df: pd.DataFrame) -> str:
                 "Pendiente",
             ]
         )
+        obtener_gateway(conectar_db()).invalidar("Historial_Ordenes")
         return orden_id
     except Exception as e:
         return f"ORD-ERROR-{e}"
@@ -870,6 +876,15 @@ def analizar_ventas(df_ven: pd.DataFrame, df_inv: pd.DataFrame) -> dict:
             for k in keys:
                 prod_map[k] = keys
 
+        # Índice invertido clave → entradas de prod_map que la contienen, para no
+        # recorrer todo prod_map por cada ítem vendido (mismo resultado)
+        entradas = list(prod_map.values())
+        destinos = [next(iter(keys)) for keys in entradas]
+        indice = {}
+        for pos, keys in enumerate(entradas):
+            for k in keys:
+                indice.setdefault(k, []).append(pos)
+
         def _sumar_items(df_sub):
             totales = {}
             # Detectar si existe Items_Detalle y usarlo si tiene datos
@@ -928,9 +943,9 @@ def analizar_ventas(df_ven: pd.DataFrame, df_inv: pd.DataFrame) -> dict:
                                     break
                                 except:
                                     pass
-                        for prod_norm, keys in prod_map.items():
-                            if posibles & keys:
-                                totales[list(keys)[0]] = totales.get(list(keys)[0], 0.0) + qty
+                        for pos in sorted({p for k in posibles for p in indice.get(k, ())}):
+                            destino = destinos[pos]
+                            totales[destino] = totales.get(destino, 0.0) + qty
                 except Exception:
                     pass
             return totales
@@ -968,7 +983,7 @@ def main():
             st.cache_resource.clear()
             if "data_store" in st.session_state:
                 del st.session_state["data_store"]
-            cargar_datos_snapshot()
+            cargar_datos_snapshot(fresco=True)
             st.rerun()
 
         st.markdown("---")
@@ -1334,7 +1349,7 @@ def main():
                                     f"Se corrigieron {applied} productos y se sincronizó el costo de referencia del proveedor cuando existía mapeo."
                                 )
                                 st.session_state.pop("data_store", None)
-                                cargar_datos_snapshot()
+                                cargar_datos_snapshot(fresco=True)
                                 st.rerun()
 
     # ── TAB 2: COMPRAS INTELIGENTES ───────────────────────────────────────
@@ -9,6 +9,10 @@ from datetime import datetime, timedelta, date
 from urllib.parse import quote
 import unicodedata
 
+from bp_common.currency import clean_currency_series
+from bp_common.sheets_gateway import obtener_gateway
+from bp_common.sheets_quota import llamada_api
+
 
 def money_int(val):
     if isinstance(val, (int, float)):
@@ -290,7 +294,7 @@ def _preparar_fuente_cli_ven(
         df_ven = df_ven.rename(columns={col_total_v: "Total"})
     if "Total" not in df_ven.columns:
         df_ven["Total"] = 0.0
-    df_ven["Total"] = df_ven["Total"].apply(money_int)
+    df_ven["Total"] = clean_currency_series(df_ven["Total"])
 
     col_ced_v = _find_col(df_ven, ["Cedula_Cliente", "Cedula", "Cédula", "Documento"])
     if col_ced_v and col_ced_v != "Cedula_Cliente":
@@ -614,14 +618,17 @@ def conectar_crm():
 
         gc = gspread.service_account_from_dict(st.secrets["google_service_account"])
         sh = gc.open_by_url(st.secrets["SHEET_URL"])
+        gw = obtener_gateway(sh)
+        # Clientes y Ventas en un solo batchGet; `procesar_inteligencia` lee del snapshot
+        gw.leer(["Clientes", "Ventas"], llamar=llamada_api)
 
         try:
-            ws_cli = sh.worksheet("Clientes")
+            ws_cli = gw.hoja("Clientes", llamar=llamada_api)
         except:
             ws_cli = None
 
         try:
-            ws_ven = sh.worksheet("Ventas")
+            ws_ven = gw.hoja("Ventas", llamar=llamada_api)
         except:
             ws_ven = None
 
@@ -640,8 +647,10 @@ def limpiar_columnas(df):
 
 def procesar_inteligencia(ws_cli, ws_ven):
     # 1) Cargar Datos
-    data_cli = ws_cli.get_all_records() if ws_cli else []
-    data_ven = ws_ven.get_all_records() if ws_ven else []
+    ws_ref = ws_cli or ws_ven
+    gw = obtener_gateway(ws_ref.spreadsheet) if ws_ref else None
+    data_cli = gw.registros(ws_cli.title, llamar=llamada_api) if ws_cli else []
+    data_ven = gw.registros(ws_ven.title, llamar=llamada_api) if ws_ven else []
 
     df_cli = pd.DataFrame(data_cli)
     df_ven = pd.DataFrame(data_ven)
@@ -13,6 +13,10 @@ from plotly.subplots import make_subplots
 
 import streamlit as st
 
+from bp_common.currency import map_unique
+from bp_common.sheets_gateway import obtener_gateway
+from bp_common.sheets_quota import llamada_api
+
 
 COLOR_PRIMARIO = "#0f766e"
 COLOR_SECUNDARIO = "#164e63"
@@ -314,19 +318,8 @@ def normalizar_id_producto(id_prod):
 
 
 def safe_google_op(func, *args, **kwargs):
-    wait = 2
-    for attempt in range(5):
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            if "429" in str(e).lower() or "quota" in str(e).lower():
-                if attempt < 4:
-                    import time
-
-                    time.sleep(wait)
-                    wait *= 2
-                    continue
-            raise e
+    # Cola por cuota compartida + reintentos con jitter (bp_common.sheets_quota)
+    return llamada_api(func, *args, **kwargs)
 
 
 @st.cache_resource(ttl=900)
@@ -335,19 +328,13 @@ def conectar_db():
     return gc.open_by_url(st.secrets["SHEET_URL"])
 
 
-def get_ws_safe(sh, name: str):
-    try:
-        return sh.worksheet(name)
-    except Exception:
-        return None
+HOJAS = ["Inventario", "Ventas", "Historial_Recepciones", "Maestro_Proveedores"]
 
 
-def ws_to_df(ws, defaults: dict | None = None) -> pd.DataFrame:
-    if ws is None:
-        df = pd.DataFrame()
-    else:
-        records = safe_google_op(ws.get_all_records)
-        df = pd.DataFrame(records)
+def ws_to_df(sh, name: str, defaults: dict | None = None) -> pd.DataFrame:
+    # Lee del snapshot del gateway; una pestaña inexistente queda vacía
+    records = obtener_gateway(sh).registros(name, llamar=safe_google_op)
+    df = pd.DataFrame(records)
     defaults = defaults or {}
     if df.empty:
         return pd.DataFrame(columns=list(defaults.keys()))
@@ -360,8 +347,10 @@ def ws_to_df(ws, defaults: dict | None = None) -> pd.DataFrame:
 @st.cache_data(ttl=300)
 def cargar_datos():
     sh = conectar_db()
+    obtener_gateway(sh).leer(HOJAS, llamar=safe_google_op)
     df_inv = ws_to_df(
-        get_ws_safe(sh, "Inventario"),
+        sh,
+        "Inventario",
         {
             "Producto_UID": "",
             "ID_Producto": "",
@@ -375,7 +364,8 @@ def cargar_datos():
         },
     )
     df_ven = ws_to_df(
-        get_ws_safe(sh, "Ventas"),
+        sh,
+        "Ventas",
         {
             "ID_Venta": "",
             "Fecha": "",
@@ -399,7 +389,8 @@ def cargar_datos():
         },
     )
     df_hist = ws_to_df(
-        get_ws_safe(sh, "Historial_Recepciones"),
+        sh,
+        "Historial_Recepciones",
         {
             "Fecha": "",
             "Folio": "",
@@ -421,7 +412,8 @@ def cargar_datos():
         },
     )
     df_map = ws_to_df(
-        get_ws_safe(sh, "Maestro_Proveedores"),
+        sh,
+        "Maestro_Proveedores",
         {
             "Producto_UID": "",
             "SKU_Interno": "",
@@ -437,12 +429,12 @@ def cargar_datos():
     if not df_inv.empty:
         df_inv["ID_Producto_Norm"] = np.where(
             df_inv["ID_Producto_Norm"].astype(str).str.strip().eq(""),
-            df_inv["ID_Producto"].apply(normalizar_id_producto),
-            df_inv["ID_Producto_Norm"].apply(normalizar_id_producto),
+            map_unique(df_inv["ID_Producto"], normalizar_id_producto),
+            map_unique(df_inv["ID_Producto_Norm"], normalizar_id_producto),
         )
         for col in ["Stock", "Costo", "Precio", "Iva"]:
             if col in df_inv.columns:
-                df_inv[col] = df_inv[col].apply(money_float)
+                df_inv[col] = map_unique(df_inv[col], money_float)
 
     if not df_hist.empty:
         df_hist["Fecha"] = pd.to_datetime(df_hist["Fecha"], errors="coerce")
@@ -456,19 +448,19 @@ def cargar_datos():
             "IVA_Porcentaje",
         ]:
             if col in df_hist.columns:
-                df_hist[col] = df_hist[col].apply(money_float)
-        df_hist["SKU_Interno_Norm"] = df_hist["SKU_Interno"].apply(normalizar_id_producto)
+                df_hist[col] = map_unique(df_hist[col], money_float)
+        df_hist["SKU_Interno_Norm"] = map_unique(df_hist["SKU_Interno"], normalizar_id_producto)
 
     if not df_ven.empty:
         df_ven["Fecha"] = pd.to_datetime(df_ven["Fecha"], errors="coerce")
         for col in ["Total", "Costo_Total"]:
             if col in df_ven.columns:
-                df_ven[col] = df_ven[col].apply(money_float)
+                df_ven[col] = map_unique(df_ven[col], money_float)
 
     if not df_map.empty:
-        df_map["SKU_Interno_Norm"] = df_map["SKU_Interno"].apply(normalizar_id_producto)
+        df_map["SKU_Interno_Norm"] = map_unique(df_map["SKU_Interno"], normalizar_id_producto)
         if "Costo_Proveedor" in df_map.columns:
-            df_map["Costo_Proveedor"] = df_map["Costo_Proveedor"].apply(money_float)
+            df_map["Costo_Proveedor"] = map_unique(df_map["Costo_Proveedor"], money_float)
         if "Factor_Pack" in df_map.columns:
             df_map["Factor_Pack"] = pd.to_numeric(df_map["Factor_Pack"], errors="coerce").fillna(
                 1.0
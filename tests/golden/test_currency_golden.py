@@ -6,52 +6,59 @@ Cada caso documenta el input y el output esperado bit-exact respecto a
 
 from __future__ import annotations
 
+import pandas as pd
 import pytest
 
-from bp_common.currency import clean_currency, format_cop, money_float, money_int
+from bp_common.currency import (
+    clean_currency,
+    clean_currency_series,
+    format_cop,
+    map_unique,
+    money_float,
+    money_int,
+)
 
+CASOS = [
+    # ints / floats / numpy
+    (0, 0),
+    (1500, 1500),
+    (-1500, -1500),
+    (1500.0, 1500),
+    (1500.4, 1500),
+    (1500.6, 1501),
+    (None, 0),
+    ("", 0),
+    # strings simples
+    ("0", 0),
+    ("100", 100),
+    ("-100", -100),
+    ("$1.200", 1200),
+    ("$ 1.200 ", 1200),
+    ("1,200", 1200),  # 3 dígitos a la derecha + 1 izquierda → miles
+    ("1.200", 1200),
+    ("12,500", 12500),
+    ("12.500", 12500),
+    ("1.234.567", 1234567),
+    ("1,234,567", 1234567),
+    # mezclas
+    ("1.234,56", 1235),  # 1234.56 → 1235 (round half-up)
+    ("1,234.56", 1235),
+    # decimales — la heurística legacy con 1-2 dígitos tras el separador trata
+    # el separador como decimal y trunca al int (sin redondeo float→int explícito
+    # cuando el resultado del parseo da 100.5 → int(100.5) = 100)
+    ("100,5", 100),
+    ("100.5", 100),
+    ("100,49", 100),
+    ("100.49", 100),
+    # vacíos / basura
+    ("abc", 0),
+    ("--", 0),
+    # con prefijos
+    ("$-500", -500),
+]
 
-@pytest.mark.parametrize(
-    "raw, expected",
-    [
-        # ints / floats / numpy
-        (0, 0),
-        (1500, 1500),
-        (-1500, -1500),
-        (1500.0, 1500),
-        (1500.4, 1500),
-        (1500.6, 1501),
-        (None, 0),
-        ("", 0),
-        # strings simples
-        ("0", 0),
-        ("100", 100),
-        ("-100", -100),
-        ("$1.200", 1200),
-        ("$ 1.200 ", 1200),
-        ("1,200", 1200),  # 3 dígitos a la derecha + 1 izquierda → miles
-        ("1.200", 1200),
-        ("12,500", 12500),
-        ("12.500", 12500),
-        ("1.234.567", 1234567),
-        ("1,234,567", 1234567),
-        # mezclas
-        ("1.234,56", 1235),  # 1234.56 → 1235 (round half-up)
-        ("1,234.56", 1235),
-        # decimales — la heurística legacy con 1-2 dígitos tras el separador trata
-        # el separador como decimal y trunca al int (sin redondeo float→int explícito
-        # cuando el resultado del parseo da 100.5 → int(100.5) = 100)
-        ("100,5", 100),
-        ("100.5", 100),
-        ("100,49", 100),
-        ("100.49", 100),
-        # vacíos / basura
-        ("abc", 0),
-        ("--", 0),
-        # con prefijos
-        ("$-500", -500),
-    ],
-)
+
+@pytest.mark.parametrize("raw, expected", CASOS)
 def test_clean_currency(raw, expected):
     assert clean_currency(raw) == expected
 
@@ -82,3 +89,78 @@ def test_clean_currency_numpy():
     np = pytest.importorskip("numpy")
     assert clean_currency(np.int64(1500)) == 1500
     assert clean_currency(np.float64(1500.7)) == 1501
+
+
+# ---------------------------------------------------------------------------
+# clean_currency_series: debe ser idéntico a `series.apply(clean_currency)`
+# ---------------------------------------------------------------------------
+
+
+def _assert_igual_a_apply(serie):
+    esperado = serie.apply(clean_currency)
+    pd.testing.assert_series_equal(clean_currency_series(serie), esperado)
+
+
+def test_clean_currency_series_casos_golden():
+    serie = pd.Series([raw for raw, _ in CASOS], dtype=object, name="Total")
+    out = clean_currency_series(serie)
+    assert out.tolist() == [expected for _, expected in CASOS]
+    _assert_igual_a_apply(serie)
+
+
+@pytest.mark.parametrize(
+    "valores",
+    [
+        ["1.234", "1.234", "$ 5.000", "5.000", "-12,5", "12,50"],  # repetidos (memo)
+        ["1,2.3,4", "1.23.4", ".", ",", "-", "$", "1.", ".5", "0001.500"],  # fallback legacy
+        ["1234,567", "1234.567", "123,4567", "12.3456", "1.234.567,891"],
+        ["  ٣٤ ", "1\u00a0500", "1 500 000", "(1.500)", "COP 2.000", "1e5"],  # no ASCII
+        ["99999999999999999999", "1.5"],  # fuera de int64 → versión escalar
+        ["$ 1.500 " + "x" * 100, "1.500"],  # texto largo → versión escalar
+        [1500, 1500.6, "1500", True, None, "", "2.500"],  # object mixto
+    ],
+)
+def test_clean_currency_series_bit_exact(valores):
+    _assert_igual_a_apply(pd.Series(valores, dtype=object))
+
+
+@pytest.mark.parametrize(
+    "serie",
+    [
+        pd.Series([1, -2, 3], dtype="int64"),
+        pd.Series([True, False]),
+        pd.Series([1500.4, 1500.5, 1501.5, -0.4, -2.5]),
+        pd.Series([], dtype=object),
+    ],
+)
+def test_clean_currency_series_columnas_numericas(serie):
+    _assert_igual_a_apply(serie)
+
+
+def test_clean_currency_series_nan_igual_que_apply():
+    serie = pd.Series([1.0, float("nan")])
+    with pytest.raises(ValueError):
+        serie.apply(clean_currency)
+    with pytest.raises(ValueError):
+        clean_currency_series(serie)
+
+
+def test_clean_currency_series_aleatorio():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(20240601)
+    alfabeto = list("0123456789" * 4 + ".,.,$- \t\u00a0a٣")
+    valores = ["".join(rng.choice(alfabeto, size=rng.integers(0, 16))) for _ in range(20000)]
+    serie = pd.Series(valores, index=rng.permutation(20000), dtype=object, name="Monto")
+    _assert_igual_a_apply(serie)
+
+
+def test_map_unique_igual_que_apply():
+    serie = pd.Series(["$1.500", "$1.500", None, 3, "x"], dtype=object, name="Costo")
+    pd.testing.assert_series_equal(map_unique(serie, money_float), serie.apply(money_float))
+    # 1, 1.0 y True comparten hash: no se deben mezclar al deduplicar
+    mixta = pd.Series([1, 1.0, True, "1", "1"], dtype=object)
+    assert map_unique(mixta, repr).tolist() == ["1", "1.0", "True", "'1'", "'1'"]
+    # dtype `string` con pd.NA: el NA no puede heredar el resultado de otro texto
+    nullable = pd.Series(["a", pd.NA, "b", "a"], dtype="string")
+    assert map_unique(nullable, repr).tolist() == ["'a'", "<NA>", "'b'", "'a'"]
+    assert map_unique(nullable, repr).tolist() == nullable.apply(repr).tolist()
@@ -2,29 +2,36 @@
 
 from __future__ import annotations
 
+import math
+import random
+
+import pandas as pd
 import pytest
 
-from bp_common.ids import limpiar_tel, normalizar_id_producto
+from bp_common.ids import (
+    limpiar_tel,
+    normalizar_id_producto,
+    normalizar_id_producto_series,
+)
 
+CASOS = [
+    (None, ""),
+    ("", ""),
+    ("abc", "ABC"),
+    (" abc ", "ABC"),
+    ("01-ABC.5", "01-ABC5"),  # quita el "."; el "-" se preserva
+    ("01.ABC.5", "01ABC5"),
+    ("00100", "1"),  # numérico puro → quita ceros izq
+    ("0100", "1"),
+    ("100", "1"),  # termina en 00 → trunca
+    ("12300", "123"),  # termina en 00 → trunca
+    ("12345", "12345"),
+    # "ABC100": legacy upper→"ABC100", no isdigit → no entra al bloque numérico → tal cual.
+    # (Caso explícito en `test_normalizar_id_producto_alphanumeric_keeps_trailing_00`.)
+]
 
-@pytest.mark.parametrize(
-    "raw, expected",
-    [
-        (None, ""),
-        ("", ""),
-        ("abc", "ABC"),
-        (" abc ", "ABC"),
-        ("01-ABC.5", "01-ABC5"),  # quita el "."; el "-" se preserva
-        ("01.ABC.5", "01ABC5"),
-        ("00100", "1"),  # numérico puro → quita ceros izq
-        ("0100", "1"),
-        ("100", "1"),  # termina en 00 → trunca
-        ("12300", "123"),  # termina en 00 → trunca
-        ("12345", "12345"),
-        # "ABC100": legacy upper→"ABC100", no isdigit → no entra al bloque numérico → tal cual.
-        # (Caso explícito en `test_normalizar_id_producto_alphanumeric_keeps_trailing_00`.)
-    ],
-)
+
+@pytest.mark.parametrize("raw, expected", CASOS)
 def test_normalizar_id_producto(raw, expected):
     assert normalizar_id_producto(raw) == expected
 
@@ -42,10 +49,7 @@ def test_normalizar_id_producto_numeric_with_leading_zeros_after_strip():
 
 
 def test_normalizar_id_producto_pandas_na():
-    pd = pytest.importorskip("pandas")
     assert normalizar_id_producto(pd.NA) == ""
-    import math
-
     assert normalizar_id_producto(math.nan) == ""
 
 
@@ -61,3 +65,60 @@ def test_normalizar_id_producto_pandas_na():
 )
 def test_limpiar_tel(raw, expected):
     assert limpiar_tel(raw) == expected
+
+
+def _misma_salida(valores: list) -> None:
+    serie = pd.Series(valores, index=range(100, 100 + len(valores)), dtype=object, name="ID")
+    esperado = serie.apply(normalizar_id_producto)
+    obtenido = normalizar_id_producto_series(serie)
+    pd.testing.assert_series_equal(obtenido, esperado)
+    assert list(map(type, obtenido)) == list(map(type, esperado))
+
+
+def test_series_igual_a_apply_en_casos_golden():
+    _misma_salida([raw for raw, _ in CASOS] * 3)
+    assert normalizar_id_producto_series(pd.Series([c[0] for c in CASOS])).tolist() == [
+        c[1] for c in CASOS
+    ]
+
+
+def test_series_tipos_mixtos_y_bordes():
+    _misma_salida(
+        [
+            100,
+            100.0,
+            True,
+            1.5,
+            -0.0,
+            pd.NA,
+            pd.NaT,
+            math.nan,
+            None,
+            "ABC100",
+            "0,0,1,0,0",
+            "000",
+            "00",
+            " 7 7 . 00 ",
+            "\t12300\n",
+            "straße",  # upper cambia el largo: "STRASSE"
+            "ß00",
+            "\u0661\u0662\u066300",  # dígitos arábigos: isdigit pero no ASCII
+            "A\x00",
+            "\x00100",
+            "9" * 80,
+            "0" * 70 + "100",
+            "\x1c12\x1f",
+        ]
+    )
+    _misma_salida([])
+    _misma_salida([None, math.nan])
+
+
+def test_series_fuzz_contra_apply():
+    rng = random.Random(25)
+    alfabeto = "0123456789000 ,.-abcXYZ\t"
+    valores = [
+        "".join(rng.choice(alfabeto) for _ in range(rng.randint(0, 12))) for _ in range(5000)
+    ]
+    valores += [rng.randint(0, 10**6) * 100 for _ in range(500)]
+    _misma_salida(valores)
@@ -0,0 +1,48 @@
+"""Tests para `bp_common.ids.buscar_por_claves` (join de ventas por clave con prioridad)."""
+
+from __future__ import annotations
+
+import math
+
+import pandas as pd
+
+from bp_common.ids import buscar_por_claves
+
+
+def test_buscar_por_claves_respeta_prioridad():
+    tabla = pd.DataFrame({"v90": [9.0, 5.0, 1.0]}, index=["uid-a", "sku-1", "sku-2"])
+    claves = pd.DataFrame(
+        {
+            "uid": ["uid-a", "uid-x", "", None],
+            "sku": ["sku-2", "sku-1", "sku-2", "nada"],
+        },
+        index=[10, 11, 12, 13],
+    )
+    out = buscar_por_claves(claves, tabla)
+    assert out.index.tolist() == [10, 11, 12, 13]
+    assert out["v90"].tolist()[:3] == [9.0, 5.0, 1.0]
+    assert math.isnan(out["v90"].iloc[3])
+
+
+def test_buscar_por_claves_sin_ventas_contra_indice_no_range():
+    # Lo que arma calcular_master_df cuando `analizar_ventas` devuelve {}:
+    # tabla vacía con índice int64 y un `master` filtrado (índice con huecos)
+    ventas = pd.DataFrame.from_dict({}, orient="index", columns=["v90", "v30"])
+    assert ventas.index.dtype == "int64"
+    master = pd.DataFrame({"Nombre": ["a", "b", "c"]}, index=[3, 7, 42])
+    claves = pd.DataFrame(
+        {"uid": ["uid-a", "", None], "norm": ["sku-1", "sku-2", ""]}, index=master.index
+    )
+
+    out = buscar_por_claves(claves, ventas)
+    assert out.index.tolist() == [3, 7, 42]
+    assert out.columns.tolist() == ["v90", "v30"]
+    master[["v90", "v30"]] = out
+    assert master[["v90", "v30"]].isna().all().all()
+
+
+def test_buscar_por_claves_sin_filas():
+    tabla = pd.DataFrame({"v90": [1.0]}, index=["sku-1"])
+    claves = pd.DataFrame({"uid": pd.Series([], dtype=object)}, index=pd.Index([], dtype="int64"))
+    out = buscar_por_claves(claves, tabla)
+    assert out.empty and out.columns.tolist() == ["v90"]
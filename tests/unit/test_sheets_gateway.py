@@ -0,0 +1,127 @@
+"""Tests para `bp_common.sheets_gateway.SheetsGateway` contra un Spreadsheet falso."""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+from gspread.exceptions import GSpreadException, WorksheetNotFound
+
+from bp_common.sheets_gateway import SheetsGateway, obtener_gateway
+
+
+class FakeWorksheet:
+    def __init__(self, title: str) -> None:
+        self.title = title
+
+
+class FakeSpreadsheet:
+    """`worksheets` + `values_batch_get` sobre listas en memoria (recorta vacíos como la API)."""
+
+    def __init__(self, tabs: dict[str, list[list[str]]], id: str = "sheet-1") -> None:
+        self.id = id
+        self.tabs = tabs
+        self.llamadas: list[list[str]] = []
+        self.metadata = 0
+
+    def worksheets(self) -> list[FakeWorksheet]:
+        self.metadata += 1
+        return [FakeWorksheet(t) for t in self.tabs]
+
+    def values_batch_get(self, rangos: list[str]) -> dict:
+        self.llamadas.append(rangos)
+        out = []
+        for rango in rangos:
+            titulo = re.fullmatch(r"'(.+)'", rango).group(1).replace("''", "'")
+            filas = [list(f) for f in self.tabs[titulo]]
+            while filas and not any(filas[-1]):
+                filas.pop()
+            out.append({"range": rango, "values": filas})
+        return {"valueRanges": out}
+
+
+class Reloj:
+    def __init__(self) -> None:
+        self.t = 0.0
+
+    def __call__(self) -> float:
+        return self.t
+
+
+def _hoja() -> FakeSpreadsheet:
+    return FakeSpreadsheet(
+        {
+            "Inventario": [["ID", "Stock", "Precio"], ["A1", "3", "1.500"], ["007", "", ""]],
+            "Ventas": [["ID_Venta", "Total"], ["V1", "100"]],
+            "D'Gastos": [["ID"]],
+        }
+    )
+
+
+def test_un_solo_batch_y_snapshot_con_ttl():
+    sh, reloj = _hoja(), Reloj()
+    gw = SheetsGateway(sh, ttl=60, reloj=reloj)
+
+    datos = gw.leer(["Inventario", "Ventas", "D'Gastos", "No_Existe"])
+    assert sh.llamadas == [["'Inventario'", "'Ventas'", "'D''Gastos'"]]
+    assert datos["No_Existe"] == []
+    assert datos["Inventario"][2] == ["007", "", ""]  # filas rectangulares
+
+    gw.registros("Inventario")
+    gw.valores("Ventas")
+    assert len(sh.llamadas) == 1  # servido desde el snapshot
+
+    reloj.t = 61
+    sh.tabs["Ventas"].append(["V2", "200"])
+    gw.leer(["Inventario", "Ventas"])
+    assert sh.llamadas[-1] == ["'Inventario'", "'Ventas'"]
+    assert gw.valores("Ventas")[-1] == ["V2", "200"]
+    assert sh.metadata == 1
+
+
+def test_registros_como_get_all_records():
+    gw = SheetsGateway(_hoja())
+    assert gw.registros("Inventario") == [
+        {"ID": "A1", "Stock": 3, "Precio": 1.5},  # misma conversión que gspread
+        {"ID": 7, "Stock": "", "Precio": ""},
+    ]
+    assert gw.registros("No_Existe") == []
+
+    gw.sh.tabs["Ventas"][0] = ["ID", "ID"]
+    gw.invalidar("Ventas")
+    with pytest.raises(GSpreadException):
+        gw.registros("Ventas")
+
+
+def test_invalidar_y_fresco_releen():
+    sh = _hoja()
+    gw = SheetsGateway(sh)
+    gw.leer(["Inventario", "Ventas"])
+
+    gw.invalidar("Ventas")
+    gw.leer(["Inventario", "Ventas"])
+    assert sh.llamadas[-1] == ["'Ventas'"]
+
+    gw.leer(["Inventario"], fresco=True)
+    assert sh.llamadas[-1] == ["'Inventario'"]
+
+
+def test_hoja_refresca_metadata_si_falta():
+    sh = _hoja()
+    gw = SheetsGateway(sh)
+    assert gw.hoja("Ventas").title == "Ventas"
+    gw.hoja("Inventario")
+    assert sh.metadata == 1
+
+    sh.tabs["Cierres"] = [["Fecha"]]
+    assert gw.hoja("Cierres").title == "Cierres"
+    assert sh.metadata == 2
+    with pytest.raises(WorksheetNotFound):
+        gw.hoja("Otra")
+
+
+def test_un_gateway_por_spreadsheet():
+    a, b = FakeSpreadsheet({}, id="x-1"), FakeSpreadsheet({}, id="x-1")
+    assert obtener_gateway(a) is obtener_gateway(b)
+    assert obtener_gateway(b).sh is b
+    assert obtener_gateway(FakeSpreadsheet({}, id="x-2")) is not obtener_gateway(a)
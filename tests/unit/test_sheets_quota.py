@@ -0,0 +1,159 @@
+"""Tests para `bp_common.sheets_quota`: cubeta de fichas, coalescencia y reintentos."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+
+from bp_common import sheets_quota
+from bp_common.sheets_quota import SingleFlight, TokenBucket, es_cuota, llamada_api
+
+
+class Reloj:
+    """Reloj falso: `dormir` avanza el tiempo en vez de bloquear."""
+
+    def __init__(self) -> None:
+        self.t = 0.0
+        self.dormido: list[float] = []
+
+    def __call__(self) -> float:
+        return self.t
+
+    def dormir(self, s: float) -> None:
+        self.dormido.append(s)
+        self.t += s
+
+
+class APIError(Exception):
+    def __init__(self, code: int) -> None:
+        super().__init__(f"APIError: [{code}]")
+        self.code = code
+
+
+class FakeWorksheet:
+    spreadsheet_id = "sheet-1"
+    id = 0
+
+    def __init__(self, fallos: int = 0) -> None:
+        self.fallos = fallos
+        self.lecturas = 0
+        self.escrituras = 0
+
+    def get_all_values(self) -> list[list[str]]:
+        self.lecturas += 1
+        if self.fallos:
+            self.fallos -= 1
+            raise APIError(429)
+        return [["ID"], ["A"]]
+
+    def append_row(self, fila: list[str]) -> None:
+        self.escrituras += 1
+
+
+class FakeSpreadsheet:
+    id = "sheet-1"
+
+    def __init__(self) -> None:
+        self.hoja = FakeWorksheet()
+
+    def worksheet(self, nombre: str) -> FakeWorksheet:
+        return self.hoja
+
+
+@pytest.fixture
+def reloj(monkeypatch) -> Reloj:
+    r = Reloj()
+    for tipo in ("lectura", "escritura"):
+        monkeypatch.setitem(
+            sheets_quota._BUCKETS, tipo, TokenBucket(2, 1.0, reloj=r, dormir=r.dormir)
+        )
+    return r
+
+
+def test_bucket_encola_en_vez_de_fallar():
+    r = Reloj()
+    b = TokenBucket(2, 0.5, reloj=r, dormir=r.dormir)
+    assert [b.adquirir() for _ in range(4)] == [0.0, 0.0, 2.0, 2.0]
+    assert r.t == 4.0
+
+    b.pausar(10)
+    assert b.adquirir() == pytest.approx(12.0)  # fin de la pausa + una ficha
+
+
+def test_reintenta_429_con_jitter_y_pausa_compartida(reloj):
+    ws = FakeWorksheet(fallos=2)
+    assert llamada_api(ws.get_all_values, dormir=reloj.dormir, pausa_429=5) == [["ID"], ["A"]]
+    assert ws.lecturas == 3
+    # Tras cada 429 la cubeta de lectura queda pausada para todas las sesiones
+    assert reloj.t >= 10
+
+    ws = FakeWorksheet(fallos=5)
+    with pytest.raises(APIError):
+        llamada_api(ws.get_all_values, reintentos=3, dormir=reloj.dormir)
+    assert ws.lecturas == 3
+
+
+def test_errores_no_de_cuota_no_se_reintentan(reloj):
+    def falla() -> None:
+        raise ValueError("hoja no encontrada")
+
+    with pytest.raises(ValueError):
+        llamada_api(falla, dormir=reloj.dormir)
+    assert not reloj.dormido
+    assert es_cuota(APIError(429)) and es_cuota(Exception("Quota exceeded for quota metric"))
+
+
+def test_escrituras_usan_su_propia_cubeta(reloj):
+    ws = FakeWorksheet()
+    for _ in range(2):
+        llamada_api(ws.get_all_values)
+    llamada_api(ws.append_row, ["A"])
+    assert reloj.dormido == []  # la cubeta de escritura sigue llena
+    llamada_api(ws.get_all_values)
+    assert reloj.dormido == [1.0]
+
+
+def test_single_flight_comparte_lecturas_concurrentes():
+    vuelos = SingleFlight()
+    entro, soltar = threading.Event(), threading.Event()
+    llamadas = []
+
+    def lectura() -> list[list[str]]:
+        llamadas.append(1)
+        entro.set()
+        soltar.wait(5)
+        return [["ID"], ["A"]]
+
+    resultados: list = []
+    lider = threading.Thread(target=lambda: resultados.append(vuelos.hacer("k", lectura)))
+    lider.start()
+    entro.wait(5)
+    seguidores = [
+        threading.Thread(target=lambda: resultados.append(vuelos.hacer("k", lectura)))
+        for _ in range(3)
+    ]
+    for t in seguidores:
+        t.start()
+    time.sleep(0.2)  # que los seguidores lleguen a esperar el vuelo en curso
+    soltar.set()
+    for t in [lider, *seguidores]:
+        t.join(5)
+
+    assert len(llamadas) == 1
+    assert resultados == [[["ID"], ["A"]]] * 4
+    assert len({id(r) for r in resultados}) == 4  # copias independientes por sesión
+    vuelos.hacer("k", lectura)
+    assert len(llamadas) == 2  # terminado el vuelo, la siguiente lectura es nueva
+
+
+def test_handles_usan_cubeta_de_lectura_sin_coalescer(reloj, monkeypatch):
+    vuelos: list[object] = []
+    monkeypatch.setattr(sheets_quota._VUELOS, "hacer", lambda clave, f: vuelos.append(clave))
+    sh = FakeSpreadsheet()
+    for _ in range(3):
+        # El handle vuelve tal cual: sin deepcopy del cliente HTTP ni credenciales
+        assert llamada_api(sh.worksheet, "Ventas", dormir=reloj.dormir) is sh.hoja
+    assert vuelos == []
+    assert reloj.dormido == [1.0]  # tercera ficha de la cubeta de lectura
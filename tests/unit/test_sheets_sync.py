@@ -0,0 +1,129 @@
+"""Tests para `bp_common.sheets_sync.SheetsDeltaSync` contra un Spreadsheet falso."""
+
+from __future__ import annotations
+
+import re
+
+import pandas as pd
+
+from bp_common.sheets_sync import SheetsDeltaSync, TabSpec, columna_a1
+
+
+class FakeSpreadsheet:
+    """`values_batch_get` sobre listas en memoria (recorta vacíos como la API)."""
+
+    def __init__(self, tabs: dict[str, list[list[str]]]) -> None:
+        self.tabs = tabs
+        self.llamadas: list[list[str]] = []
+
+    def values_batch_get(self, rangos: list[str]) -> dict:
+        self.llamadas.append(rangos)
+        out = []
+        for rango in rangos:
+            m = re.fullmatch(r"'(.+)'(?:!(?:1:1|A(\d+):([A-Z]+)))?", rango)
+            assert m, rango
+            filas = self.tabs[m.group(1)]
+            if rango.endswith("!1:1"):
+                filas = filas[:1]
+            elif m.group(2):
+                filas = filas[int(m.group(2)) - 1 :]
+            out.append({"range": rango, "values": [list(f) for f in filas]})
+        return {"valueRanges": out}
+
+
+def _limpiar(raw: list[list[str]]) -> pd.DataFrame:
+    if not raw:
+        return pd.DataFrame()
+    df = pd.DataFrame(raw[1:], columns=raw[0])
+    if "Total" in df.columns:
+        df["Total"] = pd.to_numeric(df["Total"]).astype(int)
+    return df
+
+
+TABS = [TabSpec("inv", "Inventario", "completa"), TabSpec("ven", "Ventas", "anexar")]
+
+
+def _hoja() -> FakeSpreadsheet:
+    return FakeSpreadsheet(
+        {
+            "Inventario": [["ID", "Stock"], ["A", "3"]],
+            "Ventas": [["ID_Venta", "Total", "Estado"]]
+            + [[f"V{i}", str(i * 100), "Pendiente"] for i in range(1, 6)],
+        }
+    )
+
+
+def test_columna_a1():
+    assert [columna_a1(n) for n in (1, 26, 27, 52, 703)] == ["A", "Z", "AA", "AZ", "AAA"]
+
+
+def test_delta_anexa_solo_filas_nuevas():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar, ventana=2)
+    primera = sync.sincronizar(sh)
+    assert len(primera["ven"]) == 5 and sync.ultimo.completas == ["inv", "ven"]
+
+    sh.tabs["Ventas"].append(["V6", "600"])  # la API recorta la celda vacía final
+    db = sync.sincronizar(sh)
+    assert sh.llamadas[-1] == ["'Inventario'", "'Ventas'!1:1", "'Ventas'!A5:C"]
+    assert sync.ultimo.incrementales == {"ven": 1}
+    assert db["ven"]["ID_Venta"].tolist() == ["V1", "V2", "V3", "V4", "V5", "V6"]
+    assert db["ven"]["Total"].tolist()[-1] == 600
+    assert db["ven"]["Estado"].tolist()[-1] == ""
+    assert len(sh.llamadas) == 2  # una sola lectura batch por sincronización
+
+
+def test_delta_rehace_filas_editadas_de_la_ventana():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar, ventana=2)
+    sync.sincronizar(sh)
+    sh.tabs["Ventas"][4][2] = "Entregado"  # V4, dentro de la ventana
+    db = sync.sincronizar(sh)
+    assert sync.ultimo.incrementales == {"ven": 2}
+    assert db["ven"]["Estado"].tolist() == ["Pendiente"] * 3 + ["Entregado", "Pendiente"]
+
+
+def test_invalidar_pestana_relee_solo_esa_completa():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar, ventana=2)
+    sync.sincronizar(sh)
+    sh.tabs["Ventas"][1][2] = "Pagado"  # V1, fuera de la ventana: el delta no la ve
+    assert sync.sincronizar(sh)["ven"].at[0, "Estado"] == "Pendiente"
+
+    sync.invalidar("ven")
+    db = sync.sincronizar(sh)
+    assert sh.llamadas[-1] == ["'Inventario'", "'Ventas'"]
+    assert db["ven"].at[0, "Estado"] == "Pagado" and sync.cargado
+    sync.sincronizar(sh)
+    assert sync.ultimo.incrementales == {"ven": 0}  # vuelve al modo delta
+
+
+def test_forzar_completa_relee_filas_viejas():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar, ventana=2)
+    sync.sincronizar(sh)
+    sh.tabs["Ventas"][1][2] = "Pagado"
+    db = sync.sincronizar(sh, forzar_completa=True)
+    assert sync.ultimo.completas == ["inv", "ven"] and db["ven"].at[0, "Estado"] == "Pagado"
+
+
+def test_recarga_completa_si_cambia_esquema_o_hay_borrados():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar, ventana=2)
+    sync.sincronizar(sh)
+
+    sh.tabs["Ventas"][0].append("Banco")
+    db = sync.sincronizar(sh)
+    assert sync.ultimo.completas == ["inv", "ven"] and "Banco" in db["ven"].columns
+
+    del sh.tabs["Ventas"][-1]
+    db = sync.sincronizar(sh)
+    assert sync.ultimo.completas == ["inv", "ven"] and len(db["ven"]) == 4
+
+
+def test_copias_por_sesion():
+    sh = _hoja()
+    sync = SheetsDeltaSync(TABS, _limpiar)
+    a = sync.sincronizar(sh)
+    a["ven"].at[0, "Estado"] = "modificado en la sesión"
+    assert sync.sincronizar(sh)["ven"].at[0, "Estado"] == "Pendiente"